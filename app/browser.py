@@ -1,19 +1,44 @@
-import json
-
-from datetime import datetime
+import os
 from pathlib import Path
 
+from app.catalog import Catalog
+from app.frame import as_frame
+from app.loaders.columnar import COLUMNAR_SUFFIX, write_columnar_day
+from app.utils.cache import ResultCache
+from app.utils.day_files import is_day_file, day_of_file, file_preference
+
 
 class DirectoryBrowser:
     def get_saved_files_list(self):
-        target_dir = f"{Path.cwd()}/app/logs"
+        # a directory scan, newest day first, no day file is opened. A day kept in several formats
+        # is listed once, through its preferred file, like Catalog.days counts it
+        logs_dir = Path(self.logs_dir())
+        if not logs_dir.is_dir():
+            return []
+        filenames = [item.name for item in os.scandir(logs_dir) if item.is_file() and is_day_file(item.name)]
+        by_day = {}
+        for filename in sorted(filenames, key=file_preference):
+            try:
+                by_day.setdefault(day_of_file(filename), filename)
+            except ValueError:
+                # named like a day file but not after a date, e.g. notes.json
+                continue
+        return [by_day[day] for day in sorted(by_day, reverse=True)]
 
-        filenames = [file.name for file in Path(target_dir).iterdir() if file.is_file() and file.name[-5:] == '.json']
-        sorted_filenames = sorted(filenames, key=lambda x: datetime.strptime(x[:-5], '%d.%m.%Y'), reverse=True)
-        return sorted_filenames
+    @staticmethod
+    def logs_dir() -> str:
+        return f"{Path.cwd()}/app/logs"
 
     def save_new_file(self, date: str, content) -> bool:
-        target_dir = f"{Path.cwd()}/app/logs"
-        print(f"Prepared to save loaded data to file: {date}.json")
-        with open(f"{target_dir}/{date}.json", "w", encoding="utf-8") as file:
-            json.dump(content, file)
\ No newline at end of file
+        Catalog(self.logs_dir()).record(self.write_new_file(date, content))
+        return True
+
+    def write_new_file(self, date: str, content) -> str:
+        # only the day file, safe to run for several days in parallel. The caller records the
+        # written files in the catalog, one batch at a time, see backfill
+        filename = f"{date}{COLUMNAR_SUFFIX}"
+        print(f"Prepared to save loaded data to file: {filename}")
+        Path(self.logs_dir()).mkdir(parents=True, exist_ok=True)
+        write_columnar_day(f"{self.logs_dir()}/{filename}", as_frame(content['data']))
+        ResultCache().invalidate(filename)
+        return filename
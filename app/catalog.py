@@ -0,0 +1,139 @@
+import hashlib
+import json
+import os
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+from app.loaders.stream import read_day
+from app.plugins.engine import DayStats, COIN_SUM
+from app.utils.day_files import is_day_file, day_of_file, file_preference
+
+LOGS_DIR = "app/logs"
+CATALOG_NAME = "catalog.manifest"
+
+
+def file_hash(path: str) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# Persistent summary of every saved day: where it is, whether it changed, and its basic numbers,
+# so listings and range questions do not have to open the day files
+class Catalog:
+    def __init__(self, logs_dir: str = LOGS_DIR):
+        self.logs_dir = Path(logs_dir)
+        self.path = self.logs_dir / CATALOG_NAME
+        # files named like days that could not be read, by size and mtime, so refresh only tries them
+        # again once they change
+        self.rejected = {}
+        self.entries = self._load()
+
+    def _load(self) -> dict[str, dict[str, Any]]:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as file:
+                manifest = json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+        self.rejected = manifest.get('rejected', {})
+        return manifest.get('days', {})
+
+    def save(self) -> None:
+        self.logs_dir.mkdir(parents=True, exist_ok=True)
+        # a tmp file of its own, another process saving at the same time can not replace it under us
+        handle, tmp_path = tempfile.mkstemp(prefix=f"{CATALOG_NAME}.", suffix='.tmp', dir=self.logs_dir)
+        with os.fdopen(handle, 'w', encoding='utf-8') as file:
+            json.dump({'days': self.entries, 'rejected': self.rejected}, file)
+        os.replace(tmp_path, self.path)
+
+    def summarize(self, filename: str) -> dict[str, Any]:
+        path = str(self.logs_dir / filename)
+        day = day_of_file(filename)
+        stat = os.stat(path)
+        stats = DayStats(read_day(path)['data'], (COIN_SUM,))
+        return {
+            'date': day.strftime('%d.%m.%Y'),
+            'ordinal': day.toordinal(),
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'hash': file_hash(path),
+            'counts': stats.counts,
+            'coin_sum': stats.coin_sum,
+        }
+
+    def record(self, filename: str) -> dict[str, Any]:
+        return self.record_many([filename])[filename]
+
+    def record_many(self, filenames: list[str]) -> dict[str, dict[str, Any]]:
+        # the manifest is written once for the whole batch
+        for filename in filenames:
+            self.entries[filename] = self.summarize(filename)
+            self.rejected.pop(filename, None)
+        self.save()
+        return {filename: self.entries[filename] for filename in filenames}
+
+    def refresh(self) -> bool:
+        # Repairs the catalog against the directory: files that are new or whose size or mtime changed
+        # are summarised again, entries of deleted files are dropped. Only stat calls for unchanged days
+        changed = False
+        present = set()
+        if self.logs_dir.is_dir():
+            for item in os.scandir(self.logs_dir):
+                if not item.is_file() or not is_day_file(item.name):
+                    continue
+                present.add(item.name)
+                stat = item.stat()
+                seen = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+                entry = self.entries.get(item.name)
+                if entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+                    continue
+                if self.rejected.get(item.name) == seen:
+                    continue
+                try:
+                    self.entries[item.name] = self.summarize(item.name)
+                    self.rejected.pop(item.name, None)
+                except (ValueError, KeyError) as error:
+                    print(f"Skipping {item.name} in catalog: {error}")
+                    self.entries.pop(item.name, None)
+                    self.rejected[item.name] = seen
+                changed = True
+
+        for filename in set(self.entries) - present:
+            del self.entries[filename]
+            changed = True
+        for filename in set(self.rejected) - present:
+            del self.rejected[filename]
+            changed = True
+
+        if changed:
+            self.save()
+        return changed
+
+    def days(self, start: str = None, end: str = None) -> list[dict[str, Any]]:
+        # entries between two DD.MM.YYYY dates, both included, in date order
+        first = datetime.strptime(start, '%d.%m.%Y').toordinal() if start else None
+        last = datetime.strptime(end, '%d.%m.%Y').toordinal() if end else None
+        # a day kept in several formats is counted once, through its preferred file
+        by_day = {}
+        for filename in sorted(self.entries, key=file_preference):
+            entry = self.entries[filename]
+            if (first is None or entry['ordinal'] >= first) and (last is None or entry['ordinal'] <= last):
+                by_day.setdefault(entry['ordinal'], dict(entry, file=filename))
+        return [by_day[ordinal] for ordinal in sorted(by_day)]
+
+    def basic_metrics(self, start: str = None, end: str = None) -> dict[str, Any]:
+        days = self.days(start, end)
+        started = sum(entry['counts']['started'] for entry in days)
+        succeed = sum(entry['counts']['succeed'] for entry in days)
+        return {
+            'days': len(days),
+            'dialogs created': started,
+            'Successful recharges': succeed,
+            'failed_recharges': sum(entry['counts']['interrupted'] for entry in days),
+            'total recharged amount': sum(entry['coin_sum'] for entry in days),
+            'channel effectiveness': succeed / started if started > 0 else 0,
+        }
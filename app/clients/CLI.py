@@ -9,6 +9,13 @@ class CLI:
         print(message)
         print("\n\n" + "*" * 30 + "\n\n")
 
+    def render_result(self, result):
+        # an AnalysisResult. Renderers are looked up by plugin name, the import waits for the first result,
+        # so showing the menu does not import the plugins
+        from app.clients.renderers import render
+
+        render(result)
+
     def print_welcome(self):
         print("Welcome to the CLI!")
 
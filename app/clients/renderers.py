@@ -0,0 +1,134 @@
+from typing import Any, Callable
+
+from app.plugins.plugins import (DialogsCreated, SuccessRechargePlugin, RechargedAmountPlugin, FailedRechargePlugin,
+                                 RechargedUsers, AgentRecharges, DialogsByTime, RechargeTime, AgentAverageRechargeTime,
+                                 ChannelEffectiveness, DistinctUsers, RechargeTimePercentiles,
+                                 CohortRetention, RepeatRecharges)
+from app.plugins.results import AnalysisResult
+
+# How each plugin's args are printed, keyed by plugin name. Plugins only return data,
+# so a result from a worker, the cache or the query server renders the same way
+RENDERERS: dict[str, Callable[[Any], None]] = {}
+
+
+def renderer(plugin) -> Callable:
+    def register(func: Callable[[Any], None]) -> Callable[[Any], None]:
+        RENDERERS[plugin.name] = func
+        return func
+    return register
+
+
+def render(result: AnalysisResult) -> None:
+    RENDERERS.get(result.plugin, render_plain)(result.args)
+
+
+def render_plain(data: Any) -> None:
+    # plugins without a renderer of their own
+    print(data)
+
+
+@renderer(DialogsCreated)
+def render_dialogs_created(data: int) -> None:
+    print(f"Number of dialogs created: {data}")
+
+
+@renderer(SuccessRechargePlugin)
+def render_success_recharges(data: int) -> None:
+    print(f"Total successful top-ups: {data}")
+
+
+@renderer(RechargedAmountPlugin)
+def render_recharged_amount(data: int) -> None:
+    print(f"Recharged amount: {data}")
+
+
+@renderer(FailedRechargePlugin)
+def render_failed_recharges(data: int) -> None:
+    print(f"Recharges failed: {data}")
+
+
+@renderer(RechargedUsers)
+def render_recharged_users(user_list: list) -> None:
+    print(f"Recharged users list: ")
+    for user in user_list:
+        print(f"User ID {user['user']} recharged {user['recharge_amount']} coins")
+
+
+@renderer(AgentRecharges)
+def render_agent_recharges(agent_list: list) -> None:
+    for agent in agent_list:
+        print(f"Agent {agent['agent']} recharged {agent['coins']} coins")
+
+
+@renderer(DialogsByTime)
+def render_dialogs_by_time(data: list) -> None:
+    print("New dialogs created by time:")
+    for line in data:
+        print(line)
+
+
+@renderer(RechargeTime)
+def render_recharge_time(data: dict) -> None:
+    for user, seconds in data.items():
+        print(f"{user}: recharge time = {seconds} secs")
+
+    average_seconds = sum(data.values()) / len(data)
+    print(f"\nAverage recharge time = {average_seconds} secs")
+
+
+@renderer(AgentAverageRechargeTime)
+def render_agent_recharge_time(agents: dict) -> None:
+    average_seconds = {}
+    count = {}
+    for key, value in agents.items():
+        seconds = value['time_difference']
+        key_id = value['id:']
+        if key_id not in average_seconds:
+            average_seconds[key_id] = seconds
+            count[key_id] = 1
+        else:
+            average_seconds[key_id] += seconds
+            count[key_id] += 1
+
+    print("\nAverage recharge time by agent:")
+    # Calculate the average seconds for each key
+    for key, value in average_seconds.items():
+        average = value / count[key]
+        print(f"{key}: {average} seconds")
+
+
+@renderer(ChannelEffectiveness)
+def render_channel_effectiveness(effectiveness: float) -> None:
+    print(f"Channel effectiveness: {effectiveness:.1%}")
+
+
+@renderer(DistinctUsers)
+def render_distinct_users(data: dict) -> None:
+    for key, count in data.items():
+        print(f"Distinct {key}: ~{count}")
+
+
+@renderer(RechargeTimePercentiles)
+def render_recharge_time_percentiles(data: dict) -> None:
+    print("Recharge time percentiles, seconds:")
+    for key, values in data.items():
+        percentiles = ", ".join(f"{name} = {value}" for name, value in values.items() if name != 'count')
+        print(f"{key}: {percentiles} over {values['count']} recharges")
+
+
+@renderer(CohortRetention)
+def render_cohort_retention(cohorts: list) -> None:
+    print("Recharging users coming back, by the day they recharged:")
+    for cohort in cohorts:
+        print(f"{cohort['date']}: {cohort['cohort']} recharged, {cohort['came back']} came back, "
+              f"{cohort['recharged again']} recharged again")
+        for later in cohort['by day']:
+            print(f"    {later['date']}: {later['came back']} came back, {later['recharged']} recharged")
+
+
+@renderer(RepeatRecharges)
+def render_repeat_recharges(data: dict) -> None:
+    print(f"Recharged users: {data['recharged users']}, "
+          f"on more than one day: {data['repeat users']} ({data['repeat share']:.1%})")
+    for row in data['users by recharge days']:
+        print(f"{row['days']} days: {row['users']} users")
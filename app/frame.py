@@ -0,0 +1,223 @@
+from array import array
+from typing import Any, Iterable
+
+import numpy as np
+
+from app.utils.timestamps import parse_timestamp, parse_timestamps
+
+EVENT_KINDS = ('started', 'succeed', 'interrupted')
+MISSING = -1
+
+
+# Maps repeated id values to small integer codes, keeping the original values for output
+class Interner:
+    def __init__(self):
+        self.values = []
+        self.codes = {}
+
+    def code(self, value: Any) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self.codes[value] = code
+            self.values.append(value)
+        return code
+
+    def __len__(self):
+        return len(self.values)
+
+
+# Typed columns for one event kind. Ids are codes into the owning DayFrame tables.
+# Timestamps are normalised once at ingest: `time` is wall-clock seconds since epoch as written
+# in the log (what the plugins compare) and `offset` is the utc offset of that time in seconds.
+# `coin` holds the amounts as integers for sums. Amounts written as something else, like "150",
+# are also kept as written in `coin_values`, so listings show them unchanged. None when all are ints
+class EventTable:
+    COLUMNS = ('user', 'agent', 'coin', 'time', 'offset')
+
+    def __init__(self, user: np.ndarray, agent: np.ndarray, coin: np.ndarray, time: np.ndarray,
+                 offset: np.ndarray = None, coin_values: list | None = None):
+        self.user = user
+        self.agent = agent
+        self.coin = coin
+        self.time = time
+        self.offset = np.zeros(len(user), dtype=np.int64) if offset is None else offset
+        self.coin_values = coin_values
+
+    @classmethod
+    def from_entries(cls, entries: list[dict[str, Any]], users: Interner, agents: Interner) -> 'EventTable':
+        # one comprehension per column is much cheaper than appending event by event
+        user_code, agent_code = users.code, agents.code
+        user = [user_code(entry['user']) for entry in entries]
+        agent = [agent_code(entry['agent']) if 'agent' in entry else MISSING for entry in entries]
+        raw_coins = [entry.get('coin') for entry in entries]
+        times = parse_timestamps(entry.get('time') for entry in entries)
+        coin, coin_values = coin_columns(raw_coins)
+        return cls(np.array(user, dtype=np.int64), np.array(agent, dtype=np.int64), coin,
+                   np.ascontiguousarray(times[:, 0]), np.ascontiguousarray(times[:, 1]), coin_values)
+
+    @classmethod
+    def from_records(cls, records: list[tuple], users: Interner, agents: Interner) -> 'EventTable':
+        # records are (user, agent, coin, time) tuples as made by compact_event, None where a key was missing
+        user_code, agent_code = users.code, agents.code
+        user = [user_code(record[0]) for record in records]
+        agent = [MISSING if record[1] is None else agent_code(record[1]) for record in records]
+        raw_coins = [record[2] for record in records]
+        times = parse_timestamps(record[3] for record in records)
+        coin, coin_values = coin_columns(raw_coins)
+        return cls(np.array(user, dtype=np.int64), np.array(agent, dtype=np.int64), coin,
+                   np.ascontiguousarray(times[:, 0]), np.ascontiguousarray(times[:, 1]), coin_values)
+
+    def columns(self) -> list[np.ndarray]:
+        return [getattr(self, name) for name in self.COLUMNS]
+
+    def take(self, rows: np.ndarray) -> 'EventTable':
+        table = EventTable(*(column[rows] for column in self.columns()))
+        if self.coin_values is not None:
+            table.coin_values = [self.coin_values[row] for row in rows.tolist()]
+        return table
+
+    def coin_list(self) -> list:
+        # amounts as they were written, for output
+        return self.coin.tolist() if self.coin_values is None else list(self.coin_values)
+
+    def utc_time(self) -> np.ndarray:
+        return self.time - self.offset
+
+    def hours(self) -> np.ndarray:
+        return (self.time // 3600) % 24
+
+    def __len__(self):
+        return len(self.user)
+
+
+def coin_columns(raw_coins: list) -> tuple[np.ndarray, list | None]:
+    # the integer column and the amounts as written, the latter only when some are not ints
+    coin = np.array([0 if value is None else int(value) for value in raw_coins], dtype=np.int64)
+    if all(value is None or type(value) is int for value in raw_coins):
+        return coin, None
+    return coin, raw_coins
+
+
+# Appends events one at a time into compact typed buffers, so no list of dicts is ever kept
+class EventTableBuilder:
+    def __init__(self, users: Interner, agents: Interner):
+        self.users = users
+        self.agents = agents
+        self.columns = tuple(array('q') for _ in EventTable.COLUMNS)
+        # amounts as written, only started once one of them is not an int
+        self.coin_values = None
+
+    def add(self, entry: dict[str, Any]) -> None:
+        user, agent, coin, time, offset = self.columns
+        user.append(self.users.code(entry['user']))
+        agent.append(self.agents.code(entry['agent']) if 'agent' in entry else MISSING)
+        raw_coin = entry.get('coin')
+        if self.coin_values is None and raw_coin is not None and type(raw_coin) is not int:
+            self.coin_values = coin.tolist()
+        if self.coin_values is not None:
+            self.coin_values.append(raw_coin)
+        coin.append(0 if raw_coin is None else int(raw_coin))
+        seconds, utc_offset = parse_timestamp(entry['time']) if 'time' in entry else (0, 0)
+        time.append(seconds)
+        offset.append(utc_offset)
+
+    def build(self) -> EventTable:
+        table = EventTable(*(np.frombuffer(column, dtype=np.int64) for column in self.columns))
+        table.coin_values = self.coin_values
+        return table
+
+
+class DayFrame:
+    def __init__(self, users: list, agents: list, started: EventTable, succeed: EventTable, interrupted: EventTable):
+        self.users = users
+        self.agents = agents
+        self.started = started
+        self.succeed = succeed
+        self.interrupted = interrupted
+        self._join_codes = None
+
+    @classmethod
+    def from_data(cls, data: dict[str, list[dict[str, Any]]]) -> 'DayFrame':
+        users, agents = Interner(), Interner()
+        tables = [EventTable.from_entries(data[kind], users, agents) for kind in EVENT_KINDS]
+        return cls(users.values, agents.values, *tables)
+
+    @classmethod
+    def from_records(cls, data: dict[str, list[tuple]]) -> 'DayFrame':
+        users, agents = Interner(), Interner()
+        tables = [EventTable.from_records(data[kind], users, agents) for kind in EVENT_KINDS]
+        return cls(users.values, agents.values, *tables)
+
+    @classmethod
+    def from_events(cls, events: Iterable[tuple[str, dict[str, Any]]]) -> 'DayFrame':
+        # build the frame from a stream of (kind, event) pairs without holding the events themselves
+        users, agents = Interner(), Interner()
+        builders = {kind: EventTableBuilder(users, agents) for kind in EVENT_KINDS}
+        for kind, entry in events:
+            builders[kind].add(entry)
+        return cls(users.values, agents.values, *(builders[kind].build() for kind in EVENT_KINDS))
+
+    def __getitem__(self, kind: str) -> EventTable:
+        if kind not in EVENT_KINDS:
+            raise KeyError(kind)
+        return getattr(self, kind)
+
+    def user_join_codes(self) -> np.ndarray:
+        # user ids are compared as strings when pairing events, so 42 and '42' are one user
+        if self._join_codes is None:
+            interner = Interner()
+            self._join_codes = np.array([interner.code(str(user)) for user in self.users], dtype=np.int64)
+        return self._join_codes
+
+
+EVENT_FIELDS = ('user', 'agent', 'coin', 'time')
+EVENT_FIELD_SET = set(EVENT_FIELDS)
+EVENT_KIND_SET = set(EVENT_KINDS)
+
+
+# (user, agent, coin, time) of one parsed event, None where a key was missing
+class EventRecord(tuple):
+    __slots__ = ()
+
+    def to_dict(self) -> dict[str, Any]:
+        return {field: value for field, value in zip(EVENT_FIELDS, self) if value is not None}
+
+
+def as_record(entry: EventRecord | dict[str, Any]) -> EventRecord:
+    if isinstance(entry, EventRecord):
+        return entry
+    return EventRecord(entry.get(field) for field in EVENT_FIELDS)
+
+
+def restore_events(value: Any) -> Any:
+    # records that turned out not to sit in a day's event lists go back to dicts
+    if isinstance(value, EventRecord):
+        return value.to_dict()
+    if isinstance(value, list) and any(isinstance(item, EventRecord) for item in value):
+        return [restore_events(item) for item in value]
+    return value
+
+
+def compact_event(obj: dict[str, Any]) -> Any:
+    # object_hook for json.load: each event dict becomes an EventRecord as soon as it is parsed and the
+    # event lists of a day become a DayFrame, so a parsed day never holds a dict per event.
+    # The hook sees objects from the inside out and can not tell where one sits, so records are made
+    # of every object with a user and no other keys than event fields, which loses nothing. Events with
+    # more keys stay dicts until their day is built. The day object, made of event kinds only, turns its
+    # lists into a frame with missing kinds left empty. Any other object puts records back to dicts
+    if 'user' in obj and obj.keys() <= EVENT_FIELD_SET and None not in obj.values():
+        return EventRecord(obj.get(field) for field in EVENT_FIELDS)
+    if obj and obj.keys() <= EVENT_KIND_SET and all(isinstance(value, list) for value in obj.values()):
+        return DayFrame.from_records({kind: [as_record(entry) for entry in obj.get(kind, [])] for kind in EVENT_KINDS})
+    for key, value in list(obj.items()):
+        restored = restore_events(value)
+        if restored is not value:
+            obj[key] = restored
+    return obj
+
+
+def as_frame(data: dict[str, Any] | DayFrame) -> DayFrame:
+    if isinstance(data, DayFrame):
+        return data
+    return DayFrame.from_data(data)
@@ -0,0 +1,56 @@
+from typing import Sequence
+
+import numpy as np
+
+METHODS = ('lttb', 'minmax')
+
+
+def lttb(y: Sequence[float], threshold: int) -> np.ndarray:
+    # Largest-Triangle-Three-Buckets: indices of `threshold` points that keep the visual shape of the line.
+    # Points are evenly spaced on x, the same as the plotted labels
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    y = np.asarray(y, dtype=float)
+    x = np.arange(n, dtype=float)
+    every = (n - 2) / (threshold - 2)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+
+    previous = 0
+    for bucket in range(threshold - 2):
+        start = int(bucket * every) + 1
+        end = int((bucket + 1) * every) + 1
+        # the third corner of the triangle is the average of the next bucket, or the last point
+        next_end = min(int((bucket + 2) * every) + 1, n - 1) if bucket < threshold - 3 else n
+        next_start = min(end, next_end - 1)
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+        area = np.abs((x[previous] - avg_x) * (y[start:end] - y[previous])
+                      - (x[previous] - x[start:end]) * (avg_y - y[previous]))
+        previous = start + int(area.argmax())
+        selected[bucket + 1] = previous
+    return selected
+
+
+def min_max(y: Sequence[float], threshold: int) -> np.ndarray:
+    # the lowest and highest point of every bucket, so spikes survive however dense the series is
+    n = len(y)
+    buckets = threshold // 2
+    if threshold >= n or buckets < 1:
+        return np.arange(n)
+    y = np.asarray(y, dtype=float)
+    edges = np.linspace(0, n, buckets + 1).astype(np.int64)
+    selected = []
+    for start, end in zip(edges[:-1], edges[1:]):
+        if start == end:
+            continue
+        chunk = y[start:end]
+        selected.extend(sorted({start + int(chunk.argmin()), start + int(chunk.argmax())}))
+    return np.array(selected, dtype=np.int64)
+
+
+def downsample(y: Sequence[float], max_points: int, method: str = 'lttb') -> np.ndarray:
+    if method not in METHODS:
+        raise ValueError(f"Unknown downsampling method {method}, expected one of {', '.join(METHODS)}")
+    return lttb(y, max_points) if method == 'lttb' else min_max(y, max_points)
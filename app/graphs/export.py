@@ -0,0 +1,90 @@
+import argparse
+import re
+import sys
+import time
+from datetime import date, datetime
+from pathlib import Path
+
+import config
+from app.graphs.graph_factory import PlotDataNormalizer
+from app.graphs.render import FigureRenderer
+from app.graphs.rollups import RollupStore
+from app.plugins import plugins as all_plugins
+from app.report import EXIT_OK, EXIT_USAGE, select_plugins
+
+IMAGE_FORMATS = ('png', 'svg')
+
+
+def parse_range(text: str) -> tuple[date | None, date | None]:
+    # 'DD.MM.YYYY:DD.MM.YYYY', either side can be left empty for an open range
+    first, _, last = text.partition(':')
+    return (datetime.strptime(first, '%d.%m.%Y').date() if first else None,
+            datetime.strptime(last, '%d.%m.%Y').date() if last else None)
+
+
+def range_label(start: date | None, end: date | None) -> str:
+    return f"{start.isoformat() if start else 'first'}_{end.isoformat() if end else 'last'}"
+
+
+def slug(name: str) -> str:
+    return re.sub(r'[^a-z0-9]+', '_', name.lower()).strip('_')
+
+
+def export_graphs(plugins: list, ranges: list[tuple[date | None, date | None]], formats: tuple[str, ...],
+                  output_dir: str, dashboard: bool = False, renderer: FigureRenderer = None) -> list[str]:
+    # one image per plugin and range, plus one image with every plugin per range when `dashboard` is set.
+    # Single graphs are drawn before dashboards, so the renderer keeps its axes between consecutive images
+    renderer = renderer or FigureRenderer()
+    output = Path(output_dir)
+    output.mkdir(parents=True, exist_ok=True)
+    store = RollupStore()
+    store.update()
+
+    series = {bounds: PlotDataNormalizer.prepare_series(plugins, *bounds, max_points=renderer.max_points, store=store)
+              for bounds in ranges}
+    written = []
+    for bounds, graphs in series.items():
+        for plugin, data in zip(plugins, graphs):
+            renderer.draw([data])
+            written.extend(renderer.save(str(output / f"{slug(plugin.name)}_{range_label(*bounds)}.{file_format}"))
+                           for file_format in formats)
+    if dashboard:
+        for bounds, graphs in series.items():
+            renderer.draw(graphs)
+            written.extend(renderer.save(str(output / f"dashboard_{range_label(*bounds)}.{file_format}"))
+                           for file_format in formats)
+    return written
+
+
+def main(argv: list[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog='export', description="Render graphs of saved days to image files")
+    parser.add_argument('--plugins', help="comma separated plugin names or class names, "
+                                          "all plugins with rollups by default")
+    parser.add_argument('--range', dest='ranges', action='append', default=[],
+                        help="DD.MM.YYYY:DD.MM.YYYY, repeat for several ranges, all saved days by default")
+    parser.add_argument('--format', dest='formats', nargs='+', choices=IMAGE_FORMATS, default=['png'])
+    parser.add_argument('--output-dir', default=config.GRAPH_EXPORT_DIR)
+    parser.add_argument('--dashboard', action='store_true', help="also write one image with all plugins per range")
+    parser.add_argument('--width', type=int, default=config.GRAPH_WIDTH_PX, help="image width in pixels")
+    parser.add_argument('--height', type=int, default=config.GRAPH_HEIGHT_PX, help="image height in pixels")
+    args = parser.parse_args(argv)
+
+    try:
+        plugins = select_plugins(args.plugins) if args.plugins else [plugin for plugin in all_plugins if plugin.rollup]
+        ranges = [parse_range(text) for text in args.ranges] or [(None, None)]
+        for plugin in plugins:
+            if plugin.type != 'basic':
+                raise ValueError(f"{plugin.name} has no single value per day to plot")
+    except ValueError as error:
+        print(error, file=sys.stderr)
+        return EXIT_USAGE
+
+    started = time.perf_counter()
+    written = export_graphs(plugins, ranges, tuple(args.formats), args.output_dir, args.dashboard,
+                            FigureRenderer(width_px=args.width, height_px=args.height))
+    print(f"Wrote {len(written)} images to {args.output_dir} in {time.perf_counter() - started:.2f}s")
+    return EXIT_OK
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,8 +1,14 @@
 from abc import ABC
-import matplotlib.pyplot as plt
+
+import sys
+
+import config
 from app.plugins.plugins import DialogsCreated
-from app.utils.load_file import load_file
-from app.browser import DirectoryBrowser
+from app.utils.parallel import analyze_days
+from app.catalog import Catalog
+from app.graphs.rollups import RollupStore, day_label
+from app.utils.cache import ResultCache
+from app.graphs.render import plot_series
 
 
 class GraphBuilder(ABC):
@@ -14,23 +20,64 @@ class GraphBuilder(ABC):
 class PlotDataNormalizer(GraphBuilder):
     @staticmethod
     def prepare_data(**kwargs):
-        browser = DirectoryBrowser()
-        saved_files_list = browser.get_saved_files_list()
-        saved_files_list.reverse()
+        plugin = kwargs['plugin']
+        if plugin.rollup:
+            # summed plugins are read from materialised rollups and never touch raw events.
+            # Batch exports pass one updated store for all their graphs
+            store = kwargs.get('store')
+            if store is None:
+                store = RollupStore()
+                store.update()
+            if kwargs.get('max_points'):
+                return store.series(plugin, start=kwargs.get('start'), end=kwargs.get('end'),
+                                    max_points=kwargs['max_points'])
+            return store.series(plugin, start=kwargs.get('start'), end=kwargs.get('end'))
+
+        # the saved days between start and end, both included, in date order
+        catalog = Catalog()
+        catalog.refresh()
+        start, end = kwargs.get('start'), kwargs.get('end')
+        days = catalog.days(day_label(start) if start else None, day_label(end) if end else None)
+        # the catalog's dates are the full DD.MM.YYYY labels the rollup series use
+        labels = {entry['file']: entry['date'] for entry in days}
+        cache = kwargs.get('cache') or ResultCache()
+        saved_files_list = [entry['file'] for entry in days]
         all_days = []
         plugin_desc = ""
-        for file in saved_files_list:
-            data = load_file(file)
-            analysis = kwargs['plugin'].analyze(data['data'])
+
+        # only days that changed since the last build are parsed and analysed again
+        cached = {file: cache.get(file, plugin) for file in saved_files_list}
+        missing = [file for file, values in cached.items() if values is None]
+        for file, analysis in zip(missing, analyze_days(missing, [plugin], workers=kwargs.get('workers'))):
+            if analysis is None:
+                # removed or unreadable since it was listed, the graph goes on without it
+                print(f"Skipped {file}, it could not be read", file=sys.stderr)
+                del cached[file]
+                continue
             values = list(analysis.values())[0]
-            plugin_desc = values['desc']
-            all_days.append(values['args'])
+            cached[file] = {'args': values.args, 'desc': values.desc}
+            cache.put(file, plugin, cached[file])
+
+        shown = [file for file in saved_files_list if file in cached]
+        for file in shown:
+            plugin_desc = cached[file]['desc']
+            all_days.append(cached[file]['args'])
+        cache.evict()
         return {
-            'x': [filename[:2] for filename in saved_files_list],
+            'x': [labels[filename] for filename in shown],
             'y': all_days,
             'desc': plugin_desc
         }
 
+    @staticmethod
+    def prepare_series(plugins: list, start=None, end=None, max_points: int = None, store: RollupStore = None) -> list:
+        # data for several graphs at once, the rollup store is brought up to date only once for all of them
+        if store is None and any(plugin.rollup for plugin in plugins):
+            store = RollupStore()
+            store.update()
+        return [PlotDataNormalizer.prepare_data(plugin=plugin, start=start, end=end, max_points=max_points, store=store)
+                for plugin in plugins]
+
 
 class Graph(ABC):
     def create_graph(self, **kwargs):
@@ -39,8 +86,8 @@ class Graph(ABC):
 
 class SimplePlotGraph(Graph):
     def build_graph(self, **kwargs):
-        xaxis = kwargs['x']
-        yaxis = kwargs["y"]
-        # plt.plot(xaxis, yaxis)
-        # plt.show()
-        return plt.plot(xaxis, yaxis)
\ No newline at end of file
+        import matplotlib.pyplot as plt
+
+        # downsampled to the pixel budget, onto the given axes or the current pyplot ones
+        ax = kwargs.get('ax') or plt.gca()
+        return plot_series(ax, kwargs, kwargs.get('max_points') or config.GRAPH_WIDTH_PX)
\ No newline at end of file
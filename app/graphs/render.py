@@ -0,0 +1,98 @@
+import os
+import sys
+from typing import Any
+
+import numpy as np
+
+import config
+from app.graphs.downsample import downsample
+
+# labels written under the x axis, more than this is unreadable at any size
+MAX_TICKS = 12
+
+
+def is_headless() -> bool:
+    # an explicit MPLBACKEND wins, otherwise a linux box without a display is a server
+    backend = os.environ.get('MPLBACKEND')
+    if backend:
+        return backend.lower() == 'agg'
+    if config.GRAPH_HEADLESS:
+        return True
+    return sys.platform.startswith('linux') and not (os.environ.get('DISPLAY') or os.environ.get('WAYLAND_DISPLAY'))
+
+
+def grid(count: int) -> tuple[int, int]:
+    rows = max(1, int(count ** 0.5))
+    return rows, (count + rows - 1) // rows
+
+
+def plot_series(ax, data: dict[str, Any], max_points: int, method: str = None) -> list:
+    # Points are plotted at their positions and only a few labels are set, a categorical axis with
+    # thousands of string labels is what made long series slow to draw
+    y = np.asarray(data['y'], dtype=float)
+    indices = downsample(y, max_points, method or config.GRAPH_DOWNSAMPLE)
+    lines = ax.plot(indices, y[indices])
+    if len(indices):
+        ticks = indices[np.linspace(0, len(indices) - 1, min(len(indices), MAX_TICKS)).astype(np.int64)]
+        ax.set_xticks(ticks, [data['x'][tick] for tick in ticks], rotation=45, ha='right', fontsize='small')
+    ax.set_title(data['desc'])
+    return lines
+
+
+# Draws series onto one figure that is kept between images. Axes are cleared and reused as long as the
+# subplot layout stays the same, so batch exports do not build a new figure for every file.
+# Without a figure it makes its own Agg figure, which needs neither pyplot nor a display
+class FigureRenderer:
+    def __init__(self, figure=None, width_px: int = None, height_px: int = None, dpi: int = None,
+                 method: str = None):
+        self.width_px = width_px or config.GRAPH_WIDTH_PX
+        self.height_px = height_px or config.GRAPH_HEIGHT_PX
+        self.dpi = dpi or config.GRAPH_DPI
+        self.method = method or config.GRAPH_DOWNSAMPLE
+        if figure is None:
+            from matplotlib.backends.backend_agg import FigureCanvasAgg
+            from matplotlib.figure import Figure
+
+            figure = Figure(figsize=(self.width_px / self.dpi, self.height_px / self.dpi), dpi=self.dpi)
+            FigureCanvasAgg(figure)
+        self.figure = figure
+        self.layout = None
+        self.axes = []
+
+    @property
+    def max_points(self) -> int:
+        return self.width_px
+
+    def panels(self, count: int) -> tuple[list, bool]:
+        # the axes to draw on and whether they are new
+        layout = grid(count)
+        new_layout = layout != self.layout
+        if new_layout:
+            self.figure.clear()
+            self.axes = list(self.figure.subplots(*layout, squeeze=False).flat)
+            self.layout = layout
+        for position, ax in enumerate(self.axes):
+            if not new_layout:
+                ax.clear()
+            ax.set_visible(position < count)
+        return self.axes[:count], new_layout
+
+    def draw(self, series: list[dict[str, Any]]):
+        # each subplot gets its share of the figure width
+        points = max(3, self.max_points // grid(len(series))[1])
+        axes, new_layout = self.panels(len(series))
+        for ax, data in zip(axes, series):
+            plot_series(ax, data, points, self.method)
+        # tight_layout renders the whole figure to measure it, reused axes keep the spacing found the first time
+        if new_layout:
+            self.figure.tight_layout()
+        return self.figure
+
+    def save(self, path: str) -> str:
+        # the format follows the suffix, .png or .svg. Light png compression encodes several times
+        # faster for a slightly bigger file
+        if path.endswith('.png'):
+            self.figure.savefig(path, pil_kwargs={'compress_level': 1})
+        else:
+            self.figure.savefig(path)
+        return path
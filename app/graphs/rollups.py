@@ -0,0 +1,150 @@
+import json
+import os
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from app.catalog import Catalog
+from app.frame import DayFrame, as_frame
+from app.loaders.stream import read_day
+
+LOGS_DIR = "app/logs"
+ROLLUPS_NAME = "rollups.manifest"
+METRICS = ('started', 'succeed', 'interrupted', 'coins')
+# finest first, build_plot walks this list until the points fit
+GRANULARITIES = ('hourly', 'daily', 'weekly', 'monthly')
+MAX_POINTS = 120
+
+
+def day_rollup(frame: DayFrame) -> dict[str, list[int]]:
+    # events and coins per hour of the day, by the hour each event was logged at
+    hourly = {kind: np.bincount(frame[kind].hours(), minlength=24).tolist()
+              for kind in ('started', 'succeed', 'interrupted')}
+    coins = np.bincount(frame.succeed.hours(), weights=frame.succeed.coin, minlength=24)
+    hourly['coins'] = [int(value) for value in coins]
+    return hourly
+
+
+def day_label(day: date) -> str:
+    # days are labelled with the full date, ranges can span years
+    return day.strftime('%d.%m.%Y')
+
+
+def week_key(day: date) -> str:
+    year, week, _ = day.isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+def month_key(day: date) -> str:
+    return f"{day.year}-{day.month:02d}"
+
+
+# Materialised aggregates over all saved days. Hourly and daily buckets are built once per day file;
+# weekly and monthly buckets are kept up to date from the daily ones as days are added, replaced or removed
+class RollupStore:
+    def __init__(self, logs_dir: str = LOGS_DIR):
+        self.logs_dir = Path(logs_dir)
+        self.path = self.logs_dir / ROLLUPS_NAME
+        content = self._load()
+        self.sources = content.get('sources', {})
+        self.levels = {level: content.get(level, {}) for level in GRANULARITIES}
+
+    def _load(self) -> dict[str, Any]:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as file:
+                return json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def save(self) -> None:
+        self.logs_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(f"{ROLLUPS_NAME}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump(dict(self.levels, sources=self.sources), file)
+        os.replace(tmp_path, self.path)
+
+    def update(self, catalog: Catalog = None) -> int:
+        # only days that are new or whose content hash changed are read
+        catalog = catalog or Catalog(str(self.logs_dir))
+        catalog.refresh()
+        days = {datetime.strptime(entry['date'], '%d.%m.%Y').date().isoformat(): entry for entry in catalog.days()}
+
+        updated = 0
+        for key in set(self.sources) - set(days):
+            self._remove_day(key)
+            updated += 1
+        for key, entry in days.items():
+            if self.sources.get(key) == entry['hash']:
+                continue
+            frame = as_frame(read_day(str(self.logs_dir / entry['file']))['data'])
+            self._remove_day(key)
+            self._add_day(key, day_rollup(frame))
+            self.sources[key] = entry['hash']
+            updated += 1
+
+        if updated:
+            self.save()
+        return updated
+
+    def _add_day(self, key: str, hourly: dict[str, list[int]]) -> None:
+        daily = {metric: sum(hourly[metric]) for metric in METRICS}
+        self.levels['hourly'][key] = hourly
+        self.levels['daily'][key] = daily
+        self._add_to_period(key, daily, 1)
+
+    def _remove_day(self, key: str) -> None:
+        self.sources.pop(key, None)
+        self.levels['hourly'].pop(key, None)
+        daily = self.levels['daily'].pop(key, None)
+        if daily is not None:
+            self._add_to_period(key, daily, -1)
+
+    def _add_to_period(self, key: str, daily: dict[str, int], sign: int) -> None:
+        day = date.fromisoformat(key)
+        for level, period in (('weekly', week_key(day)), ('monthly', month_key(day))):
+            bucket = self.levels[level].setdefault(period, dict.fromkeys(METRICS, 0) | {'days': 0})
+            for metric in METRICS:
+                bucket[metric] += sign * daily[metric]
+            bucket['days'] += sign
+            if not bucket['days']:
+                del self.levels[level][period]
+
+    def choose_granularity(self, start: date = None, end: date = None, max_points: int = MAX_POINTS) -> str:
+        # the finest level whose number of points still fits into the plot
+        for level in GRANULARITIES:
+            if len(self.buckets(level, start, end)) <= max_points:
+                return level
+        return GRANULARITIES[-1]
+
+    def buckets(self, level: str, start: date = None, end: date = None) -> list[tuple[str, dict[str, int]]]:
+        # (label, bucket) pairs in time order; weekly and monthly buckets overlapping the range are included
+        first = start or date.min
+        last = end or date.max
+        if level == 'hourly':
+            return [(f"{day_label(date.fromisoformat(key))} {hour:02d}",
+                     {metric: values[metric][hour] for metric in METRICS})
+                    for key, values in sorted(self.levels['hourly'].items())
+                    if first <= date.fromisoformat(key) <= last
+                    for hour in range(24)]
+        if level == 'daily':
+            return [(day_label(date.fromisoformat(key)), bucket)
+                    for key, bucket in sorted(self.levels['daily'].items())
+                    if first <= date.fromisoformat(key) <= last]
+
+        make_key = week_key if level == 'weekly' else month_key
+        first_key, last_key = make_key(max(first, date(1, 1, 8))), make_key(min(last, date(9999, 12, 24)))
+        return [(key, bucket) for key, bucket in sorted(self.levels[level].items()) if first_key <= key <= last_key]
+
+    def series(self, plugin, start: date = None, end: date = None, level: str = None,
+               max_points: int = MAX_POINTS) -> dict[str, Any]:
+        if not plugin.rollup:
+            raise ValueError(f"{plugin.name} can not be computed from rollups")
+        level = level or self.choose_granularity(start, end, max_points)
+        buckets = self.buckets(level, start, end)
+        return {
+            'x': [label for label, _ in buckets],
+            'y': [plugin.from_rollup(bucket) for _, bucket in buckets],
+            'desc': f"{plugin.desc} ({level})",
+        }
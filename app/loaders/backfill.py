@@ -0,0 +1,88 @@
+import asyncio
+import sys
+from datetime import datetime, timedelta
+
+import config
+from app.browser import DirectoryBrowser
+from app.catalog import Catalog
+from .columnar import COLUMNAR_SUFFIX
+from .loaders import APILoader, Loader
+
+DATE_FORMAT = '%d.%m.%Y'
+
+
+# Spaces request starts so that no more than `rate` of them begin per second
+class RateLimiter:
+    def __init__(self, rate: float):
+        self.interval = 1 / rate if rate else 0
+        self.next_slot = 0.0
+        self.lock = asyncio.Lock()
+
+    async def wait(self) -> None:
+        async with self.lock:
+            now = asyncio.get_running_loop().time()
+            delay = self.next_slot - now
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self.next_slot = max(now, self.next_slot) + self.interval
+
+
+def date_range(start: str, end: str) -> list[str]:
+    current = datetime.strptime(start, DATE_FORMAT)
+    last = datetime.strptime(end, DATE_FORMAT)
+    days = []
+    while current <= last:
+        days.append(current.strftime(DATE_FORMAT))
+        current += timedelta(days=1)
+    return days
+
+
+async def fetch_day(day: str, loader: Loader, browser: DirectoryBrowser,
+                    semaphore: asyncio.Semaphore, limiter: RateLimiter) -> tuple[str, Exception | None]:
+    async with semaphore:
+        await limiter.wait()
+        try:
+            # the HTTP client is blocking, so every request runs in its own thread
+            content = await asyncio.to_thread(loader.load_data, day)
+            # threads only write day files, the catalog is updated once from the event loop
+            await asyncio.to_thread(browser.write_new_file, day, content)
+        except Exception as error:
+            return day, error
+    return day, None
+
+
+async def backfill_async(start: str, end: str, concurrency: int = None, rate: float = None,
+                         loader: Loader = None) -> dict[str, Exception]:
+    browser = DirectoryBrowser()
+    loader = loader or APILoader()
+    saved_days = {filename[:10] for filename in browser.get_saved_files_list()}
+    days = [day for day in date_range(start, end) if day not in saved_days]
+    print(f"Backfill {start} - {end}: {len(days)} missing days to fetch")
+
+    semaphore = asyncio.Semaphore(concurrency or config.BACKFILL_CONCURRENCY)
+    limiter = RateLimiter(config.BACKFILL_RATE if rate is None else rate)
+    tasks = [fetch_day(day, loader, browser, semaphore, limiter) for day in days]
+
+    # a failed day is reported and the rest of the batch carries on
+    failures = {}
+    saved = []
+    for done, task in enumerate(asyncio.as_completed(tasks), start=1):
+        day, error = await task
+        if error is None:
+            saved.append(day)
+            print(f"[{done}/{len(days)}] {day} saved")
+        else:
+            failures[day] = error
+            print(f"[{done}/{len(days)}] {day} failed: {error!r}")
+    if saved:
+        Catalog(browser.logs_dir()).record_many([f"{day}{COLUMNAR_SUFFIX}" for day in sorted(saved)])
+    return failures
+
+
+def backfill(start: str, end: str, concurrency: int = None, rate: float = None) -> dict[str, Exception]:
+    return asyncio.run(backfill_async(start, end, concurrency=concurrency, rate=rate))
+
+
+if __name__ == '__main__':
+    failed = backfill(sys.argv[1], sys.argv[2])
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,80 @@
+import json
+import os
+import struct
+
+import numpy as np
+
+from app.frame import DayFrame, EventTable, EVENT_KINDS
+
+COLUMNAR_SUFFIX = '.day'
+
+# File layout, all integers little-endian:
+#   header   HEADER_SIZE bytes: magic, format version, columns per table, row count per event kind,
+#            offset and length of the id tables
+#   columns  int64, for every event kind in EVENT_KINDS every column of EventTable.COLUMNS in order
+#   tables   utf-8 JSON {"users": [...], "agents": [...]} the user and agent codes point into, plus
+#            "coin values": {kind: [...]} for event kinds with amounts not written as integers
+MAGIC = b'FTDAY\0'
+# version 1 files have no offset column, it reads back as zeros
+FORMAT_VERSION = 2
+READABLE_VERSIONS = (1, 2)
+HEADER = struct.Struct('<6sHH' + 'Q' * len(EVENT_KINDS) + 'QQ')
+HEADER_SIZE = 64
+
+
+class ColumnarFormatError(ValueError):
+    pass
+
+
+def write_columnar_day(path: str, frame: DayFrame) -> int:
+    counts = [len(frame[kind]) for kind in EVENT_KINDS]
+    tables = {'users': frame.users, 'agents': frame.agents}
+    coin_values = {kind: frame[kind].coin_values for kind in EVENT_KINDS if frame[kind].coin_values is not None}
+    if coin_values:
+        tables['coin values'] = coin_values
+    tables = json.dumps(tables).encode('utf-8')
+    columns_size = sum(counts) * len(EventTable.COLUMNS) * 8
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, len(EventTable.COLUMNS), *counts,
+                         HEADER_SIZE + columns_size, len(tables))
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as file:
+        file.write(header.ljust(HEADER_SIZE, b'\0'))
+        for kind in EVENT_KINDS:
+            for column in frame[kind].columns():
+                file.write(np.ascontiguousarray(column, dtype='<i8').tobytes())
+        file.write(tables)
+    os.replace(tmp_path, path)
+    return HEADER_SIZE + columns_size + len(tables)
+
+
+def open_columnar_day(path: str) -> DayFrame:
+    # columns are memory-mapped, so opening a day only reads the header and the id tables
+    with open(path, 'rb') as file:
+        raw_header = file.read(HEADER_SIZE)
+        if len(raw_header) < HEADER.size or not raw_header.startswith(MAGIC):
+            raise ColumnarFormatError(f"{path} is not a columnar day file")
+        _, version, column_count, *counts, tables_offset, tables_length = HEADER.unpack_from(raw_header)
+        if version not in READABLE_VERSIONS or not 4 <= column_count <= len(EventTable.COLUMNS):
+            raise ColumnarFormatError(f"{path} has unsupported format version {version}")
+        file.seek(tables_offset)
+        tables = json.loads(file.read(tables_length).decode('utf-8'))
+
+    total_rows = sum(counts)
+    if total_rows:
+        values = np.memmap(path, dtype='<i8', mode='r', offset=HEADER_SIZE,
+                           shape=(total_rows * column_count,))
+    else:
+        values = np.zeros(0, dtype='<i8')
+
+    tables_by_kind = []
+    position = 0
+    for kind, rows in zip(EVENT_KINDS, counts):
+        columns = []
+        for _ in range(column_count):
+            columns.append(values[position:position + rows])
+            position += rows
+        table = EventTable(*columns)
+        table.coin_values = tables.get('coin values', {}).get(kind)
+        tables_by_kind.append(table)
+    return DayFrame(tables['users'], tables['agents'], *tables_by_kind)
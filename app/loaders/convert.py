@@ -0,0 +1,28 @@
+import sys
+from pathlib import Path
+
+from app.frame import as_frame
+from app.utils.day_files import is_day_file
+from .columnar import COLUMNAR_SUFFIX, write_columnar_day
+from .stream import read_day
+
+
+def convert_logs(logs_dir: str = "app/logs", remove_source: bool = False) -> list[str]:
+    # rewrite every saved .json / .jsonl day that has no columnar copy yet
+    converted = []
+    for source in sorted(Path(logs_dir).iterdir()):
+        if not source.is_file() or not is_day_file(source.name) or source.name.endswith(COLUMNAR_SUFFIX):
+            continue
+        target = source.with_name(source.name[:10] + COLUMNAR_SUFFIX)
+        if target.exists():
+            continue
+        size = write_columnar_day(str(target), as_frame(read_day(str(source))['data']))
+        print(f"Converted {source.name} -> {target.name} ({source.stat().st_size} -> {size} bytes)")
+        if remove_source:
+            source.unlink()
+        converted.append(target.name)
+    return converted
+
+
+if __name__ == '__main__':
+    convert_logs(remove_source='--remove-source' in sys.argv[1:])
@@ -1,5 +1,9 @@
+import time
 from datetime import datetime, timedelta
+
 from app.browser import DirectoryBrowser
+from app.plugins.metrics import RunMetrics
+from app.utils.day_files import is_day_file, day_of_file
 from .factory import FileLoaderFactory, APILoaderFactory,  LoaderFactory
 from .loaders import Loader
 
@@ -16,9 +20,8 @@ def convert_day_to_date(day_str) -> str:
 
 
 def determine_loader(command: str) -> str:
-    if command.endswith(".json"):
-        date_string = command[:-5]
-        datetime.strptime(date_string, "%d.%m.%Y")
+    if is_day_file(command):
+        day_of_file(command)
         return "file"
 
     try:
@@ -28,7 +31,7 @@ def determine_loader(command: str) -> str:
         return "api"
 
 
-def load_data(day_to_load: str, with_save: bool = False) -> dict:
+def load_data(day_to_load: str, with_save: bool = False, metrics: RunMetrics = None) -> dict:
 
     factories = {
         'file': FileLoaderFactory(),
@@ -42,7 +45,12 @@ def load_data(day_to_load: str, with_save: bool = False) -> dict:
         print(f"Chosen loader: {factory}. Starting...\n\n")
 
         loader: Loader = factory.get_loader()
+        # fetch once, the same response is saved and returned
+        started = time.perf_counter()
+        loaded = loader.load_data(day_to_load)
+        if metrics is not None:
+            metrics.record_load(loader.bytes_read, time.perf_counter() - started)
         if with_save:
             browser = DirectoryBrowser()
-            browser.save_new_file(convert_day_to_date(day_to_load), loader.load_data(day_to_load))
-        return loader.load_data(day_to_load)['data']
\ No newline at end of file
+            browser.save_new_file(convert_day_to_date(day_to_load), loaded)
+        return loaded['data']
\ No newline at end of file
@@ -0,0 +1,163 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+import config
+
+HTTP_CACHE_DIR = "app/cache/http"
+
+
+# Shared HTTP layer for the API loaders: pooled sessions with timeouts and bounded retries,
+# plus a local response cache that is revalidated with ETag / If-Modified-Since once its TTL runs out.
+# requests.Session is not documented as thread-safe, so every thread gets a session of its own
+class HttpClient:
+    def __init__(self, endpoint: str = None, headers: dict = None, timeout: float = None,
+                 retries: int = None, backoff: float = None, cache_ttl: float = None,
+                 cache_dir: str = HTTP_CACHE_DIR, max_cache_bytes: int = None):
+        self.endpoint = endpoint or config.ENDPOINT
+        self.headers = dict(config.HEADERS if headers is None else headers)
+        self.timeout = config.HTTP_TIMEOUT if timeout is None else timeout
+        self.cache_ttl = config.HTTP_CACHE_TTL if cache_ttl is None else cache_ttl
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.max_cache_bytes = config.HTTP_CACHE_BYTES if max_cache_bytes is None else max_cache_bytes
+        self._local = threading.local()
+        self._sessions = []
+        self._sessions_lock = threading.Lock()
+
+        # requests is only imported once a client is made, launches that never call the API skip it
+        from urllib3.util.retry import Retry
+
+        self.retry = Retry(
+            total=config.HTTP_RETRIES if retries is None else retries,
+            backoff_factor=config.HTTP_BACKOFF if backoff is None else backoff,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=('GET',),
+        )
+
+    @property
+    def last_bytes(self) -> int:
+        # bytes received over the network by this thread's last get_json call
+        return getattr(self._local, 'last_bytes', 0)
+
+    @last_bytes.setter
+    def last_bytes(self, value: int) -> None:
+        self._local.last_bytes = value
+
+    @property
+    def session(self):
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            adapter = HTTPAdapter(pool_connections=config.HTTP_POOL_SIZE, pool_maxsize=config.HTTP_POOL_SIZE,
+                                  max_retries=self.retry)
+            session = requests.Session()
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            self._local.session = session
+            with self._sessions_lock:
+                self._sessions.append(session)
+        return session
+
+    def get_json(self, params: dict[str, Any] | None = None) -> Any:
+        key = self._cache_key(params)
+        cached = self._read_cache(key)
+        self.last_bytes = 0
+        if cached and time.time() - cached['fetched_at'] < self.cache_ttl:
+            return cached['body']
+
+        headers = dict(self.headers)
+        if cached and cached.get('etag'):
+            headers['If-None-Match'] = cached['etag']
+        if cached and cached.get('last_modified'):
+            headers['If-Modified-Since'] = cached['last_modified']
+
+        response = self.session.get(self.endpoint, headers=headers, params=params, timeout=self.timeout)
+        if response.status_code == 304 and cached:
+            cached['fetched_at'] = time.time()
+            self._write_cache(key, cached)
+            return cached['body']
+
+        response.raise_for_status()
+        self.last_bytes = len(response.content)
+        body = response.json()
+        self._write_cache(key, {
+            'fetched_at': time.time(),
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'body': body,
+        })
+        return body
+
+    def close(self) -> None:
+        with self._sessions_lock:
+            sessions, self._sessions = self._sessions, []
+        for session in sessions:
+            session.close()
+        # every thread opens a new session on its next request
+        self._local = threading.local()
+
+    def evict(self) -> int:
+        # remove least recently used responses until the cache fits into max_cache_bytes
+        if not self.cache_dir or not self.cache_dir.is_dir():
+            return 0
+        entries = []
+        for path in self.cache_dir.glob('*.json'):
+            try:
+                entries.append((path, path.stat()))
+            except FileNotFoundError:
+                # evicted by another thread meanwhile
+                pass
+        total = sum(stat.st_size for _, stat in entries)
+        removed = 0
+        for path, stat in sorted(entries, key=lambda item: item[1].st_mtime):
+            if total <= self.max_cache_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= stat.st_size
+            removed += 1
+        return removed
+
+    def _cache_key(self, params: dict[str, Any] | None) -> str:
+        raw = json.dumps([self.endpoint, sorted((params or {}).items())])
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    def _read_cache(self, key: str) -> dict | None:
+        if not self.cache_dir:
+            return None
+        path = self.cache_dir / f"{key}.json"
+        try:
+            with open(path, 'r', encoding='utf-8') as file:
+                entry = json.load(file)
+            # touch the entry so eviction drops the least recently used ones first
+            os.utime(path)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        return entry
+
+    def _write_cache(self, key: str, entry: dict) -> None:
+        if not self.cache_dir:
+            return
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        # per-thread temporary name, backfill threads may write the same key at once
+        tmp_path = self.cache_dir / f"{key}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump(entry, file)
+        os.replace(tmp_path, self.cache_dir / f"{key}.json")
+        self.evict()
+
+
+_client = None
+
+
+def get_client() -> HttpClient:
+    # one client per process, so every loader shares the same connection pool
+    global _client
+    if _client is None:
+        _client = HttpClient()
+    return _client
@@ -1,14 +1,18 @@
 import datetime
 import json
+import os
 from abc import ABC
 
-import requests
-
-ENDPOINT = config.ENDPOINT
-HEADERS: Config.HEADERS
+import config
+from app.frame import as_frame
+from .http import HttpClient, get_client
+from .stream import read_day
 
 
 class Loader(ABC):
+    # size of the last loaded source, for performance stats
+    bytes_read: int = 0
+
     def load_data(self, day: str = None):
         pass
 
@@ -17,16 +21,37 @@ class Loader(ABC):
 
 
 class APILoader(Loader):
+    def __init__(self, client: HttpClient = None):
+        self.client = client or get_client()
+
     def load_data(self, day: str = None):
-        response = self.make_request(day)
-        return response.json()
+        data = self.make_request(day)
+        self.bytes_read = self.client.last_bytes
+        # the response's event dicts are dropped as soon as the day is in columns
+        data['data'] = as_frame(data['data'])
+        return data
 
-    @staticmethod
-    def make_request(day: str = None):
+    def make_request(self, day: str = None):
         if not day:
-            return requests.get(ENDPOINT, headers=HEADERS)
-        params = {'day': day}
-        return requests.get(ENDPOINT, headers=HEADERS, params=params)
+            return self.client.get_json()
+        params = {'day': api_day(day)}
+        return self.client.get_json(params=params)
+
+
+def api_day(day: str) -> str:
+    # The API is asked for a weekday name, the day of the coming week that convert_day_to_date saves
+    # the answer as. Dates, as backfill sends them, are written with config.API_DAY_FORMAT instead:
+    # '%A' keeps the weekday contract, an API that takes dates can be given e.g. '%d.%m.%Y'
+    try:
+        date = datetime.datetime.strptime(day, '%d.%m.%Y').date()
+    except ValueError:
+        return day
+    if config.API_DAY_FORMAT == '%A':
+        ahead = (date - datetime.date.today()).days
+        if not 0 <= ahead < 7:
+            raise ValueError(f"{day} is not in the coming week, the API only answers by weekday name. "
+                             f"Set API_DAY_FORMAT if it takes dates")
+    return date.strftime(config.API_DAY_FORMAT)
 
 
 class FileLoader(Loader):
@@ -34,14 +59,13 @@ class FileLoader(Loader):
         data = self.open_file(filename=day)
         if not data:
             return None
+        self.bytes_read = os.path.getsize(f"app/logs/{day}")
         return data
 
     @staticmethod
     def open_file(filename: str) -> json:
         try:
-            with open(f"app/logs/{filename}", 'r', encoding='utf-8') as fout:
-                data = json.load(fout)
-                return data
+            return read_day(f"app/logs/{filename}")
         except FileNotFoundError:
             print(f"File {filename} not found")
             return None
\ No newline at end of file
@@ -0,0 +1,60 @@
+import gzip
+import json
+from typing import Any, Iterable, Iterator, TextIO
+
+from app.frame import DayFrame, EVENT_KINDS, compact_event
+from .columnar import COLUMNAR_SUFFIX, open_columnar_day
+
+JSONL_SUFFIXES = ('.jsonl', '.jsonl.gz')
+
+
+def open_text(path: str, mode: str = 'r') -> TextIO:
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+def iter_events(path: str) -> Iterator[tuple[str, dict[str, Any]]]:
+    # JSON Lines days hold one {"kind": ..., "event": {...}} record per line and are read line by line,
+    # so memory stays flat whatever the size of the day. Plain .json days are a single {'data': {...}}
+    # document and have to be parsed whole, their text and events are in memory at once
+    with open_text(path) as file:
+        if path.endswith(JSONL_SUFFIXES):
+            for line in file:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                yield record['kind'], record['event']
+            return
+
+        data = json.load(file)['data']
+    for kind in EVENT_KINDS:
+        for entry in data.get(kind, []):
+            yield kind, entry
+
+
+def write_events(path: str, events: Iterable[tuple[str, dict[str, Any]]], append: bool = False) -> int:
+    written = 0
+    with open_text(path, 'a' if append else 'w') as file:
+        for kind, entry in events:
+            file.write(json.dumps({'kind': kind, 'event': entry}))
+            file.write('\n')
+            written += 1
+    return written
+
+
+def data_to_events(data: dict[str, list[dict[str, Any]]]) -> Iterator[tuple[str, dict[str, Any]]]:
+    for kind in EVENT_KINDS:
+        for entry in data.get(kind, []):
+            yield kind, entry
+
+
+def read_day(path: str) -> dict[str, Any]:
+    # the {'data': ...} shape of a .json day, with the events always read into a DayFrame.
+    # A .json day is still read whole, compact_event only keeps its parsed events small
+    if path.endswith(COLUMNAR_SUFFIX):
+        return {'data': open_columnar_day(path)}
+    if path.endswith(JSONL_SUFFIXES):
+        return {'data': DayFrame.from_events(iter_events(path))}
+    with open_text(path) as file:
+        return json.load(file, object_hook=compact_event)
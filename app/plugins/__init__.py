@@ -1,5 +1,6 @@
 from .plugins import DialogsCreated, SuccessRechargePlugin, FailedRechargePlugin, \
-RechargedAmountPlugin, RechargedUsers, AgentRecharges, DialogsByTime, RechargeTime, AgentAverageRechargeTime, ChannelEffectiveness
+RechargedAmountPlugin, RechargedUsers, AgentRecharges, DialogsByTime, RechargeTime, AgentAverageRechargeTime, ChannelEffectiveness, \
+DistinctUsers, RechargeTimePercentiles, CohortRetention, RepeatRecharges
 
 from .manager import PluginManager
 
@@ -13,5 +14,13 @@ plugins = [
     DialogsByTime,
     RechargeTime,
     AgentAverageRechargeTime,
-    ChannelEffectiveness
+    ChannelEffectiveness,
+    DistinctUsers,
+    RechargeTimePercentiles
+]
+
+# answered over a range of days from the saved user bitmaps, see app/user_index.py
+cross_day_plugins = [
+    CohortRetention,
+    RepeatRecharges
 ]
\ No newline at end of file
@@ -0,0 +1,204 @@
+import struct
+from typing import Any, Iterable
+
+import numpy as np
+
+from app.frame import DayFrame, EVENT_KINDS, Interner
+
+# A container holds the ids sharing their upper 16 bits. Up to ARRAY_LIMIT ids it is a sorted uint16
+# array of the lower bits, above that a 65536-bit bitset of 8 KiB, whichever is smaller
+ARRAY_LIMIT = 4096
+BITSET_BYTES = 8192
+POPCOUNT = np.array([bin(value).count('1') for value in range(256)], dtype=np.int64)
+
+CONTAINER = struct.Struct('<HBI')
+ARRAY, BITSET = 0, 1
+
+
+def to_bitset(values: np.ndarray) -> np.ndarray:
+    bits = np.zeros(1 << 16, dtype=bool)
+    bits[values] = True
+    return np.packbits(bits, bitorder='little')
+
+
+def to_array(bitset: np.ndarray) -> np.ndarray:
+    return np.flatnonzero(np.unpackbits(bitset, bitorder='little').view(bool)).astype(np.uint16)
+
+
+def cardinality(container: np.ndarray) -> int:
+    if container.dtype != np.uint8:
+        return len(container)
+    # bitwise_count is numpy 2.0 and later, a byte lookup table does the same a few times slower
+    if hasattr(np, 'bitwise_count'):
+        return int(np.bitwise_count(container.view(np.uint64)).sum())
+    return int(POPCOUNT[container].sum())
+
+
+def shrink(container: np.ndarray) -> np.ndarray | None:
+    # the smaller layout for the ids in `container`, None when it is empty
+    count = cardinality(container)
+    if not count:
+        return None
+    if container.dtype == np.uint8:
+        return to_array(container) if count <= ARRAY_LIMIT else container
+    return to_bitset(container) if count > ARRAY_LIMIT else container
+
+
+def contains(bitset: np.ndarray, values: np.ndarray) -> np.ndarray:
+    return (bitset[values >> 3] >> (values & 7).astype(np.uint8)) & 1 == 1
+
+
+# Compressed set of user ids (unsigned 32-bit) in the style of Roaring bitmaps: ids are split into
+# containers by their upper 16 bits, each stored as a sorted array or a bitset. Set operations work
+# container by container, so intersecting two days costs about their size in KiB, not in users
+class RoaringBitmap:
+    def __init__(self, containers: dict[int, np.ndarray] = None):
+        self.containers = containers or {}
+
+    @classmethod
+    def from_ids(cls, ids: Iterable[int] | np.ndarray) -> 'RoaringBitmap':
+        ids = np.unique(np.asarray(ids, dtype=np.uint32))
+        keys, starts = np.unique(ids >> 16, return_index=True)
+        ends = np.append(starts[1:], len(ids))
+        containers = {}
+        for key, start, end in zip(keys.tolist(), starts.tolist(), ends.tolist()):
+            containers[key] = shrink((ids[start:end] & 0xFFFF).astype(np.uint16))
+        return cls(containers)
+
+    def __len__(self) -> int:
+        return sum(cardinality(container) for container in self.containers.values())
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, RoaringBitmap) or self.containers.keys() != other.containers.keys():
+            return False
+        return all(np.array_equal(container, other.containers[key]) for key, container in self.containers.items())
+
+    def __contains__(self, value: int) -> bool:
+        container = self.containers.get(value >> 16)
+        if container is None:
+            return False
+        low = np.array([value & 0xFFFF], dtype=np.uint16)
+        if container.dtype == np.uint8:
+            return bool(contains(container, low)[0])
+        position = np.searchsorted(container, low[0])
+        return position < len(container) and container[position] == low[0]
+
+    def __and__(self, other: 'RoaringBitmap') -> 'RoaringBitmap':
+        containers = {}
+        for key in self.containers.keys() & other.containers.keys():
+            left, right = self.containers[key], other.containers[key]
+            if left.dtype == np.uint8 and right.dtype == np.uint8:
+                container = shrink(left & right)
+            elif left.dtype == np.uint8:
+                container = shrink(right[contains(left, right)])
+            elif right.dtype == np.uint8:
+                container = shrink(left[contains(right, left)])
+            else:
+                container = shrink(np.intersect1d(left, right, assume_unique=True))
+            if container is not None:
+                containers[key] = container
+        return RoaringBitmap(containers)
+
+    def __or__(self, other: 'RoaringBitmap') -> 'RoaringBitmap':
+        containers = dict(self.containers)
+        for key, right in other.containers.items():
+            left = containers.get(key)
+            if left is None:
+                containers[key] = right
+            elif left.dtype == np.uint16 and right.dtype == np.uint16:
+                containers[key] = shrink(np.union1d(left, right))
+            else:
+                left = left if left.dtype == np.uint8 else to_bitset(left)
+                right = right if right.dtype == np.uint8 else to_bitset(right)
+                containers[key] = left | right
+        return RoaringBitmap(containers)
+
+    def __sub__(self, other: 'RoaringBitmap') -> 'RoaringBitmap':
+        containers = {}
+        for key, left in self.containers.items():
+            right = other.containers.get(key)
+            if right is None:
+                containers[key] = left
+                continue
+            if left.dtype == np.uint8 and right.dtype == np.uint8:
+                container = shrink(left & ~right)
+            elif left.dtype == np.uint8:
+                container = shrink(left & ~to_bitset(right))
+            elif right.dtype == np.uint8:
+                container = shrink(left[~contains(right, left)])
+            else:
+                container = shrink(np.setdiff1d(left, right, assume_unique=True))
+            if container is not None:
+                containers[key] = container
+        return RoaringBitmap(containers)
+
+    def to_ids(self) -> np.ndarray:
+        parts = [(key << 16) + (to_array(container) if container.dtype == np.uint8 else container).astype(np.uint32)
+                 for key, container in sorted(self.containers.items())]
+        return np.concatenate(parts) if parts else np.empty(0, dtype=np.uint32)
+
+    def to_bytes(self) -> bytes:
+        # per container: upper bits, layout and id count, then the little-endian array or the bitset
+        chunks = [struct.pack('<I', len(self.containers))]
+        for key, container in sorted(self.containers.items()):
+            layout = BITSET if container.dtype == np.uint8 else ARRAY
+            chunks.append(CONTAINER.pack(key, layout, cardinality(container)))
+            chunks.append(container.astype('<u2').tobytes() if layout == ARRAY else container.tobytes())
+        return b''.join(chunks)
+
+    @classmethod
+    def from_bytes(cls, raw: bytes, offset: int = 0) -> tuple['RoaringBitmap', int]:
+        # the bitmap and the offset just past it
+        (count,) = struct.unpack_from('<I', raw, offset)
+        offset += 4
+        containers = {}
+        for _ in range(count):
+            key, layout, size = CONTAINER.unpack_from(raw, offset)
+            offset += CONTAINER.size
+            if layout == BITSET:
+                containers[key] = np.frombuffer(raw, dtype=np.uint8, count=BITSET_BYTES, offset=offset).copy()
+                offset += BITSET_BYTES
+            else:
+                containers[key] = np.frombuffer(raw, dtype='<u2', count=size, offset=offset).astype(np.uint16)
+                offset += size * 2
+        return cls(containers), offset
+
+
+# Users of one day by event kind, as bitmaps of user ids. Ids come from `ids`, which maps str(user)
+# to a number, so 42 and '42' are one user like in the start -> success join. Bitmaps of different
+# days can only be combined when they were built with the same `ids`, see app/user_index.py
+class DayUsers:
+    MAGIC = b'FTUSR\0'
+    FORMAT_VERSION = 1
+    HEADER = struct.Struct('<6sH')
+
+    def __init__(self, started: RoaringBitmap, succeed: RoaringBitmap, interrupted: RoaringBitmap):
+        self.started = started
+        self.succeed = succeed
+        self.interrupted = interrupted
+
+    def __getitem__(self, kind: str) -> RoaringBitmap:
+        if kind not in EVENT_KINDS:
+            raise KeyError(kind)
+        return getattr(self, kind)
+
+    @classmethod
+    def from_frame(cls, frame: DayFrame, ids: Interner) -> 'DayUsers':
+        codes = np.array([ids.code(str(user)) for user in frame.users], dtype=np.int64)
+        return cls(*(RoaringBitmap.from_ids(codes[np.unique(frame[kind].user)]) for kind in EVENT_KINDS))
+
+    def to_bytes(self) -> bytes:
+        return self.HEADER.pack(self.MAGIC, self.FORMAT_VERSION) + b''.join(self[kind].to_bytes()
+                                                                          for kind in EVENT_KINDS)
+
+    @classmethod
+    def from_bytes(cls, raw: bytes) -> 'DayUsers':
+        magic, version = cls.HEADER.unpack_from(raw)
+        if magic != cls.MAGIC or version != cls.FORMAT_VERSION:
+            raise ValueError(f"Not a user bitmap file of version {cls.FORMAT_VERSION}")
+        offset = cls.HEADER.size
+        bitmaps = []
+        for _ in EVENT_KINDS:
+            bitmap, offset = RoaringBitmap.from_bytes(raw, offset)
+            bitmaps.append(bitmap)
+        return cls(*bitmaps)
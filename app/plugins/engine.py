@@ -0,0 +1,159 @@
+from typing import Any, Iterable
+
+import numpy as np
+
+from app.frame import DayFrame, EVENT_KINDS, as_frame
+from app.plugins.sketches import DaySketches
+
+# Accumulators a plugin can ask for in its `requires` attribute
+COUNTS = 'counts'
+COIN_SUM = 'coin sum'
+COINS_BY_AGENT = 'coins by agent'
+HOURLY = 'hourly'
+RECHARGES = 'recharges'
+JOINS = 'joins'
+SKETCHES = 'sketches'
+
+# Event kinds each accumulator reads, so metrics can count the events a plugin consumed.
+# Counts are the lengths of the event lists and read no events
+READS = {
+    COUNTS: (),
+    COIN_SUM: ('succeed',),
+    COINS_BY_AGENT: ('succeed',),
+    HOURLY: ('started',),
+    RECHARGES: ('succeed',),
+    JOINS: ('started', 'succeed'),
+    SKETCHES: EVENT_KINDS,
+}
+
+
+def consumed_events(requires: Iterable[str], counts: dict[str, int]) -> int:
+    kinds = {kind for requirement in requires for kind in READS.get(requirement, ())}
+    return sum(counts[kind] for kind in kinds)
+
+
+# Started events keyed by user, so every succeed event finds its start with one array lookup
+class JoinIndex:
+    def __init__(self, frame: DayFrame):
+        self.join_codes = frame.user_join_codes()
+        started_keys = self.join_codes[frame.started.user]
+
+        self.start_counts = np.bincount(started_keys, minlength=len(self.join_codes))
+        first_start = np.full(len(self.join_codes), -1, dtype=np.int64)
+        keys, rows = np.unique(started_keys, return_index=True)
+        first_start[keys] = frame.started.time[rows]
+        self.first_start_time = first_start
+
+    def pair(self, succeed_users: np.ndarray, succeed_times: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        # a pair is only made when the user started exactly one dialog that day
+        keys = self.join_codes[succeed_users]
+        rows = np.flatnonzero(self.start_counts[keys] == 1)
+        return rows, succeed_times[rows] - self.first_start_time[keys[rows]]
+
+
+# Shared accumulators for one day of data, computed from its columnar frame.
+# Each accumulator is only computed once somebody requires it, see ensure()
+class DayStats:
+    def __init__(self, data: dict[str, Any] | DayFrame, requires: Iterable[str] = ()):
+        self.data = data
+        self._frame = None
+        self.requires = set()
+
+        # counts are read straight from the event lists, they never need the frame
+        self.counts = {kind: len(data[kind]) for kind in EVENT_KINDS}
+        self.coin_sum = 0
+        self.coins_by_agent = {}
+        self.hourly = {}
+        self.recharges = []
+        self.joins = None
+        # succeed rows that have a matching start and their recharge times in seconds, see pair_columns()
+        self.paired_rows = np.empty(0, dtype=np.int64)
+        self.paired_seconds = np.empty(0, dtype=np.int64)
+        # bounded-size distinct counts and recharge time quantiles, see DaySketches
+        self.sketches = None
+
+        self.ensure(requires)
+
+    @property
+    def frame(self) -> DayFrame:
+        if self._frame is None:
+            self._frame = as_frame(self.data)
+        return self._frame
+
+    def ensure(self, requires: Iterable[str]) -> None:
+        for requirement in set(requires) - self.requires:
+            self.requires.add(requirement)
+            collector = self.COLLECTORS.get(requirement)
+            if collector:
+                collector(self)
+
+    def _collect_coin_sum(self) -> None:
+        if self._frame is None and not isinstance(self.data, DayFrame):
+            # basic daily info only needs this sum, which is cheaper than building the frame first
+            self.coin_sum = sum(int(entry['coin']) for entry in self.data['succeed'])
+            return
+        self.coin_sum = int(self.frame.succeed.coin.sum())
+
+    def _collect_coins_by_agent(self) -> None:
+        frame = self.frame
+        succeed = frame.succeed
+        sums = np.bincount(succeed.agent, weights=succeed.coin, minlength=len(frame.agents))
+        for code in np.flatnonzero(np.bincount(succeed.agent, minlength=len(frame.agents))):
+            agent = int(frame.agents[code])
+            self.coins_by_agent[agent] = self.coins_by_agent.get(agent, 0) + int(sums[code])
+
+    def _collect_hourly(self) -> None:
+        by_hour = np.bincount(self.frame.started.hours(), minlength=24)
+        self.hourly = {'%02d' % hour: int(by_hour[hour]) for hour in np.flatnonzero(by_hour)}
+
+    def _collect_recharges(self) -> None:
+        users = self.frame.users
+        succeed = self.frame.succeed
+        self.recharges = [{'user': users[user], 'recharge_amount': coin}
+                          for user, coin in zip(succeed.user.tolist(), succeed.coin_list())]
+
+    def _collect_joins(self) -> None:
+        frame = self.frame
+        succeed = frame.succeed
+        if self.joins is None:
+            self.joins = JoinIndex(frame)
+        self.set_pairs(*self.joins.pair(succeed.user, succeed.time))
+
+    def set_pairs(self, rows: np.ndarray, seconds: np.ndarray) -> None:
+        # succeed rows that found their start, in day order, and their recharge times in seconds
+        self.paired_rows = rows
+        self.paired_seconds = seconds
+
+    def pair_columns(self) -> tuple[list, list, list[int]]:
+        # user values, agent values and recharge seconds of the paired succeed events in day order.
+        # Plugins zip over these, so no object is kept per pair
+        frame = self.frame
+        succeed = frame.succeed
+        users, agents = frame.users, frame.agents
+        return ([users[user] for user in succeed.user[self.paired_rows].tolist()],
+                [agents[agent] for agent in succeed.agent[self.paired_rows].tolist()],
+                self.paired_seconds.tolist())
+
+    def _collect_sketches(self) -> None:
+        # read from the join arrays directly, no per-pair objects are made
+        frame = self.frame
+        succeed = frame.succeed
+        if self.joins is None:
+            self.joins = JoinIndex(frame)
+        rows, seconds = self.joins.pair(succeed.user, succeed.time)
+        users, agents = frame.users, frame.agents
+        sketches = DaySketches()
+        sketches.users.add_many(users)
+        sketches.recharged_users.add_many(users[user] for user in np.unique(succeed.user).tolist())
+        sketches.agents.add_many(agents)
+        sketches.add_recharges((agents[agent] for agent in succeed.agent[rows].tolist()), seconds.tolist())
+        self.sketches = sketches
+
+    COLLECTORS = {
+        COIN_SUM: _collect_coin_sum,
+        COINS_BY_AGENT: _collect_coins_by_agent,
+        HOURLY: _collect_hourly,
+        RECHARGES: _collect_recharges,
+        JOINS: _collect_joins,
+        SKETCHES: _collect_sketches,
+    }
@@ -0,0 +1,35 @@
+from collections.abc import Mapping
+
+from app.plugins.engine import consumed_events
+from app.plugins.metrics import RunMetrics
+from app.plugins.plugins import PluginInterface
+from app.plugins.results import AnalysisResult
+
+
+# Analysis results that compute each plugin's entry on first access and keep it for the loaded day.
+# All entries share one stats object, so accumulators are still built at most once
+class LazyResults(Mapping):
+    def __init__(self, plugins: list[PluginInterface], stats, metrics: RunMetrics = None):
+        self.plugins = {plugin.name: plugin for plugin in plugins}
+        self.stats = stats
+        self.metrics = metrics or RunMetrics()
+        self._results = {}
+
+    def __getitem__(self, key: str) -> AnalysisResult:
+        if key not in self._results:
+            plugin = self.plugins[key]
+            # accumulators built for this entry are counted towards it
+            with self.metrics.measure(key, consumed_events(plugin.requires, self.stats.counts)):
+                self.stats.ensure(plugin.requires)
+                self._results[key] = plugin.collect(self.stats)[key]
+        return self._results[key]
+
+    def __iter__(self):
+        return iter(self.plugins)
+
+    def __len__(self):
+        return len(self.plugins)
+
+    def describe(self) -> dict[str, dict[str, str]]:
+        # what menus need to list the entries, without computing any of them
+        return {key: {'desc': plugin.desc, 'type': plugin.type} for key, plugin in self.plugins.items()}
@@ -0,0 +1,206 @@
+import json
+import os
+from collections import deque
+from typing import Any, Iterable, Iterator
+
+import config
+from app.plugins.sketches import DaySketches
+from app.utils.timestamps import to_seconds
+from app.loaders.http import HttpClient
+
+
+# The attributes DayStats exposes, kept up to date event by event, so a refresh costs the number of
+# new events. Events are not kept: there are running totals, per-user join state, per-agent running
+# means, distinct count sketches and a window of the latest LIVE_RECENT_RECHARGES recharges, which is
+# all recharged users lists in live mode. The recharge times of users that can still be paired are the
+# one exception, a second start withdraws them from the percentiles and a sketch can not take values
+# back out. They are dropped as soon as the user starts again
+class LiveStats:
+    def __init__(self, recent_recharges: int = None):
+        self.counts = {'started': 0, 'succeed': 0, 'interrupted': 0}
+        self.coin_sum = 0
+        self.coins_by_agent = {}
+        self.hourly = {}
+        self.recent_recharges = deque(maxlen=recent_recharges or config.LIVE_RECENT_RECHARGES)
+
+        # start -> success joins: starts per user, first start time, and the first and the last succeed
+        # of every raw user id
+        self.start_counts = {}
+        self.start_times = {}
+        self.succeeds = {}
+        # (agent, succeed seconds) of users with at most one start, read when sketches are asked for
+        self.user_recharges = {}
+        # running per-agent recharge time over the users that are currently paired
+        self.agent_seconds = {}
+        self.agent_counts = {}
+        self._contributions = {}
+        self._sequence = 0
+        self._sketches = DaySketches()
+
+    def ensure(self, requires) -> None:
+        # every accumulator is always kept up to date
+        pass
+
+    @property
+    def recharges(self) -> list[dict[str, Any]]:
+        return list(self.recent_recharges)
+
+    def feed(self, events: Iterable[tuple[str, dict[str, Any]]]) -> int:
+        fed = 0
+        for kind, entry in events:
+            self.add(kind, entry)
+            fed += 1
+        return fed
+
+    def add(self, kind: str, entry: dict[str, Any]) -> None:
+        self.counts[kind] += 1
+        self._sketches.users.add(entry['user'])
+        if 'agent' in entry:
+            self._sketches.agents.add(entry['agent'])
+        if kind == 'started':
+            self._add_started(entry)
+        elif kind == 'succeed':
+            self._add_succeed(entry)
+
+    def _add_started(self, entry: dict[str, Any]) -> None:
+        seconds = to_seconds(entry['time'])
+        hour = '%02d' % (seconds // 3600 % 24)
+        self.hourly[hour] = self.hourly.get(hour, 0) + 1
+
+        user = str(entry['user'])
+        count = self.start_counts.get(user, 0) + 1
+        self.start_counts[user] = count
+        if count == 1:
+            self.start_times[user] = seconds
+        elif count == 2:
+            self.user_recharges.pop(user, None)
+        # a second start unpairs the user, the same rule the batch join applies
+        for raw_user, (first, last) in self.succeeds.get(user, {}).items():
+            if count == 1:
+                self._contribute(raw_user, last[1], last[2] - seconds)
+            elif count == 2:
+                self._contribute(raw_user, None, 0)
+
+    def _add_succeed(self, entry: dict[str, Any]) -> None:
+        coin = int(entry['coin'])
+        agent = entry['agent']
+        self.coin_sum += coin
+        self.coins_by_agent[int(agent)] = self.coins_by_agent.get(int(agent), 0) + coin
+        self.recent_recharges.append({'user': entry['user'], 'recharge_amount': entry['coin']})
+
+        user = str(entry['user'])
+        seconds = to_seconds(entry['time'])
+        record = (self._sequence, agent, seconds)
+        self._sequence += 1
+        by_raw_user = self.succeeds.setdefault(user, {})
+        first, _ = by_raw_user.get(entry['user'], (record, None))
+        by_raw_user[entry['user']] = (first, record)
+        self._sketches.recharged_users.add(entry['user'])
+
+        count = self.start_counts.get(user, 0)
+        if count <= 1:
+            self.user_recharges.setdefault(user, []).append((agent, seconds))
+        if count == 1:
+            self._contribute(entry['user'], agent, seconds - self.start_times[user])
+
+    def _contribute(self, raw_user: Any, agent: Any, seconds: int) -> None:
+        # replace the user's share in the per-agent running means, agent None removes it
+        previous = self._contributions.pop(raw_user, None)
+        if previous is not None:
+            self.agent_seconds[previous[0]] -= previous[1]
+            self.agent_counts[previous[0]] -= 1
+            if not self.agent_counts[previous[0]]:
+                del self.agent_seconds[previous[0]], self.agent_counts[previous[0]]
+        if agent is not None:
+            self._contributions[raw_user] = (agent, seconds)
+            self.agent_seconds[agent] = self.agent_seconds.get(agent, 0) + seconds
+            self.agent_counts[agent] = self.agent_counts.get(agent, 0) + 1
+
+    def agent_means(self) -> dict[Any, float]:
+        # mean recharge time by agent over the last succeed of every paired user, like RechargeTimeByAgent
+        return {agent: self.agent_seconds[agent] / count for agent, count in self.agent_counts.items()}
+
+    def pair_columns(self) -> tuple[list, list, list[int]]:
+        # rebuilt in succeed order only when a detailed plugin asks for it, which costs the number of
+        # users. A user started more than once is not paired, the same rule the batch join applies.
+        # The first and the last succeed of each raw user are enough for both recharge time plugins
+        # to read it like a batch join
+        rows = []
+        for user, by_raw_user in self.succeeds.items():
+            if self.start_counts.get(user) != 1:
+                continue
+            started = self.start_times[user]
+            for raw_user, (first, last) in by_raw_user.items():
+                for sequence, agent, seconds in {first, last}:
+                    rows.append((sequence, raw_user, agent, seconds - started))
+        rows.sort(key=lambda row: row[0])
+        return [row[1] for row in rows], [row[2] for row in rows], [row[3] for row in rows]
+
+    @property
+    def sketches(self) -> DaySketches:
+        # distinct counts are copied from the running sketches, recharge times are added in one go
+        sketches = DaySketches().merge(self._sketches)
+        agents, seconds = [], []
+        for user, recharges in self.user_recharges.items():
+            if self.start_counts.get(user) != 1:
+                continue
+            started = self.start_times[user]
+            for agent, succeed_seconds in recharges:
+                agents.append(agent)
+                seconds.append(succeed_seconds - started)
+        sketches.add_recharges(agents, seconds)
+        return sketches
+
+
+# Reads the records appended to a JSON Lines day since the last call
+class FileTail:
+    def __init__(self, path: str, cursor: int = 0):
+        self.path = path
+        self.cursor = cursor
+
+    def read_new(self) -> Iterator[tuple[str, dict[str, Any]]]:
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'rb') as file:
+            file.seek(self.cursor)
+            for line in file:
+                # a line without its newline is still being written, pick it up next time
+                if not line.endswith(b'\n'):
+                    break
+                self.cursor += len(line)
+                if line.strip():
+                    record = json.loads(line)
+                    yield record['kind'], record['event']
+
+
+# Reads the events the API added to the day since the previous poll. With LIVE_API_CURSOR set, the API
+# is asked only for events after the cursor it handed out with its previous response. Without it the
+# API sends the whole day on every poll, so a poll downloads and parses the whole day, and only the
+# events past the ones already read are fed on
+class ApiTail:
+    def __init__(self, day: str = None, client: HttpClient = None, cursor: Any = None):
+        self.day = day
+        # a client of its own without the response cache, a cached body would hide new events
+        self.client = client or HttpClient(cache_ttl=0, cache_dir=None)
+        self.cursor = cursor
+        # events read so far by kind, for an API without a cursor
+        self.seen = {}
+
+    def read_new(self) -> Iterator[tuple[str, dict[str, Any]]]:
+        params = {}
+        if self.day:
+            params['day'] = self.day
+        if config.LIVE_API_CURSOR and self.cursor is not None:
+            params[config.LIVE_API_CURSOR] = self.cursor
+        response = self.client.get_json(params=params)
+        cursor = response.get('cursor') if config.LIVE_API_CURSOR else None
+        for kind, entries in response['data'].items():
+            if cursor is None:
+                # the day comes back from its first event and only the tail is new
+                read = self.seen.get(kind, 0)
+                self.seen[kind] = max(read, len(entries))
+                entries = entries[read:]
+            for entry in entries:
+                yield kind, entry
+        if cursor is not None:
+            self.cursor = cursor
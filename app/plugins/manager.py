@@ -1,13 +1,55 @@
+import config
+from app.frame import EVENT_KINDS
+from app.plugins.engine import DayStats, consumed_events
+from app.plugins.lazy import LazyResults
+from app.plugins.metrics import RunMetrics
 from app.plugins.plugins import PluginInterface
+from app.plugins.shards import ShardedStats, sharded_stats
 
 
 class PluginManager():
     def __init__(self, plugins: list[PluginInterface]):
         self.plugins = plugins
 
-    def analyse_data(self, data: dict):
+    def analyse_data(self, data: dict, metrics: RunMetrics = None, shards: int = None):
+        # read every event list once and let all plugins share the accumulators.
+        # A big day is split by user across `shards` processes, ANALYSIS_WORKERS by default
+        requires = set()
+        for plugin in self.plugins:
+            requires.update(plugin.requires)
+        counts = {kind: len(data[kind]) for kind in EVENT_KINDS}
+        events = sum(counts.values())
+        shards = config.ANALYSIS_WORKERS if shards is None else shards
+        if metrics is None:
+            return self.collect(self.stats(data, requires, events, shards))
+        with metrics.measure('shared accumulators', consumed_events(requires, counts)):
+            stats = self.stats(data, requires, events, shards)
+        return self.collect(stats, metrics=metrics)
+
+    @staticmethod
+    def sharding(events: int, shards: int) -> bool:
+        return shards > 1 and events >= config.SHARD_MIN_EVENTS
+
+    @classmethod
+    def stats(cls, data: dict, requires: set[str], events: int, shards: int) -> DayStats:
+        if cls.sharding(events, shards):
+            return sharded_stats(data, requires, shards)
+        return DayStats(data, requires)
+
+    def analyse_lazily(self, data: dict, metrics: RunMetrics = None, shards: int = None) -> LazyResults:
+        # nothing is computed until an entry is read. Entries of a big day are split into shards when read
+        events = sum(len(data[kind]) for kind in EVENT_KINDS)
+        shards = config.ANALYSIS_WORKERS if shards is None else shards
+        stats = ShardedStats(data, shards=shards) if self.sharding(events, shards) else DayStats(data)
+        return LazyResults(self.plugins, stats, metrics=metrics)
+
+    def collect(self, stats: DayStats, metrics: RunMetrics = None) -> dict:
+        # stats can be a DayStats or anything exposing the same accumulators, like LiveStats
         analysis_result = {}
         for plugin in self.plugins:
-            analysis_result.update(plugin.analyze(data))
+            if metrics is None:
+                analysis_result.update(plugin.collect(stats))
+                continue
+            with metrics.measure(plugin.name, consumed_events(plugin.requires, stats.counts)):
+                analysis_result.update(plugin.collect(stats))
         return analysis_result
-
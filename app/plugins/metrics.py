@@ -0,0 +1,89 @@
+import cProfile
+import io
+import json
+import pstats
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Any
+
+import config
+
+
+# Timings and allocation figures gathered while loading and analysing one day
+class RunMetrics:
+    def __init__(self, source: str = '', trace_memory: bool = None):
+        self.source = source
+        self.trace_memory = config.METRICS_TRACE_MEMORY if trace_memory is None else trace_memory
+        self.loader = {'bytes': 0, 'parse_seconds': 0.0}
+        self.plugins = {}
+
+    def record_load(self, bytes_read: int, parse_seconds: float) -> None:
+        self.loader = {'bytes': bytes_read, 'parse_seconds': parse_seconds}
+
+    @contextmanager
+    def measure(self, name: str, events: int):
+        # `events` is the number of events the measured step consumed, see engine.consumed_events.
+        # tracemalloc may already be running for an outer measurement, only the owner stops it
+        owns_tracing = self.trace_memory and not tracemalloc.is_tracing()
+        if owns_tracing:
+            tracemalloc.start()
+        elif self.trace_memory:
+            tracemalloc.reset_peak()
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            peak = None
+            if self.trace_memory:
+                peak = tracemalloc.get_traced_memory()[1]
+                if owns_tracing:
+                    tracemalloc.stop()
+            self.plugins[name] = {
+                'wall_seconds': time.perf_counter() - wall_start,
+                'cpu_seconds': time.process_time() - cpu_start,
+                'events': events,
+                'peak_bytes': peak,
+            }
+
+    def to_dict(self) -> dict[str, Any]:
+        return {'source': self.source, 'loader': self.loader, 'plugins': self.plugins}
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), indent=2)
+
+    def to_prometheus(self) -> str:
+        source = prometheus_label(self.source)
+        lines = [
+            '# HELP fast_top_loader_bytes Bytes read by the loader',
+            '# TYPE fast_top_loader_bytes gauge',
+            f'fast_top_loader_bytes{{source="{source}"}} {self.loader["bytes"]}',
+            '# HELP fast_top_loader_parse_seconds Time spent loading and parsing the source',
+            '# TYPE fast_top_loader_parse_seconds gauge',
+            f'fast_top_loader_parse_seconds{{source="{source}"}} {self.loader["parse_seconds"]}',
+        ]
+        for metric, help_text in (('wall_seconds', 'Wall time spent in a plugin'),
+                                  ('cpu_seconds', 'CPU time spent in a plugin'),
+                                  ('events', 'Events the plugin consumed'),
+                                  ('peak_bytes', 'Peak traced allocation while the plugin ran')):
+            lines.append(f'# HELP fast_top_plugin_{metric} {help_text}')
+            lines.append(f'# TYPE fast_top_plugin_{metric} gauge')
+            for name, values in self.plugins.items():
+                if values[metric] is not None:
+                    lines.append(f'fast_top_plugin_{metric}{{source="{source}",plugin="{prometheus_label(name)}"}} '
+                                 f'{values[metric]}')
+        return '\n'.join(lines) + '\n'
+
+
+def prometheus_label(value: str) -> str:
+    # label values are quoted, so backslashes, quotes and newlines are escaped as the text format asks
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def profile_plugin(plugin, data, limit: int = 25) -> str:
+    # full cProfile run of one plugin on a day, sorted by cumulative time
+    profiler = cProfile.Profile()
+    profiler.runcall(plugin.analyze, data)
+    output = io.StringIO()
+    pstats.Stats(profiler, stream=output).sort_stats('cumulative').print_stats(limit)
+    return output.getvalue()
@@ -1,240 +1,345 @@
 from abc import ABC, abstractmethod
-from collections import defaultdict
-from datetime import datetime, timezone
 from typing import Any
 
+from app.frame import DayFrame
+from app.plugins.bitmaps import DayUsers, RoaringBitmap
+from app.plugins.engine import DayStats, COUNTS, COIN_SUM, COINS_BY_AGENT, HOURLY, RECHARGES, JOINS, SKETCHES
+from app.plugins.results import AnalysisResult
+from app.plugins.sketches import DaySketches, PERCENTILES
+
+
+# hook every capability flag promises, see PluginBase
+CAPABILITY_HOOKS = {'rollup': 'from_rollup', 'mergeable': 'from_sketches', 'cross_day': 'from_bitmaps'}
+
+
+class PluginBase(ABC):
+    # key of the plugin's entry in the analysis results, its description and 'basic' or 'detailed'
+    name: str
+    desc: str
+    type: str
+    # bump when the result of a plugin changes, so cached results are recomputed
+    version: int = 1
+    # plugins that can be computed from summed counts get their graphs from the rollup store, via from_rollup
+    rollup: bool = False
+    # plugins computed from DaySketches can answer a range of days by merging per-day sketches, via from_sketches
+    mergeable: bool = False
+    # plugins computed from DayUsers answer questions across days from the saved user bitmaps, via from_bitmaps
+    cross_day: bool = False
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # callers check the flags before calling a hook, so a flag without its hook is a mistake in the plugin
+        for flag, hook in CAPABILITY_HOOKS.items():
+            if getattr(cls, flag) and not hasattr(cls, hook):
+                raise TypeError(f"{cls.__name__} sets {flag} but does not define {hook}")
+
+    @classmethod
+    def result(cls, args: Any) -> dict[str, AnalysisResult]:
+        # args must be plain data, see AnalysisResult. Rendering is registered in app/clients/renderers.py
+        return {cls.name: AnalysisResult(cls.name, args, cls.desc, cls.type)}
+
+
+# Plugins with a result for every single day, listed in plugins
+class PluginInterface(PluginBase):
+    # accumulators this plugin reads from DayStats
+    requires: tuple[str, ...] = (COUNTS,)
+
+    @classmethod
+    def analyze(cls, data: dict[str, Any] | DayFrame) -> dict[str, AnalysisResult]:
+        return cls.collect(DayStats(data, cls.requires))
+
+    @classmethod
+    @abstractmethod
+    def collect(cls, stats: DayStats) -> dict[str, AnalysisResult]:
+        pass
+
+
+# Plugins answering a range of days from the saved user bitmaps. They have no result for a single day
+# and are listed in cross_day_plugins, not in plugins
+class RangePlugin(PluginBase):
+    cross_day = True
 
-class PluginInterface(ABC):
+    @classmethod
     @abstractmethod
-    def analyze(self, data: list[dict[str, Any]]) -> dict[str, Any]:
+    def from_bitmaps(cls, days: list[tuple[str, DayUsers]]) -> dict[str, AnalysisResult]:
+        # `days` are (DD.MM.YYYY, users) in date order, all numbered by the same user ids
         pass
 
 
 class DialogsCreated(PluginInterface):
-    @staticmethod
-    def analyze(data: list[dict[str, Any]]):
-        def prettify(data: int) -> None:
-            print(f"Number of dialogs created: {data}")
+    name = 'dialogs created'
+    desc = "Number of dialogs created"
+    type = "basic"
+    rollup = True
 
+    @classmethod
+    def collect(cls, stats: DayStats) -> dict[str, AnalysisResult]:
         # calculate total amount of entries in data['started']
-        return {
-            'dialogs created':
-                {
-            'args': len(data['started']),
-            'func': prettify,
-            'desc':  "Number of dialogs created",
-            'type': "basic"
-                }
-        }
+        return cls.result(stats.counts['started'])
+
+    @classmethod
+    def from_rollup(cls, bucket: dict[str, int]) -> Any:
+        return bucket['started']
+
 
 class SuccessRechargePlugin(PluginInterface):
-    @staticmethod
-    def analyze(data: list[dict[str, Any]]) -> dict[str, Any]:
-        def prettify(data: int) -> None:
-            print(f"Total successful top-ups: {data}")
+    name = 'Successful recharges'
+    desc = "Total successful top-ups"
+    type = "basic"
+    rollup = True
 
+    @classmethod
+    def collect(cls, stats: DayStats) -> dict[str, AnalysisResult]:
         # calculate total amount of entries in data['succeed']
-        return {'Successful recharges':{
-            'args': len(data['succeed']),
-            'func': prettify,
-            'desc': "Total successful top-ups",
-            'type': "basic"}
-        }
+        return cls.result(stats.counts['succeed'])
 
+    @classmethod
+    def from_rollup(cls, bucket: dict[str, int]) -> Any:
+        return bucket['succeed']
 
-class RechargedAmountPlugin(PluginInterface):
-    @staticmethod
-    def analyze(data: list[dict[str, Any]]) -> dict[str, Any]:
-        def prettify(data: int) -> None:
-            print(f"Recharged amount: {data}")
 
+class RechargedAmountPlugin(PluginInterface):
+    name = 'total recharged amount'
+    desc = "Total recharged amount"
+    type = "basic"
+    requires = (COIN_SUM,)
+    rollup = True
+
+    @classmethod
+    def collect(cls, stats: DayStats) -> dict[str, AnalysisResult]:
         # calculate sum of all entries in data['succeed']['coin']
-        return {'total recharged amount':
-                    {'args': sum([int(entry["coin"]) for entry in data["succeed"]]),
-                     'func':  prettify,
-                     'desc': "Total recharged amount",
-                     'type': "basic"}
-                }
+        return cls.result(stats.coin_sum)
+
+    @classmethod
+    def from_rollup(cls, bucket: dict[str, int]) -> Any:
+        return bucket['coins']
 
 
 class FailedRechargePlugin(PluginInterface):
-    @staticmethod
-    def analyze(data: list[dict[str, Any]]) -> dict[str, Any]:
-        def prettify(data: int) -> None:
-            print(f"Recharges failed: {data}")
+    name = 'failed_recharges'
+    desc = "Number of dialogs interrupted"
+    type = "basic"
+    rollup = True
 
+    @classmethod
+    def collect(cls, stats: DayStats) -> dict[str, AnalysisResult]:
         # calculate total amount of entries in data['failed']
-        return {'failed_recharges':
-                    {'args': len(data['interrupted']),
-                     'func': prettify,
-                     'desc': "Number of dialogs interrupted",
-                     'type': "basic"}
-                }
+        return cls.result(stats.counts['interrupted'])
+
+    @classmethod
+    def from_rollup(cls, bucket: dict[str, int]) -> Any:
+        return bucket['interrupted']
 
 
 class RechargedUsers(PluginInterface):
-    @staticmethod
-    def analyze(data: list[dict[str, Any]]) -> dict[str, Any]:
-        def prettify(user_list: list) -> None:
-            print(f"Recharged users list: ")
-            for user in user_list:
-                print(f"User ID {user['user']} recharged {user['recharge_amount']} coins")
-
-        # get list of 'user' entries in data['succeed']
-        users = [{'user': entry['user'], 'recharge_amount': entry['coin']} for entry in data['succeed']]
-        return {'recharged users':
-                    {'args': users,
-                     'func': prettify,
-                     'desc': "User recharge details",
-                     'type': "detailed"}
-                }
+    name = 'recharged users'
+    desc = "User recharge details"
+    type = "detailed"
+    requires = (RECHARGES,)
 
+    @classmethod
+    def collect(cls, stats: DayStats) -> dict[str, AnalysisResult]:
+        # list of 'user' entries in data['succeed'] is collected by the shared pass
+        return cls.result(stats.recharges)
 
-class AgentRecharges(PluginInterface):
-    @staticmethod
-    def analyze(data: list[dict[str, Any]]) -> dict[str, Any]:
-        def prettify(agent_list: list) -> None:
-            for agent in agent_list:
-                print(f"Agent {agent['agent']} recharged {agent['coins']} coins")
 
-        # get list of 'agent' entries in data['succeed']
-        agents = [{'agent': entry['agent'], 'coin': entry['coin']} for entry in data['succeed']]
+class AgentRecharges(PluginInterface):
+    name = 'agent recharges'
+    desc = "Agent recharge details"
+    type = "detailed"
+    requires = (COINS_BY_AGENT,)
 
+    @classmethod
+    def collect(cls, stats: DayStats) -> dict[str, AnalysisResult]:
         # get list of agents and their total amount of coins
-        agents = list(set([int(agent['agent']) for agent in agents]))
-        new_result = [{'agent': agent, 'coins': sum([entry['coin'] for entry in data['succeed'] if int(entry['agent']) == agent])} for agent in agents]
+        agents = list(set(stats.coins_by_agent))
+        new_result = [{'agent': agent, 'coins': stats.coins_by_agent[agent]} for agent in agents]
 
-        return {'agent recharges':
-                    {'args': new_result,
-                     'func': prettify,
-                     'desc': "Agent recharge details",
-                     'type': "detailed"}
-                }
+        return cls.result(new_result)
 
 
 class DialogsByTime(PluginInterface):
     # Ananlyze how many dialogs were created in each hour
-    @staticmethod
-    def analyze(data: list[dict[str, Any]]) -> dict[str, Any]:
-        def prettify(data: list) -> None:
-            print("New dialogs created by time:")
-            for line in data:
-                print(line)
-
-        count_by_hour = defaultdict(int)
-
-        for entry in data['started']:
-            hour = datetime.fromisoformat(entry['time']).strftime('%H')
-            count_by_hour[hour] += 1
-
-        result = [{'%02d' % int(hour): count} for hour, count in count_by_hour.items()]
+    name = 'dialogs created by time'
+    desc = "Sort dialogs by time"
+    type = "detailed"
+    requires = (HOURLY,)
+
+    @classmethod
+    def collect(cls, stats: DayStats) -> dict[str, AnalysisResult]:
+        result = [{'%02d' % int(hour): count} for hour, count in stats.hourly.items()]
         result = sorted(result, key=lambda x: next(iter(x)))
 
-        return {'dialogs created by time': {'args': result, 'func': prettify, 'desc': "Sort dialogs by time", 'type': "detailed"}}
+        return cls.result(result)
 
 
 class RechargeTime(PluginInterface):
-    @staticmethod
-    def analyze(data: dict[str, Any]) -> dict[str, Any]:
-        def prettify(data: dict) -> None:
-            timedeltas = []
-            for user, time_difference in data.items():
-                print(f"{user}: recharge time = {time_difference.total_seconds()} secs")
-                timedeltas.append(time_difference)
-
-            total_seconds = sum(delta.total_seconds() for delta in timedeltas)
-            average_seconds = total_seconds / len(timedeltas)
-            print(f"\nAverage recharge time = {average_seconds} secs")
-
-        started_entries = data['started']
-        succeed_entries = data['succeed']
-
+    name = 'recharge time by user'
+    desc = "Recharge time by user"
+    type = "detailed"
+    requires = (JOINS,)
+    # recharge times are seconds instead of timedeltas
+    version = 2
+
+    @classmethod
+    def collect(cls, stats: DayStats) -> dict[str, AnalysisResult]:
         user_times = {}  # Dictionary to store time difference for each user
 
-        for entry in succeed_entries:
-            user = str(entry['user'])  # Convert user ID to string for comparison
+        users, _, seconds = stats.pair_columns()
+        for user, delta in zip(users, seconds):
+            user = str(user)  # Convert user ID to string for comparison
 
             if user in user_times:
                 continue  # Skip if user already processed
+            user_times[user] = float(delta)
 
-            matching_started_entries = [started for started in started_entries if str(started['user']) == user]
-
-            if len(matching_started_entries) == 1:
-                started_time = datetime.strptime(matching_started_entries[0]['time'], "%Y-%m-%dT%H:%M:%S%z").replace(tzinfo=None)
-                succeed_time = datetime.strptime(entry['time'], "%Y-%m-%d %H:%M:%S")
-                time_difference = succeed_time - started_time
-                user_times[user] = time_difference
-
-        return {'recharge time by user':
-                    {'args': user_times,
-                     'func': prettify,
-                     'desc': "Recharge time by user",
-                     'type': "detailed"
-                     }
-                }
+        return cls.result(user_times)
 
 
 class AgentAverageRechargeTime(PluginInterface):
-    @staticmethod
-    def analyze(data: dict[str, Any]) -> dict[str, Any]:
-        def prettify(agents: dict) -> None:
-            average_seconds = {}
-            count = {}
-            for key, value in agents.items():
-                time_difference = value['time_difference']
-                seconds = time_difference.total_seconds()
-                key_id = value['id:']
-                if key_id not in average_seconds:
-                    average_seconds[key_id] = seconds
-                    count[key_id] = 1
-                else:
-                    average_seconds[key_id] += seconds
-                    count[key_id] += 1
-
-            print("\nAverage recharge time by agent:")
-            # Calculate the average seconds for each key
-            for key, value in average_seconds.items():
-                average = value / count[key]
-                print(f"{key}: {average} seconds")
-
-        started_entries = data['started']
-        succeed_entries = data['succeed']
-
+    name = 'recharge time by agent'
+    desc = "Average recharge time by agent"
+    type = "detailed"
+    requires = (JOINS,)
+    # recharge times are seconds instead of timedeltas
+    version = 2
+
+    @classmethod
+    def collect(cls, stats: DayStats) -> dict[str, AnalysisResult]:
         agent_times = {}  # Dictionary to store time difference for each user
 
-        for entry in succeed_entries:
-            user = str(entry['user'])  # Convert user ID to string for comparison
-
-            matching_started_entries = [started for started in started_entries if str(started['user']) == user]
+        # only the last pair of a user is kept, so earlier ones are skipped before anything is built for them
+        users, agents, seconds = stats.pair_columns()
+        last = {user: position for position, user in enumerate(users)}
+        for user, position in last.items():
+            agent_times[user] = {'id:': agents[position], 'user': user, 'time_difference': float(seconds[position])}
 
-            if len(matching_started_entries) == 1:
-                started_time = datetime.strptime(matching_started_entries[0]['time'], "%Y-%m-%dT%H:%M:%S%z").replace(
-                    tzinfo=None)
-                succeed_time = datetime.strptime(entry['time'], "%Y-%m-%d %H:%M:%S")
-                time_difference = succeed_time - started_time
-                agent_times[entry['user']] = {'id:':  entry['agent'], 'user': entry['user'], 'time_difference': time_difference}
-
-        return {'recharge time by agent': {'args': agent_times,
-                                           'func': prettify,
-                                           'desc': "Average recharge time by agent",
-                                           'type': "detailed"
-                                           }
-                }
+        return cls.result(agent_times)
 
 
 class ChannelEffectiveness(PluginInterface):
-    @staticmethod
-    def analyze(data: dict[str, Any]) -> dict[str, Any]:
-        def prettify(effectiveness: float) -> None:
-            print(f"Channel effectiveness: {effectiveness:.1%}")
+    name = 'channel effectiveness'
+    desc = "Channel effectiveness"
+    type = "basic"
+    rollup = True
 
-        started_count = len(data['started'])
-        succeed_count = len(data['succeed'])
+    @classmethod
+    def collect(cls, stats: DayStats) -> dict[str, AnalysisResult]:
+        started_count = stats.counts['started']
+        succeed_count = stats.counts['succeed']
 
         effectiveness_ratio = succeed_count / started_count if started_count > 0 else 0
-        return {'channel effectiveness': {'args': effectiveness_ratio,
-                                          'func': prettify,
-                                          'desc': "Channel effectiveness",
-                                          'type': "basic"
-                                          }
-                }
\ No newline at end of file
+        return cls.result(effectiveness_ratio)
+
+    @classmethod
+    def from_rollup(cls, bucket: dict[str, int]) -> Any:
+        return bucket['succeed'] / bucket['started'] if bucket['started'] > 0 else 0
+
+
+class DistinctUsers(PluginInterface):
+    name = 'distinct users'
+    desc = "Distinct users and agents (approximate)"
+    type = "detailed"
+    requires = (SKETCHES,)
+    mergeable = True
+
+    @classmethod
+    def collect(cls, stats: DayStats) -> dict[str, AnalysisResult]:
+        return cls.from_sketches(stats.sketches)
+
+    @classmethod
+    def from_sketches(cls, sketches: DaySketches) -> dict[str, AnalysisResult]:
+        result = {
+            'users': round(sketches.users.estimate()),
+            'recharged users': round(sketches.recharged_users.estimate()),
+            'agents': round(sketches.agents.estimate()),
+        }
+        return cls.result(result)
+
+
+class RechargeTimePercentiles(PluginInterface):
+    # tail recharge times, which the average by agent hides
+    name = 'recharge time percentiles'
+    desc = "Recharge time percentiles by agent (approximate)"
+    type = "detailed"
+    requires = (SKETCHES,)
+    mergeable = True
+
+    @classmethod
+    def collect(cls, stats: DayStats) -> dict[str, AnalysisResult]:
+        return cls.from_sketches(stats.sketches)
+
+    @classmethod
+    def from_sketches(cls, sketches: DaySketches) -> dict[str, AnalysisResult]:
+        def summarize(sketch) -> dict[str, Any]:
+            values = sketch.quantiles(PERCENTILES)
+            summary = {f"p{round(fraction * 100)}": value for fraction, value in zip(PERCENTILES, values)}
+            summary['count'] = sketch.count
+            return summary
+
+        result = {'all agents': summarize(sketches.recharge_seconds)}
+        for agent in sorted(sketches.agent_seconds, key=lambda agent: (len(agent), agent)):
+            result[agent] = summarize(sketches.agent_seconds[agent])
+        return cls.result(result)
+
+
+class CohortRetention(RangePlugin):
+    # every day's recharging users are a cohort, followed through the later days of the range
+    name = 'cohort retention'
+    desc = "Recharging users coming back on later days"
+    type = "detailed"
+
+    @classmethod
+    def from_bitmaps(cls, days: list[tuple[str, DayUsers]]) -> dict[str, AnalysisResult]:
+        # came back means started a dialog on a later day, recharged means recharged on a later day
+        result = []
+        later_started = RoaringBitmap()
+        later_succeed = RoaringBitmap()
+        for position in reversed(range(len(days))):
+            day, users = days[position]
+            cohort = users.succeed
+            result.append({
+                'date': day,
+                'cohort': len(cohort),
+                'came back': len(cohort & later_started),
+                'recharged again': len(cohort & later_succeed),
+                'by day': [{'date': later_day,
+                            'came back': len(cohort & later.started),
+                            'recharged': len(cohort & later.succeed)}
+                           for later_day, later in days[position + 1:]],
+            })
+            later_started = later_started | users.started
+            later_succeed = later_succeed | users.succeed
+        result.reverse()
+        return cls.result(result)
+
+
+class RepeatRecharges(RangePlugin):
+    name = 'repeat recharges'
+    desc = "Users recharging on more than one day"
+    type = "detailed"
+
+    @classmethod
+    def from_bitmaps(cls, days: list[tuple[str, DayUsers]]) -> dict[str, AnalysisResult]:
+        # at_least[level] holds the users that recharged on at least level + 1 of the days seen so far.
+        # Levels are moved up from the top down, so a day counts only once for every user
+        at_least = [RoaringBitmap()]
+        for _, users in days:
+            for level in reversed(range(len(at_least))):
+                repeated = at_least[level] & users.succeed
+                if level + 1 < len(at_least):
+                    at_least[level + 1] = at_least[level + 1] | repeated
+                elif len(repeated):
+                    at_least.append(repeated)
+            at_least[0] = at_least[0] | users.succeed
+
+        counts = [len(users) for users in at_least] + [0]
+        recharged = counts[0]
+        result = {
+            'recharged users': recharged,
+            'repeat users': counts[1],
+            'repeat share': counts[1] / recharged if recharged else 0,
+            'users by recharge days': [{'days': level + 1, 'users': counts[level] - counts[level + 1]}
+                                       for level in range(len(at_least)) if counts[level] > counts[level + 1]],
+        }
+        return cls.result(result)
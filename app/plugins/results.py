@@ -0,0 +1,21 @@
+from dataclasses import dataclass
+from typing import Any
+
+
+# What a plugin computed for one day or range, as plain data only: numbers, strings, lists and dicts,
+# with durations in seconds. It pickles and serialises to JSON as it is, so it can come back from a
+# worker process or the result cache. Displaying it is up to app/clients/renderers.py, keyed by `plugin`
+@dataclass(frozen=True)
+class AnalysisResult:
+    # name of the plugin that made the result
+    plugin: str
+    args: Any
+    desc: str
+    type: str
+
+    def to_dict(self) -> dict[str, Any]:
+        return {'plugin': self.plugin, 'args': self.args, 'desc': self.desc, 'type': self.type}
+
+    @classmethod
+    def from_dict(cls, value: dict[str, Any]) -> 'AnalysisResult':
+        return cls(value['plugin'], value['args'], value['desc'], value['type'])
@@ -0,0 +1,131 @@
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from typing import Any, Iterable
+
+import numpy as np
+
+from app.frame import DayFrame, EVENT_KINDS, MISSING, as_frame
+from app.plugins.engine import DayStats, JoinIndex, COIN_SUM, COINS_BY_AGENT, HOURLY, RECHARGES, JOINS, SKETCHES
+
+# accumulators a ShardedStats computes in the shards. The coin sum of the basic entries is cheaper read
+# from the events in one pass, recharges are always listed by the parent
+SHARDED = {COINS_BY_AGENT, HOURLY, JOINS, SKETCHES}
+
+
+def shard_frame(frame: DayFrame, shards: int) -> list[tuple[DayFrame, np.ndarray]]:
+    # Splits a day by user into `shards` frames, each with the succeed rows it took from the whole day.
+    # Users go by their join code, so every start and success of a user (42 and '42' alike) lands in
+    # the same shard and each shard pairs its own events exactly like the whole day would.
+    # Event order inside a shard is the order of the day
+    join_codes = frame.user_join_codes()
+    shard_of_user = join_codes % shards
+    parts = []
+    for shard in range(shards):
+        in_shard = shard_of_user == shard
+        local_users = np.flatnonzero(in_shard)
+        # user codes are renumbered so a shard only carries its own user values
+        renumber = np.full(len(frame.users), MISSING, dtype=np.int64)
+        renumber[local_users] = np.arange(len(local_users))
+        tables = {}
+        succeed_rows = None
+        for kind in EVENT_KINDS:
+            rows = np.flatnonzero(in_shard[frame[kind].user])
+            table = frame[kind].take(rows)
+            table.user = renumber[table.user]
+            tables[kind] = table
+            if kind == 'succeed':
+                succeed_rows = rows
+        part = DayFrame([frame.users[user] for user in local_users.tolist()], frame.agents,
+                        *(tables[kind] for kind in EVENT_KINDS))
+        # join codes are already known, the shard only needs them numbered from zero
+        part._join_codes = np.unique(join_codes[local_users], return_inverse=True)[1].astype(np.int64)
+        parts.append((part, succeed_rows))
+    return parts
+
+
+def analyse_shard(frame: DayFrame, succeed_rows: np.ndarray, requires: Iterable[str]) -> dict[str, Any]:
+    # Partial aggregates of one shard: sums, sketches and the shard's start -> success pairs as
+    # succeed rows of the whole day. Per-event python objects are left to the parent
+    requires = set(requires)
+    stats = DayStats(frame, requires - {RECHARGES, JOINS})
+    partial = {
+        'coin_sum': stats.coin_sum,
+        'coins_by_agent': stats.coins_by_agent,
+        'hourly': stats.hourly,
+        'sketches': stats.sketches,
+        'paired_rows': np.empty(0, dtype=np.int64),
+        'paired_seconds': np.empty(0, dtype=np.int64),
+    }
+    if JOINS in requires:
+        joins = stats.joins or JoinIndex(frame)
+        rows, seconds = joins.pair(frame.succeed.user, frame.succeed.time)
+        partial['paired_rows'], partial['paired_seconds'] = succeed_rows[rows], seconds
+    return partial
+
+
+def merge_partials(stats: DayStats, requires: Iterable[str], partials: list[dict[str, Any]]) -> DayStats:
+    # sums are added up, pairs are put back into day order by their succeed rows.
+    # Only accumulators in `requires` are set, the ones `stats` already holds are kept
+    requires = set(requires)
+    frame = stats.frame
+    if COIN_SUM in requires:
+        stats.coin_sum = sum(partial['coin_sum'] for partial in partials)
+    if COINS_BY_AGENT in requires:
+        coins_by_agent = {}
+        for partial in partials:
+            for agent, coins in partial['coins_by_agent'].items():
+                coins_by_agent[agent] = coins_by_agent.get(agent, 0) + coins
+        # same key order as a single pass, which walks agent codes upwards
+        first_code = {}
+        for code, agent in reversed(list(enumerate(frame.agents))):
+            first_code[int(agent)] = code
+        stats.coins_by_agent = dict(sorted(coins_by_agent.items(), key=lambda item: first_code[item[0]]))
+    if HOURLY in requires:
+        hourly = {}
+        for partial in partials:
+            for hour, count in partial['hourly'].items():
+                hourly[hour] = hourly.get(hour, 0) + count
+        stats.hourly = dict(sorted(hourly.items()))
+
+    if JOINS in requires:
+        rows = np.concatenate([partial['paired_rows'] for partial in partials])
+        seconds = np.concatenate([partial['paired_seconds'] for partial in partials])
+        order = np.argsort(rows, kind='stable')
+        stats.set_pairs(rows[order], seconds[order])
+    if SKETCHES in requires:
+        stats.sketches = partials[0]['sketches']
+        for partial in partials[1:]:
+            stats.sketches.merge(partial['sketches'])
+    stats.requires |= requires - {RECHARGES}
+    # recharges are one dict per succeed event, listing them needs no pairing and is cheapest right here
+    stats.ensure(requires & {RECHARGES})
+    return stats
+
+
+def sharded_stats(data: dict[str, Any] | DayFrame, requires: Iterable[str], shards: int,
+                  stats: DayStats = None) -> DayStats:
+    # DayStats of a whole day, computed shard by shard in a process pool and merged.
+    # Accumulators are added to `stats` when one is given
+    requires = set(requires)
+    if stats is None:
+        stats = DayStats(data)
+        stats._frame = as_frame(data)
+    parts = shard_frame(stats.frame, shards)
+    with ProcessPoolExecutor(max_workers=shards) as pool:
+        partials = list(pool.map(analyse_shard, *zip(*parts), repeat(requires)))
+    return merge_partials(stats, requires, partials)
+
+
+# DayStats of a big day for results computed entry by entry: every accumulator worth splitting is
+# computed shard by shard when an entry first requires it, the rest like in a single pass
+class ShardedStats(DayStats):
+    def __init__(self, data: dict[str, Any] | DayFrame, requires: Iterable[str] = (), shards: int = 2):
+        self.shards = shards
+        super().__init__(data, requires)
+
+    def ensure(self, requires: Iterable[str]) -> None:
+        missing = set(requires) - self.requires
+        sharded = missing & SHARDED
+        if sharded:
+            sharded_stats(self.data, sharded, self.shards, stats=self)
+        super().ensure(missing - sharded)
@@ -0,0 +1,168 @@
+import argparse
+import csv
+import json
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any
+
+import config
+from app.catalog import Catalog
+from app.plugins import plugins as all_plugins, cross_day_plugins
+from app.utils.parallel import analyze_day, shards_per_day
+
+EXIT_OK = 0
+EXIT_FAILED_DAYS = 1
+EXIT_USAGE = 2
+EXIT_NO_DAYS = 3
+
+FORMATS = ('json', 'csv', 'columnar')
+
+
+def plain(value: Any) -> Any:
+    # plugin results as JSON-friendly values, agent and hour keys become strings
+    if isinstance(value, dict):
+        return {str(key): plain(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [plain(item) for item in value]
+    return value
+
+
+# Writers get one row per day in date order, as soon as the day and all days before it are analysed
+class JsonWriter:
+    # a JSON array, written element by element so finished days are on disk straight away
+    def __init__(self, file, columns: list[str]):
+        self.file = file
+        self.first = True
+        self.file.write('[\n')
+
+    def write(self, row: dict[str, Any]) -> None:
+        if not self.first:
+            self.file.write(',\n')
+        self.first = False
+        self.file.write(json.dumps(row))
+        self.file.flush()
+
+    def close(self) -> None:
+        self.file.write('\n]\n')
+
+
+class CsvWriter:
+    def __init__(self, file, columns: list[str]):
+        self.file = file
+        self.writer = csv.DictWriter(file, fieldnames=columns)
+        self.writer.writeheader()
+
+    def write(self, row: dict[str, Any]) -> None:
+        # nested results do not fit a cell, they are stored as JSON text
+        self.writer.writerow({key: json.dumps(value) if isinstance(value, (dict, list)) else value
+                              for key, value in row.items()})
+        self.file.flush()
+
+    def close(self) -> None:
+        pass
+
+
+class ColumnarWriter:
+    # {"column": [values, ...]} with one value per day in every column. The layout needs all rows,
+    # so rows are buffered as columns and the file is written when the report closes
+    def __init__(self, file, columns: list[str]):
+        self.file = file
+        self.columns = {column: [] for column in columns}
+
+    def write(self, row: dict[str, Any]) -> None:
+        for column, values in self.columns.items():
+            values.append(row.get(column))
+
+    def close(self) -> None:
+        json.dump(self.columns, self.file)
+
+
+WRITERS = {'json': JsonWriter, 'csv': CsvWriter, 'columnar': ColumnarWriter}
+
+
+def find_plugin(name: str, available: list):
+    return next((plugin for plugin in available if name in (plugin.name, plugin.__name__)), None)
+
+
+def select_plugins(names: str | None, available: list = None) -> list:
+    # per-day plugins by name or class name, all of them when no names are given
+    available = all_plugins if available is None else available
+    if not names:
+        return list(available)
+    selected = []
+    for name in (name.strip() for name in names.split(',')):
+        plugin = find_plugin(name, available)
+        if plugin is None:
+            if find_plugin(name, cross_day_plugins):
+                raise ValueError(f"{name} answers a range of days and has no result for single days")
+            raise ValueError(f"Unknown plugin {name}")
+        selected.append(plugin)
+    return selected
+
+
+def run_report(start: str, end: str, plugins: list, file_format: str, output: str, workers: int = None) -> int:
+    catalog = Catalog()
+    catalog.refresh()
+    days = catalog.days(start, end)
+    if not days:
+        print(f"No saved days between {start} and {end}", file=sys.stderr)
+        return EXIT_NO_DAYS
+
+    columns = ['date'] + [plugin.name for plugin in plugins]
+    failed = []
+    with open(output, 'w', encoding='utf-8', newline='') as file:
+        writer = WRITERS[file_format](file, columns)
+        workers = min(workers or config.ANALYSIS_WORKERS, len(days))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            shards = shards_per_day(workers)
+            futures = {pool.submit(analyze_day, entry['file'], plugins, shards): index
+                       for index, entry in enumerate(days)}
+            # rows of days finished ahead of an earlier day wait here, None for a failed day
+            finished = {}
+            written = 0
+            for done, future in enumerate(as_completed(futures), start=1):
+                index = futures[future]
+                day = days[index]['date']
+                try:
+                    analysis = future.result()
+                    if analysis is None:
+                        raise FileNotFoundError(day)
+                except Exception as error:
+                    failed.append(day)
+                    finished[index] = None
+                    print(f"[{done}/{len(days)}] {day} failed: {error!r}", file=sys.stderr)
+                else:
+                    row = {'date': day}
+                    row.update({key: plain(value.args) for key, value in analysis.items()})
+                    finished[index] = row
+                    print(f"[{done}/{len(days)}] {day} done", file=sys.stderr)
+                while written in finished:
+                    row = finished.pop(written)
+                    written += 1
+                    if row is not None:
+                        writer.write(row)
+        writer.close()
+
+    return EXIT_FAILED_DAYS if failed else EXIT_OK
+
+
+def main(argv: list[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog='report', description="Analyse saved days without the interactive menu")
+    parser.add_argument('--from', dest='start', help="first day, DD.MM.YYYY")
+    parser.add_argument('--to', dest='end', help="last day, DD.MM.YYYY")
+    parser.add_argument('--plugins', help="comma separated plugin names or class names, all plugins by default")
+    parser.add_argument('--format', choices=FORMATS, default='json')
+    parser.add_argument('--output', required=True)
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args(argv)
+
+    try:
+        plugins = select_plugins(args.plugins)
+        return run_report(args.start, args.end, plugins, args.format, args.output, args.workers)
+    except ValueError as error:
+        print(error, file=sys.stderr)
+        return EXIT_USAGE
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,296 @@
+import argparse
+import asyncio
+import json
+import sys
+import time
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor
+from datetime import datetime
+from http import HTTPStatus
+from typing import Any
+from urllib.parse import parse_qs, urlsplit
+
+import config
+from app.catalog import Catalog
+from app.plugins import plugins as all_plugins, cross_day_plugins
+from app.report import find_plugin, select_plugins
+from app.user_index import UserIndex
+from app.utils.cache import ResultCache
+from app.utils.parallel import analyze_day_cached
+
+# the API takes no request body, a longer one is not read and its connection is closed instead
+MAX_REQUEST_BODY = 1 << 20
+
+
+# In-memory results of single days for single plugins, least recently used dropped first
+class ResultLRU:
+    def __init__(self, max_entries: int = None):
+        self.max_entries = max_entries or config.SERVER_CACHE_ENTRIES
+        self.entries = OrderedDict()
+
+    def get(self, key: tuple) -> Any:
+        # entries hold {'args': ...}, so a plugin result of None is still a hit
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+        return entry
+
+    def put(self, key: tuple, args: Any) -> None:
+        self.entries[key] = {'args': args}
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+
+# Local HTTP/JSON service answering "plugins X for days Y" for any number of readers.
+# Days are analysed in a process pool, one day per job, so only the worker handling a day holds
+# its events and the server itself keeps results only. In front of the pool sit the in-memory LRU
+# and the on-disk ResultCache shared with graphs and reports. Identical work asked for while it
+# is still running is awaited instead of started again. Plugins answering across days are answered
+# once for the whole range from the saved user bitmaps, under 'range' instead of per day.
+#
+#   GET /query?plugin=<name>[,<name>...]&from=DD.MM.YYYY&to=DD.MM.YYYY
+#   GET /plugins
+#   GET /stats
+class QueryServer:
+    def __init__(self, pool: Executor, catalog: Catalog = None, cache: ResultLRU = None):
+        self.pool = pool
+        self.catalog = catalog or Catalog()
+        self.cache = cache or ResultLRU()
+        # result key -> task analysing its day
+        self.in_flight = {}
+        self.catalog_lock = asyncio.Lock()
+        # the user index writes its files, so it is updated by one query at a time
+        self.index_lock = asyncio.Lock()
+        self.catalog_checked = 0.0
+        self.counters = {'requests': 0, 'hits': 0, 'coalesced': 0, 'computed': 0, 'failed': 0}
+        self.routes = {'/query': self.query, '/plugins': self.list_plugins, '/stats': self.stats}
+
+    @staticmethod
+    def result_key(entry: dict[str, Any], plugin) -> tuple:
+        # a day file that changed has another size or mtime and stops matching its old results
+        return entry['file'], entry['mtime_ns'], entry['size'], plugin.__name__, plugin.version
+
+    async def days(self, start: str | None, end: str | None) -> list[dict[str, Any]]:
+        async with self.catalog_lock:
+            if time.monotonic() - self.catalog_checked >= config.SERVER_CATALOG_SECONDS:
+                # new or changed days are summarised by reading them, which is kept off the event loop
+                await asyncio.to_thread(self.catalog.refresh)
+                self.catalog_checked = time.monotonic()
+            return self.catalog.days(start, end)
+
+    @staticmethod
+    def answer_range(entries: list[dict[str, Any]], start: str | None, end: str | None,
+                     plugins: list) -> dict[str, Any]:
+        # days saved since the last query get their bitmaps, the range itself reads no day file
+        index = UserIndex()
+        index.update_days(entries)
+        days = index.days(start, end)
+        return {plugin.name: plugin.from_bitmaps(days)[plugin.name].args for plugin in plugins}
+
+    async def range_results(self, start: str | None, end: str | None, plugins: list) -> dict[str, Any]:
+        # the query brought the catalog up to date already, its days are only read under the lock.
+        # Building bitmaps holds the index lock alone, so queries for single days do not wait for it
+        async with self.catalog_lock:
+            entries = self.catalog.days()
+        async with self.index_lock:
+            return await asyncio.to_thread(self.answer_range, entries, start, end, plugins)
+
+    async def day_results(self, entry: dict[str, Any], plugins: list) -> dict[str, Any]:
+        results = {}
+        waiting = {}
+        missing = []
+        for plugin in plugins:
+            key = self.result_key(entry, plugin)
+            cached = self.cache.get(key)
+            if cached is not None:
+                self.counters['hits'] += 1
+                results[plugin.name] = cached['args']
+            elif key in self.in_flight:
+                self.counters['coalesced'] += 1
+                waiting[plugin.name] = self.in_flight[key]
+            else:
+                missing.append(plugin)
+
+        if missing:
+            task = asyncio.create_task(self.compute(entry, missing))
+            for plugin in missing:
+                self.in_flight[self.result_key(entry, plugin)] = task
+                waiting[plugin.name] = task
+
+        for name, task in waiting.items():
+            # shielded, a reader that hangs up does not cancel work other readers are waiting for
+            results[name] = (await asyncio.shield(task))[name]
+        return results
+
+    async def compute(self, entry: dict[str, Any], plugins: list) -> dict[str, Any]:
+        self.counters['computed'] += 1
+        try:
+            loop = asyncio.get_running_loop()
+            # one day per pool worker and no shards: concurrent queries already share the pool's cores,
+            # and a day split inside a worker would start a pool of its own in every worker
+            results = await loop.run_in_executor(self.pool, analyze_day_cached, entry['file'], plugins)
+            if results is None:
+                raise FileNotFoundError(entry['file'])
+            for plugin in plugins:
+                self.cache.put(self.result_key(entry, plugin), results[plugin.name])
+            return results
+        finally:
+            for plugin in plugins:
+                self.in_flight.pop(self.result_key(entry, plugin), None)
+
+    async def query(self, params: dict[str, list[str]]) -> tuple[HTTPStatus, Any]:
+        names = params.get('plugin', [''])[0]
+        if not names:
+            return HTTPStatus.BAD_REQUEST, {'error': "plugin is required"}
+        start = params.get('from', [None])[0]
+        end = params.get('to', [None])[0]
+        names = [name.strip() for name in names.split(',')]
+        range_names = [name for name in names if find_plugin(name, cross_day_plugins)]
+        day_names = [name for name in names if name not in range_names]
+        try:
+            plugins = select_plugins(','.join(day_names)) if day_names else []
+            range_plugins = select_plugins(','.join(range_names), cross_day_plugins) if range_names else []
+        except ValueError as error:
+            return HTTPStatus.BAD_REQUEST, {'error': str(error)}
+        try:
+            for value in (start, end):
+                if value:
+                    datetime.strptime(value, '%d.%m.%Y')
+        except ValueError:
+            return HTTPStatus.BAD_REQUEST, {'error': "Dates should look like DD.MM.YYYY"}
+
+        days = await self.days(start, end)
+        answers = await asyncio.gather(*(self.day_results(entry, plugins) for entry in days),
+                                       return_exceptions=True)
+        rows = []
+        failed = []
+        for entry, answer in zip(days, answers):
+            if isinstance(answer, BaseException):
+                self.counters['failed'] += 1
+                failed.append(entry['date'])
+                print(f"{entry['date']} failed: {answer!r}", file=sys.stderr)
+                continue
+            rows.append({'date': entry['date'], **answer})
+        response = {
+            'plugins': [{'name': plugin.name, 'desc': plugin.desc, 'type': plugin.type} for plugin in plugins],
+            'days': rows,
+            'failed': failed,
+        }
+        if range_plugins:
+            response['range plugins'] = [{'name': plugin.name, 'desc': plugin.desc, 'type': plugin.type}
+                                         for plugin in range_plugins]
+            response['range'] = await self.range_results(start, end, range_plugins)
+        return HTTPStatus.OK, response
+
+    async def list_plugins(self, params: dict[str, list[str]]) -> tuple[HTTPStatus, Any]:
+        return HTTPStatus.OK, [{'name': plugin.name, 'desc': plugin.desc, 'type': plugin.type,
+                                'cross_day': plugin.cross_day} for plugin in all_plugins + cross_day_plugins]
+
+    async def stats(self, params: dict[str, list[str]]) -> tuple[HTTPStatus, Any]:
+        return HTTPStatus.OK, dict(self.counters, cached=len(self.cache.entries), in_flight=len(self.in_flight))
+
+    async def dispatch(self, method: str, target: str) -> tuple[HTTPStatus, Any]:
+        url = urlsplit(target)
+        route = self.routes.get(url.path)
+        if route is None:
+            return HTTPStatus.NOT_FOUND, {'error': f"No such path {url.path}"}
+        if method != 'GET':
+            return HTTPStatus.METHOD_NOT_ALLOWED, {'error': "Only GET is supported"}
+        return await route(parse_qs(url.query))
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        # HTTP/1.1 with keep-alive, dashboards polling over one connection skip the handshakes
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                parts = request_line.decode('latin-1').split()
+                if len(parts) != 3:
+                    await self.respond(writer, HTTPStatus.BAD_REQUEST, {'error': "Malformed request"}, False)
+                    break
+                method, target, version = parts
+                keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                # a request body is read and dropped, so the next request on the connection starts where
+                # it should. One whose length is unknown or too big can not be skipped, the connection
+                # is closed after the answer instead
+                if 'transfer-encoding' in headers:
+                    keep_alive = False
+                elif headers.get('content-length', '0') != '0':
+                    try:
+                        length = int(headers['content-length'])
+                    except ValueError:
+                        await self.respond(writer, HTTPStatus.BAD_REQUEST, {'error': "Malformed Content-Length"}, False)
+                        break
+                    if 0 <= length <= MAX_REQUEST_BODY:
+                        await reader.readexactly(length)
+                    else:
+                        keep_alive = False
+                self.counters['requests'] += 1
+                try:
+                    status, body = await self.dispatch(method, target)
+                except Exception as error:
+                    self.counters['failed'] += 1
+                    print(f"{method} {target} failed: {error!r}", file=sys.stderr)
+                    status, body = HTTPStatus.INTERNAL_SERVER_ERROR, {'error': "Internal server error"}
+                await self.respond(writer, status, body, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, ValueError, asyncio.IncompleteReadError):
+            # a reader went away, sent a line over the stream limit or hung up inside a body
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def respond(writer: asyncio.StreamWriter, status: HTTPStatus, body: Any, keep_alive: bool) -> None:
+        content = json.dumps(body).encode('utf-8')
+        head = (f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                f"Content-Type: application/json\r\n"
+                f"Content-Length: {len(content)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode('latin-1') + content)
+        await writer.drain()
+
+
+async def serve(host: str = None, port: int = None, workers: int = None) -> None:
+    host = host or config.SERVER_HOST
+    port = port or config.SERVER_PORT
+    with ProcessPoolExecutor(max_workers=workers or config.ANALYSIS_WORKERS) as pool:
+        # workers are started before any socket is opened, forked ones would otherwise inherit
+        # readers' connections and keep them open after the server closes them
+        await asyncio.get_running_loop().run_in_executor(pool, int)
+        query_server = QueryServer(pool)
+        server = await asyncio.start_server(query_server.handle, host, port)
+        # days analysed by earlier runs are still on disk, the cache is trimmed once per start
+        await asyncio.to_thread(ResultCache().evict)
+        print(f"Serving on http://{host}:{port}", file=sys.stderr)
+        async with server:
+            await server.serve_forever()
+
+
+def main(argv: list[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog='serve', description="Answer plugin queries over HTTP/JSON")
+    parser.add_argument('--host', default=None, help=f"address to listen on, {config.SERVER_HOST} by default")
+    parser.add_argument('--port', type=int, default=None, help=f"{config.SERVER_PORT} by default")
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args(argv)
+
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
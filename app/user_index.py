@@ -0,0 +1,92 @@
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+from app.catalog import Catalog
+from app.frame import Interner, as_frame
+from app.loaders.stream import read_day
+from app.plugins.bitmaps import DayUsers
+
+LOGS_DIR = "app/logs"
+USERS_NAME = "users.manifest"
+USERS_SUFFIX = '.users'
+
+
+# User bitmaps of every saved day, one DD.MM.YYYY.users file next to each day, plus a manifest with
+# the user ids all of them are numbered by and the content hash each file was built from.
+# Bitmaps are built once per day file, questions across days only read the bitmaps
+class UserIndex:
+    def __init__(self, logs_dir: str = LOGS_DIR):
+        self.logs_dir = Path(logs_dir)
+        self.path = self.logs_dir / USERS_NAME
+        content = self._load()
+        # ids are only ever added, a number keeps meaning the same user in every bitmap file
+        self.ids = Interner()
+        for user in content.get('ids', []):
+            self.ids.code(user)
+        self.sources = content.get('sources', {})
+
+    def _load(self) -> dict[str, Any]:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as file:
+                return json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def save(self) -> None:
+        self.logs_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(f"{USERS_NAME}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump({'ids': self.ids.values, 'sources': self.sources}, file)
+        os.replace(tmp_path, self.path)
+
+    def bitmap_path(self, day: str) -> Path:
+        return self.logs_dir / f"{day}{USERS_SUFFIX}"
+
+    def update(self, catalog: Catalog = None) -> int:
+        catalog = catalog or Catalog(str(self.logs_dir))
+        catalog.refresh()
+        return self.update_days(catalog.days())
+
+    def update_days(self, entries: list[dict[str, Any]]) -> int:
+        # brings the bitmaps in line with the given catalog days. Only days that are new or whose
+        # content hash changed are read.
+        # Bitmap files are written before the manifest, so a file never refers to ids the manifest lost
+        days = {entry['date']: entry for entry in entries}
+
+        updated = 0
+        for day in set(self.sources) - set(days):
+            del self.sources[day]
+            self.bitmap_path(day).unlink(missing_ok=True)
+            updated += 1
+        for day, entry in days.items():
+            if self.sources.get(day) == entry['hash'] and self.bitmap_path(day).exists():
+                continue
+            frame = as_frame(read_day(str(self.logs_dir / entry['file']))['data'])
+            self.write(day, DayUsers.from_frame(frame, self.ids))
+            self.sources[day] = entry['hash']
+            updated += 1
+
+        if updated:
+            self.save()
+        return updated
+
+    def write(self, day: str, users: DayUsers) -> None:
+        path = self.bitmap_path(day)
+        tmp_path = path.with_name(f"{path.name}.tmp")
+        with open(tmp_path, 'wb') as file:
+            file.write(users.to_bytes())
+        os.replace(tmp_path, path)
+
+    def read(self, day: str) -> DayUsers:
+        with open(self.bitmap_path(day), 'rb') as file:
+            return DayUsers.from_bytes(file.read())
+
+    def days(self, start: str = None, end: str = None) -> list[tuple[str, DayUsers]]:
+        # (DD.MM.YYYY, bitmaps) of indexed days between two dates, both included, in date order
+        first = datetime.strptime(start, '%d.%m.%Y') if start else datetime.min
+        last = datetime.strptime(end, '%d.%m.%Y') if end else datetime.max
+        selected = sorted((datetime.strptime(day, '%d.%m.%Y'), day) for day in self.sources)
+        return [(day, self.read(day)) for date, day in selected if first <= date <= last]
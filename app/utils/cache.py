@@ -0,0 +1,99 @@
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+
+LOGS_DIR = "app/logs"
+CACHE_DIR = "app/cache/results"
+MAX_CACHE_BYTES = 64 * 1024 * 1024
+
+
+# On-disk cache of per-day plugin results.
+# Entries are keyed by the day file's path, mtime and size plus the plugin name and version,
+# so a changed file or a bumped plugin version simply stops matching old entries.
+# Entries of one day file share a directory, so dropping a day only touches its own entries
+class ResultCache:
+    def __init__(self, cache_dir: str = CACHE_DIR, max_bytes: int = MAX_CACHE_BYTES):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def make_key(filename: str, plugin) -> str | None:
+        try:
+            stat = os.stat(f"{LOGS_DIR}/{filename}")
+        except FileNotFoundError:
+            return None
+        raw = json.dumps([filename, stat.st_mtime_ns, stat.st_size, plugin.__name__, plugin.version])
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    def file_dir(self, filename: str) -> Path:
+        return self.cache_dir / hashlib.sha1(filename.encode('utf-8')).hexdigest()[:16]
+
+    def get(self, filename: str, plugin):
+        key = self.make_key(filename, plugin)
+        if key is None:
+            return None
+        path = self.file_dir(filename) / f"{key}.json"
+        try:
+            with open(path, 'r', encoding='utf-8') as file:
+                entry = json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        # touch the entry so eviction drops the least recently used ones first
+        os.utime(path)
+        return entry['value']
+
+    def put(self, filename: str, plugin, value) -> bool:
+        key = self.make_key(filename, plugin)
+        if key is None:
+            return False
+        try:
+            content = json.dumps({'file': filename, 'plugin': plugin.__name__, 'value': value})
+        except TypeError:
+            # result is not plain data, nothing to cache
+            return False
+        directory = self.file_dir(filename)
+        directory.mkdir(parents=True, exist_ok=True)
+        tmp_path = directory / f"{key}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            file.write(content)
+        os.replace(tmp_path, directory / f"{key}.json")
+        return True
+
+    def invalidate(self, filename: str | None = None) -> int:
+        # drop every entry of one day file, or the whole cache when no file is given
+        if filename is None:
+            removed = len(self._entries())
+            shutil.rmtree(self.cache_dir, ignore_errors=True)
+            return removed
+        directory = self.file_dir(filename)
+        removed = len(list(directory.glob('*.json')))
+        # another invalidation may be removing it meanwhile
+        shutil.rmtree(directory, ignore_errors=True)
+        return removed
+
+    def evict(self) -> int:
+        # remove least recently used entries until the cache fits into max_bytes
+        entries = [(path, path.stat()) for path in self._entries()]
+        total = sum(stat.st_size for _, stat in entries)
+        removed = 0
+        for path, stat in sorted(entries, key=lambda item: item[1].st_mtime):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            if path.parent != self.cache_dir:
+                try:
+                    path.parent.rmdir()
+                except OSError:
+                    # the day file still has other entries
+                    pass
+            total -= stat.st_size
+            removed += 1
+        return removed
+
+    def _entries(self) -> list[Path]:
+        if not self.cache_dir.is_dir():
+            return []
+        # entries right in cache_dir are from before entries were grouped by day file
+        return list(self.cache_dir.glob('*/*.json')) + list(self.cache_dir.glob('*.json'))
@@ -0,0 +1,19 @@
+from datetime import datetime
+
+from app.loaders.columnar import COLUMNAR_SUFFIX
+
+# listed in order of preference when one day is saved in several formats
+DAY_FILE_SUFFIXES = (COLUMNAR_SUFFIX, '.jsonl.gz', '.jsonl', '.json')
+
+
+def is_day_file(filename: str) -> bool:
+    return filename.endswith(DAY_FILE_SUFFIXES)
+
+
+def file_preference(filename: str) -> int:
+    return next(index for index, suffix in enumerate(DAY_FILE_SUFFIXES) if filename.endswith(suffix))
+
+
+def day_of_file(filename: str) -> datetime:
+    # saved days are named DD.MM.YYYY followed by one of DAY_FILE_SUFFIXES
+    return datetime.strptime(filename[:10], '%d.%m.%Y')
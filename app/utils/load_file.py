@@ -1,11 +1,9 @@
-import json
+from app.loaders.stream import read_day
 
 
 def load_file(filename):
     try:
-        with open(f"app/logs/{filename}", 'r', encoding='utf-8') as fout:
-            data = json.load(fout)
-            return data
+        return read_day(f"app/logs/{filename}")
     except FileNotFoundError:
         print(f"File {filename} not found")
         return None
\ No newline at end of file
@@ -0,0 +1,90 @@
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+import config
+from app.plugins import PluginManager
+from app.plugins.engine import DayStats, SKETCHES
+from app.plugins.sketches import DaySketches
+from app.utils.cache import ResultCache
+from app.utils.load_file import load_file
+
+
+def shards_per_day(days_in_flight: int) -> int:
+    # days analysed at the same time share the cores, a big day is split over its share of them
+    return max(1, config.ANALYSIS_WORKERS // max(1, days_in_flight))
+
+
+def analyze_day(filename: str, plugins: list, shards: int = 1) -> dict | None:
+    data = load_file(filename)
+    if data is None:
+        return None
+    # results are plain data and are sent back from the worker process as they are
+    return PluginManager(plugins=plugins).analyse_data(data['data'], shards=shards)
+
+
+def analyze_day_cached(filename: str, plugins: list, shards: int = 1) -> dict | None:
+    # {plugin name: args} of one day. Plugins already in the result cache are not analysed again,
+    # the others are analysed together in one pass over the day and cached for the next reader
+    cache = ResultCache()
+    results = {}
+    missing = []
+    for plugin in plugins:
+        cached = cache.get(filename, plugin)
+        if cached is None:
+            missing.append(plugin)
+        else:
+            results[plugin.name] = cached['args']
+    if missing:
+        analysis = analyze_day(filename, missing, shards)
+        if analysis is None:
+            return None
+        for plugin in missing:
+            value = analysis[plugin.name]
+            results[plugin.name] = value.args
+            cache.put(filename, plugin, {'args': value.args, 'desc': value.desc})
+    return results
+
+
+def analyze_days(filenames: list[str], plugins: list, workers: int | None = None) -> list[dict | None]:
+    # results come back in the order of `filenames`, whatever order the workers finish in
+    workers = workers or config.ANALYSIS_WORKERS
+    if workers <= 1 or len(filenames) < 2:
+        return [analyze_day(filename, plugins, shards_per_day(1)) for filename in filenames]
+
+    workers = min(workers, len(filenames))
+    chunksize = max(1, len(filenames) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(analyze_day, filenames, repeat(plugins), repeat(shards_per_day(workers)),
+                             chunksize=chunksize))
+
+
+def sketch_day(filename: str) -> dict | None:
+    data = load_file(filename)
+    if data is None:
+        return None
+    return DayStats(data['data'], (SKETCHES,)).sketches.to_dict()
+
+
+def sketch_days(filenames: list[str], workers: int | None = None, cache: ResultCache = None) -> DaySketches:
+    # sketches of all days merged into one. Each day is sketched once and kept in the result cache,
+    # so a longer range only reads the days it has not seen before
+    cache = cache or ResultCache()
+    cached = {filename: cache.get(filename, DaySketches) for filename in filenames}
+    missing = [filename for filename, value in cached.items() if value is None]
+
+    workers = min(workers or config.ANALYSIS_WORKERS, max(1, len(missing)))
+    if workers <= 1:
+        sketched = [sketch_day(filename) for filename in missing]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            sketched = list(pool.map(sketch_day, missing))
+    for filename, value in zip(missing, sketched):
+        if value is not None:
+            cached[filename] = value
+            cache.put(filename, DaySketches, value)
+
+    merged = DaySketches()
+    for value in cached.values():
+        if value is not None:
+            merged.merge(DaySketches.from_dict(value))
+    return merged
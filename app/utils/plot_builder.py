@@ -1,45 +1,32 @@
-from matplotlib import pyplot as plt
-
-from app.graphs.graph_factory import PlotDataNormalizer, SimplePlotGraph
-
-
-def build_plot(chosen_tool):
-    normalizer = PlotDataNormalizer()
-    if isinstance(chosen_tool, list):
-
-        # Calculate the number of plots
-        try:
-            num_plots = len(chosen_tool)
-        except TypeError:
-            num_plots = 1
-
-        # Determine the number of rows and columns for subplots
-        num_rows = int(num_plots ** 0.5)
-        num_cols = int((num_plots + num_rows - 1) / num_rows)
-
-        # Create the subplots
-        fig, axes = plt.subplots(nrows=num_rows, ncols=num_cols)
-
-        # Flatten the axes array if necessary
-        if num_plots == 1:
-            axes = [axes]
-
-        # Iterate over the data and create plots
-        for i, ax in enumerate(axes.flat):
-            if i < num_plots:
-                data_ready = normalizer.prepare_data(plugin=chosen_tool[i])
-                ax.plot(data_ready['x'], data_ready['y'])
-                ax.set_title(f'{data_ready["desc"]}')
-
-        # Adjust spacing between subplots
-        plt.tight_layout()
-
-        # Display the plots
-        plt.show()
-        return
-
-    data_ready = normalizer.prepare_data(plugin=chosen_tool)
-
-    graph = SimplePlotGraph()
-    graph.build_graph(**data_ready)
-    plt.show()
\ No newline at end of file
+from pathlib import Path
+
+import config
+from app.graphs.export import range_label, slug
+from app.graphs.graph_factory import PlotDataNormalizer
+from app.graphs.render import FigureRenderer, is_headless
+
+# pyplot window reused by every graph built from the menu
+FIGURE_NAME = 'fast_top'
+
+
+def build_plot(chosen_tool, start=None, end=None):
+    tools = chosen_tool if isinstance(chosen_tool, list) else [chosen_tool]
+
+    if is_headless():
+        # nothing to show the graph on, so it is written to a file instead, named like the export command does
+        renderer = FigureRenderer()
+        renderer.draw(PlotDataNormalizer.prepare_series(tools, start, end, renderer.max_points))
+        Path(config.GRAPH_EXPORT_DIR).mkdir(parents=True, exist_ok=True)
+        name = slug(tools[0].name) if len(tools) == 1 else 'dashboard'
+        path = renderer.save(str(Path(config.GRAPH_EXPORT_DIR) / f"{name}_{range_label(start, end)}.png"))
+        print(f"Graph saved to {path}")
+        return path
+
+    # pyplot takes longer to import than the rest of the app together, so it waits for the first graph
+    from matplotlib import pyplot as plt
+
+    figure = plt.figure(num=FIGURE_NAME, figsize=(config.GRAPH_WIDTH_PX / config.GRAPH_DPI,
+                                                  config.GRAPH_HEIGHT_PX / config.GRAPH_DPI), dpi=config.GRAPH_DPI)
+    renderer = FigureRenderer(figure=figure)
+    renderer.draw(PlotDataNormalizer.prepare_series(tools, start, end, renderer.max_points))
+    plt.show()
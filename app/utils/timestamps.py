@@ -0,0 +1,40 @@
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Iterable
+
+import numpy as np
+
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+# a day logged at second resolution has at most this many distinct strings: every second of the day
+# in both layouts the API sends, start times with an offset and success times without one
+DAY_TIMESTAMPS = 2 * 86_400
+
+
+@lru_cache(maxsize=DAY_TIMESTAMPS)
+def parse_timestamp(value: str) -> tuple[int, int]:
+    # Returns (wall-clock seconds since epoch, utc offset in seconds).
+    # Wall-clock time is the local time written in the string with the offset dropped, which is what
+    # the plugins have always compared; utc time is wall-clock minus offset.
+    # Both layouts the API sends, 'YYYY-MM-DDTHH:MM:SS+HH:MM' and 'YYYY-MM-DD HH:MM:SS', are fixed-layout
+    # ISO 8601, which fromisoformat parses in C several times faster than strptime. Events are logged
+    # at second resolution, so the same strings repeat and the cache, big enough for a whole day, catches them.
+    # Whole columns are parsed with parse_timestamps instead
+    moment = datetime.fromisoformat(value)
+    seconds = (moment.toordinal() - EPOCH_ORDINAL) * 86400 + moment.hour * 3600 + moment.minute * 60 + moment.second
+    offset = moment.utcoffset()
+    return seconds, offset.days * 86400 + offset.seconds if offset is not None else 0
+
+
+def to_seconds(value: str) -> int:
+    return parse_timestamp(value)[0]
+
+
+def parse_timestamps(values: Iterable[str | None]) -> np.ndarray:
+    # (wall-clock seconds, utc offset) rows for a column of timestamps, (0, 0) where there is none.
+    # Every distinct string is parsed once, whatever the size of the column, and the per-event cache
+    # is left alone
+    values = list(values)
+    parsed = dict.fromkeys(values)
+    for value in parsed:
+        parsed[value] = (0, 0) if value is None else parse_timestamp.__wrapped__(value)
+    return np.array([parsed[value] for value in values], dtype=np.int64).reshape(-1, 2)
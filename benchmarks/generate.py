@@ -0,0 +1,85 @@
+import argparse
+import json
+import random
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Iterator
+
+from app.frame import DayFrame
+from app.loaders.columnar import COLUMNAR_SUFFIX, write_columnar_day
+from app.loaders.stream import write_events
+
+FORMATS = ('json', 'jsonl', 'jsonl.gz', 'day')
+
+
+def generate_events(day: datetime, events: int, users: int, agents: int, seed: int = 0,
+                    success_rate: float = 0.6, interrupt_rate: float = 0.2) -> Iterator[tuple[str, dict[str, Any]]]:
+    # Yields (kind, event) in the schema the plugins read. `events` is the number of started dialogs;
+    # each one then succeeds, is interrupted or stays open. Users are drawn from `users` ids, so with
+    # fewer users than events some users start several dialogs, like on real days
+    rng = random.Random(seed)
+    start_of_day = day.replace(hour=0, minute=0, second=0, microsecond=0)
+    for _ in range(events):
+        user = rng.randrange(1, users + 1)
+        agent = rng.randrange(1, agents + 1)
+        started = start_of_day + timedelta(seconds=rng.randrange(86400))
+        yield 'started', {'user': user, 'agent': agent, 'time': started.strftime('%Y-%m-%dT%H:%M:%S+03:00')}
+
+        outcome = rng.random()
+        if outcome < success_rate:
+            finished = min(started + timedelta(seconds=int(rng.expovariate(1 / 300))),
+                           start_of_day + timedelta(seconds=86399))
+            yield 'succeed', {'user': user, 'agent': agent, 'coin': rng.randrange(10, 5000),
+                              'time': finished.strftime('%Y-%m-%d %H:%M:%S')}
+        elif outcome < success_rate + interrupt_rate:
+            yield 'interrupted', {'user': user, 'agent': agent, 'time': started.strftime('%Y-%m-%dT%H:%M:%S+03:00')}
+
+
+def generate_data(day: datetime, events: int, users: int, agents: int, seed: int = 0) -> dict[str, list]:
+    data = {'started': [], 'succeed': [], 'interrupted': []}
+    for kind, entry in generate_events(day, events, users, agents, seed):
+        data[kind].append(entry)
+    return data
+
+
+def write_day(logs_dir: str, day: datetime, events: int, users: int, agents: int,
+              file_format: str = 'json', seed: int = 0) -> str:
+    name = day.strftime('%d.%m.%Y')
+    Path(logs_dir).mkdir(parents=True, exist_ok=True)
+    if file_format == 'json':
+        path = f"{logs_dir}/{name}.json"
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump({'data': generate_data(day, events, users, agents, seed)}, file)
+    elif file_format in ('jsonl', 'jsonl.gz'):
+        path = f"{logs_dir}/{name}.{file_format}"
+        write_events(path, generate_events(day, events, users, agents, seed))
+    elif file_format == 'day':
+        path = f"{logs_dir}/{name}{COLUMNAR_SUFFIX}"
+        write_columnar_day(path, DayFrame.from_events(generate_events(day, events, users, agents, seed)))
+    else:
+        raise ValueError(f"Unknown format {file_format}, expected one of {FORMATS}")
+    return path
+
+
+def write_days(logs_dir: str, first_day: datetime, days: int, events: int, users: int, agents: int,
+               file_format: str = 'json', seed: int = 0) -> list[str]:
+    return [write_day(logs_dir, first_day + timedelta(days=offset), events, users, agents, file_format, seed + offset)
+            for offset in range(days)]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Write synthetic days in the format saved to app/logs")
+    parser.add_argument('--logs-dir', default='app/logs')
+    parser.add_argument('--first-day', default=datetime.today().strftime('%d.%m.%Y'), help="DD.MM.YYYY")
+    parser.add_argument('--days', type=int, default=1)
+    parser.add_argument('--events', type=int, default=1000, help="started dialogs per day")
+    parser.add_argument('--users', type=int, default=None, help="distinct users, defaults to 80%% of events")
+    parser.add_argument('--agents', type=int, default=50)
+    parser.add_argument('--format', choices=FORMATS, default='json')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    written = write_days(args.logs_dir, datetime.strptime(args.first_day, '%d.%m.%Y'), args.days, args.events,
+                         args.users or max(1, int(args.events * 0.8)), args.agents, args.format, args.seed)
+    for path in written:
+        print(path)
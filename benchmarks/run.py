@@ -0,0 +1,136 @@
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+from app.catalog import CATALOG_NAME
+from app.graphs.graph_factory import PlotDataNormalizer
+from app.graphs.rollups import ROLLUPS_NAME
+from app.loaders.loaders import FileLoader
+from app.plugins import plugins, PluginManager, DialogsCreated, DialogsByTime
+from app.utils.cache import ResultCache
+from benchmarks.generate import FORMATS, write_day, write_days
+
+FIRST_DAY = datetime(2023, 1, 2)
+
+
+def measure(func, repeat: int) -> dict[str, float]:
+    # best wall time over `repeat` runs; peak traced allocation comes from one extra run,
+    # because tracemalloc slows the measured code down
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'seconds': min(timings), 'peak_bytes': peak}
+
+
+def run_benchmarks(events: int, days: int, users: int, agents: int, repeat: int, workers: int) -> dict:
+    results = {}
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        # loaders and the browser read app/logs relative to the working directory
+        os.chdir(workdir)
+        try:
+            loader = FileLoader()
+            for file_format in FORMATS:
+                filename = Path(write_day('app/logs', FIRST_DAY, events, users, agents, file_format)).name
+                results[f'loader.{file_format}'] = measure(lambda: loader.load_data(filename), repeat)
+                if file_format != 'json':
+                    os.remove(f"app/logs/{filename}")
+
+            data = loader.load_data(f"{FIRST_DAY.strftime('%d.%m.%Y')}.json")['data']
+            for plugin in plugins:
+                results[f'plugin.{plugin.__name__}'] = measure(lambda: plugin.analyze(data), repeat)
+            manager = PluginManager(plugins=plugins)
+            results['manager.analyse_data'] = measure(lambda: manager.analyse_data(data), repeat)
+            os.remove(f"app/logs/{FIRST_DAY.strftime('%d.%m.%Y')}.json")
+
+            write_days('app/logs', FIRST_DAY, days, events, users, agents, file_format='json')
+            cache = ResultCache(cache_dir='benchmark-cache')
+
+            def prepare_cold():
+                # a plugin without rollups, so every day is parsed and analysed by the workers
+                cache.invalidate()
+                PlotDataNormalizer.prepare_data(plugin=DialogsByTime, cache=cache, workers=workers)
+
+            def rollups_cold():
+                # the rollup store and the catalog it is built from are read again from every day file
+                for name in (ROLLUPS_NAME, CATALOG_NAME):
+                    Path('app/logs', name).unlink(missing_ok=True)
+                PlotDataNormalizer.prepare_data(plugin=DialogsCreated)
+
+            results[f'graph.prepare_data.{days}_days'] = measure(prepare_cold, repeat)
+            results[f'graph.rollups.{days}_days'] = measure(rollups_cold, repeat)
+        finally:
+            os.chdir(cwd)
+
+    return {
+        'meta': {
+            'events': events,
+            'days': days,
+            'users': users,
+            'agents': agents,
+            'repeat': repeat,
+            'workers': workers,
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'date': datetime.now().isoformat(timespec='seconds'),
+        },
+        'results': results,
+    }
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list[str]:
+    regressions = []
+    for name, result in current['results'].items():
+        previous = baseline['results'].get(name)
+        if previous and result['seconds'] > previous['seconds'] * (1 + tolerance):
+            regressions.append(f"{name}: {previous['seconds']:.4f}s -> {result['seconds']:.4f}s")
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Time and memory benchmarks for loaders, plugins and graphs")
+    parser.add_argument('--events', type=int, default=10_000, help="started dialogs per day")
+    parser.add_argument('--days', type=int, default=7)
+    parser.add_argument('--users', type=int, default=None, help="distinct users, defaults to 80%% of events")
+    parser.add_argument('--agents', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--output', help="write results as JSON to this file")
+    parser.add_argument('--baseline', help="JSON results of an earlier run to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="allowed slowdown against the baseline")
+    args = parser.parse_args()
+
+    report = run_benchmarks(args.events, args.days, args.users or max(1, int(args.events * 0.8)),
+                            args.agents, args.repeat, args.workers)
+
+    for name, result in report['results'].items():
+        print(f"{name:45} {result['seconds']:10.4f}s {result['peak_bytes'] / 1024 / 1024:10.1f} MiB")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(report, file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as file:
+            regressions = compare(report, json.load(file), args.tolerance)
+        if regressions:
+            print("\nSlower than baseline:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
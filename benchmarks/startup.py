@@ -0,0 +1,73 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# modules a launch imports before it does any work, and how long that may take
+ENTRY_POINTS = ('main', 'app.report')
+STARTUP_BUDGET_MS = 250
+# only loaded once a graph is drawn or the API is called
+DEFERRED_MODULES = ('matplotlib', 'requests', 'urllib3', 'asyncio')
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - start
+print(json.dumps({{'seconds': seconds, 'loaded': [name for name in {deferred!r} if name in sys.modules]}}))
+"""
+
+
+def measure_import(module: str, repeat: int) -> dict:
+    # every run is a fresh interpreter, so nothing is already in sys.modules
+    runs = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, '-c', PROBE.format(module=module, deferred=DEFERRED_MODULES)],
+                                cwd=ROOT, capture_output=True, text=True, check=True).stdout
+        runs.append(json.loads(output.splitlines()[-1]))
+    return {'ms': min(run['seconds'] for run in runs) * 1000, 'loaded': runs[0]['loaded']}
+
+
+def slowest_imports(module: str, limit: int = 10) -> list[tuple[int, str]]:
+    # cumulative microseconds per imported module, from python -X importtime
+    stderr = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            cwd=ROOT, capture_output=True, text=True, check=True).stderr
+    timings = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        timings.append((int(cumulative), name.strip()))
+    return sorted(timings, reverse=True)[:limit]
+
+
+def check_startup(budget_ms: float, repeat: int) -> list[str]:
+    problems = []
+    for module in ENTRY_POINTS:
+        result = measure_import(module, repeat)
+        print(f"{module:20} {result['ms']:8.1f} ms")
+        if result['loaded']:
+            problems.append(f"{module} imports {', '.join(result['loaded'])} at startup")
+        if result['ms'] > budget_ms:
+            problems.append(f"{module} takes {result['ms']:.1f} ms to import, budget is {budget_ms} ms")
+            for cumulative, name in slowest_imports(module):
+                print(f"  {cumulative / 1000:8.1f} ms  {name}")
+    return problems
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Check that launching the app stays within its import budget")
+    parser.add_argument('--budget-ms', type=float, default=float(os.environ.get('STARTUP_BUDGET_MS', STARTUP_BUDGET_MS)))
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    problems = check_startup(args.budget_ms, args.repeat)
+    if problems:
+        print("\nStartup regressions:")
+        for line in problems:
+            print(f"  {line}")
+        sys.exit(1)
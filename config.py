@@ -0,0 +1,60 @@
+import os
+
+# API the APILoader fetches days from
+ENDPOINT = os.environ.get('FAST_TOP_ENDPOINT', 'http://localhost:8000/')
+HEADERS = {}
+# how a date is written into the API's `day` parameter. The API is asked for weekday names,
+# so only the coming week can be fetched by date; use e.g. '%d.%m.%Y' for an API that takes dates
+API_DAY_FORMAT = '%A'
+
+# HTTP client settings, see app/loaders/http.py
+HTTP_TIMEOUT = 30
+HTTP_RETRIES = 3
+HTTP_BACKOFF = 0.5
+HTTP_POOL_SIZE = 16
+HTTP_CACHE_TTL = 300
+# whole day responses are cached, the least recently used are dropped past this size
+HTTP_CACHE_BYTES = 256 * 1024 * 1024
+
+# number of worker processes for multi-day analysis, 1 runs everything in the current process
+ANALYSIS_WORKERS = os.cpu_count() or 1
+
+# API backfill: parallel requests in flight and request starts per second
+BACKFILL_CONCURRENCY = 8
+BACKFILL_RATE = 4
+
+# seconds between refreshes in live mode
+LIVE_REFRESH_SECONDS = 5
+# live mode lists only this many of the latest recharges
+LIVE_RECENT_RECHARGES = 10_000
+# query parameter the API takes to send only events after the cursor of its previous response
+# (the response then carries a 'cursor'). None for the API as it is, which sends the whole day
+LIVE_API_CURSOR = None
+
+# trace peak allocations per plugin with tracemalloc, slows analysis down noticeably
+METRICS_TRACE_MEMORY = False
+
+# graph rendering, see app/graphs/render.py. Series are downsampled to about one point per pixel of width.
+# Without a display (or with FAST_TOP_HEADLESS=1) graphs are saved to GRAPH_EXPORT_DIR instead of shown
+GRAPH_WIDTH_PX = 1200
+GRAPH_HEIGHT_PX = 600
+GRAPH_DPI = 100
+GRAPH_DOWNSAMPLE = 'lttb'
+GRAPH_HEADLESS = os.environ.get('FAST_TOP_HEADLESS') == '1'
+GRAPH_EXPORT_DIR = 'app/exports'
+
+# approximate analytics, see app/plugins/sketches.py. HyperLogLog precision p keeps 2**p registers with
+# about 1.04 / sqrt(2**p) standard error; KLL k bounds quantile rank error to roughly 1.7 / k
+SKETCH_HLL_PRECISION = 12
+SKETCH_KLL_K = 200
+
+# a single day with at least this many events is split by user into ANALYSIS_WORKERS shards,
+# see app/plugins/shards.py
+SHARD_MIN_EVENTS = 200_000
+
+# local query server, see app/server.py. Results of recently asked days are kept in memory,
+# the saved days are looked up again at most every SERVER_CATALOG_SECONDS
+SERVER_HOST = '127.0.0.1'
+SERVER_PORT = 8050
+SERVER_CACHE_ENTRIES = 10_000
+SERVER_CATALOG_SECONDS = 2
@@ -1,38 +1,63 @@
-import json
+import sys
+import time
+from datetime import datetime
 
-from app.browser import DirectoryBrowser
-from app.graphs.graph_factory import SimplePlotGraph, PlotDataNormalizer
-from app.loaders.get_loader import load_data
+import config
 from app.clients.CLI import CLI
-from app.plugins import plugins, PluginManager
-from app.utils.plot_builder import build_plot
-from app.plugins.plugins import DialogsCreated, SuccessRechargePlugin, RechargedAmountPlugin, ChannelEffectiveness
+
+# The plugins, the loaders and numpy under them are imported by the handlers that use them,
+# so the menu shows without waiting for them
 
 
 def open_file():
-    with open('data_example.txt', 'r') as f:
-        return json.load(f)
+    from app.loaders.stream import read_day
+
+    # the example day is optional, without it the app starts with nothing loaded
+    try:
+        return read_day('data_example.txt')
+    except FileNotFoundError:
+        return {'data': {'started': [], 'succeed': [], 'interrupted': []}}
+
 
+def analyze_new_data_piece(data: dict, metrics=None):
+    # LazyResults for the day, measured into `metrics`, a RunMetrics, when given
+    from app.plugins import PluginManager, plugins
 
-def analyze_new_data_piece(data: dict) -> dict[dict]:
     manager = PluginManager(plugins=plugins)
-    return manager.analyse_data(data)
+    return manager.analyse_lazily(data, metrics=metrics)
 
 
 class AnalyzerApp:
-    def __init__(self, prepared_data: dict, client: CLI):
+    def __init__(self, prepared_data, client: CLI):
         self.current_day: str = ''
-        self.analysis_results = prepared_data
+        # LazyResults of the loaded day, None reads the example day the first time results are needed
+        self._analysis_results = prepared_data
         self.client = client
 
+    @property
+    def analysis_results(self):
+        if self._analysis_results is None:
+            self._analysis_results = analyze_new_data_piece(open_file()['data'])
+        return self._analysis_results
+
+    @analysis_results.setter
+    def analysis_results(self, results) -> None:
+        self._analysis_results = results
+
     def run_main_menu(self):
         submenus = {
             'Show basic daily info': self.display_basic_daily_info,
+            'Show basic info for date range': self.display_basic_range_info,
+            'Approximate stats for date range': self.display_sketch_range_info,
+            'User cohorts for date range': self.display_cohort_range_info,
             'All analysis tools': self.run_analysis_menu,
             'Load more data from API': self.run_loader_menu,
+            'Backfill date range from API': self.run_backfill_menu,
+            'Live mode': self.run_live_menu,
             'Load previously saved file': self.run_browser_menu,
             'Save current data to file': self.save_data_to_file,
             'Build Graph': self.build_graph,
+            'Performance stats': self.show_performance_stats,
             'Exit': self.exit_app
         }
 
@@ -47,16 +72,17 @@ class AnalyzerApp:
 
     def run_analysis_menu(self):
         while True:
+            analyzers = self.analysis_results.describe()
             analysis_to_show = self.client.display_analyzer_menu(
-                [analyzer['desc'] for analyzer in self.analysis_results.values()],
-                [analyzer for analyzer in self.analysis_results]
+                [analyzer['desc'] for analyzer in analyzers.values()],
+                [analyzer for analyzer in analyzers]
             )
 
             if not analysis_to_show:
                 break
 
             self.client.render_divider()
-            self.analysis_results[analysis_to_show]['func'](self.analysis_results[analysis_to_show]['args'])
+            self.client.render_result(self.analysis_results[analysis_to_show])
             self.client.render_divider()
 
     def run_loader_menu(self):
@@ -65,7 +91,44 @@ class AnalyzerApp:
         if success:
             self.current_day = day_to_load
 
+    def run_backfill_menu(self):
+        start = input("Enter first day to fetch (DD.MM.YYYY): ")
+        end = input("Enter last day to fetch (DD.MM.YYYY): ")
+        from app.loaders.backfill import backfill
+
+        try:
+            failed = backfill(start, end)
+        except ValueError:
+            self.client.render_message("Dates should look like DD.MM.YYYY")
+            return
+        if failed:
+            self.client.render_message(f"Could not fetch {len(failed)} days: {', '.join(sorted(failed))}")
+
+    def run_live_menu(self):
+        from app.plugins import PluginManager, plugins
+        from app.plugins.lazy import LazyResults
+        from app.plugins.live import LiveStats, FileTail, ApiTail
+
+        source = input("Enter path of a growing .jsonl day file or leave empty to follow the API: ")
+        tail = FileTail(source) if source else ApiTail()
+        stats = LiveStats()
+        manager = PluginManager(plugins=plugins)
+
+        self.client.render_message("Live mode. Press Ctrl+C to return to main menu")
+        try:
+            while True:
+                # only the events added since the last refresh are read and folded into the totals
+                if stats.feed(tail.read_new()):
+                    self.analysis_results = LazyResults(manager.plugins, stats)
+                    self.display_basic_daily_info()
+                    self.display_agent_means(stats.agent_means())
+                time.sleep(config.LIVE_REFRESH_SECONDS)
+        except KeyboardInterrupt:
+            return
+
     def run_browser_menu(self):
+        from app.browser import DirectoryBrowser
+
         browser = DirectoryBrowser()
         saved_files_list = browser.get_saved_files_list()
         # print(saved_files_list)
@@ -75,17 +138,21 @@ class AnalyzerApp:
         self.load_from_source(file_to_load)
 
     def load_from_source(self, file: str, with_save: bool = False) -> bool:
+        from app.loaders.get_loader import load_data
+        from app.plugins.metrics import RunMetrics
+
         print(f"Starting loading process for source: {file}")
+        metrics = RunMetrics(source=file)
         if with_save:
             print(f"Plan to save loaded data to file")
-            new_data = load_data(file, with_save=True)
+            new_data = load_data(file, with_save=True, metrics=metrics)
         else:
-            new_data = load_data(file)
+            new_data = load_data(file, metrics=metrics)
             if not new_data['started']:
                 self.client.render_message("Could not fetch data!")
                 return False
 
-        self.analysis_results = analyze_new_data_piece(new_data)
+        self.analysis_results = analyze_new_data_piece(new_data, metrics=metrics)
         return True
 
     def exit_app(self):
@@ -96,15 +163,112 @@ class AnalyzerApp:
         self.load_from_source(self.current_day, with_save=True)
 
     def display_basic_daily_info(self):
-        basic_entries = {k: v for k, v in self.analysis_results.items() if v.get('type') == 'basic'}
+        # only the 'basic' entries are computed here, detailed ones wait until they are opened
+        basic_entries = [k for k, v in self.analysis_results.describe().items() if v.get('type') == 'basic']
         print("\n\nDaily results\n\n")
-        for desc, entry in basic_entries.items():
-            func = entry['func']
-            args = entry['args']
-            func(args)
+        for key in basic_entries:
+            self.client.render_result(self.analysis_results[key])
+        print("\n\n")
+
+    def display_agent_means(self, means: dict):
+        print("Running recharge time by agent\n")
+        for agent in sorted(means, key=str):
+            print(f"Agent {agent}: {means[agent]:.0f} seconds on average")
+        print("\n\n")
+
+    def show_performance_stats(self):
+        metrics = self.analysis_results.metrics
+        print(f"\n\nPerformance stats for {metrics.source or 'current data'}\n")
+        print(f"Loader: {metrics.loader['bytes']} bytes read in {metrics.loader['parse_seconds']:.3f} secs")
+        for name, values in metrics.plugins.items():
+            peak = f"{values['peak_bytes'] / 1024:.1f} KiB" if values['peak_bytes'] is not None else "not traced"
+            print(f"{name}: wall {values['wall_seconds']:.4f} secs, cpu {values['cpu_seconds']:.4f} secs, "
+                  f"{values['events']} events consumed, peak {peak}")
+        print("\nOnly entries opened so far are measured")
+
+        command = input("\nEnter 'json' or 'prometheus' to export, 'profile' to profile a plugin "
+                        "or any other symbol to return to main menu: ")
+        if command in ('json', 'prometheus'):
+            path = input("File to write: ")
+            with open(path, 'w', encoding='utf-8') as file:
+                file.write(metrics.to_json() if command == 'json' else metrics.to_prometheus())
+        elif command == 'profile':
+            from app.plugins import plugins
+            from app.plugins.metrics import profile_plugin
+
+            data = getattr(self.analysis_results.stats, 'data', None)
+            if data is None:
+                self.client.render_message("Profiling needs a loaded day")
+                return
+            plugin = self.client.display_analyzer_menu([plugin.desc for plugin in plugins], plugins)
+            if plugin:
+                print(profile_plugin(plugin, data))
+
+    def display_basic_range_info(self):
+        from app.catalog import Catalog
+        from app.plugins import plugins
+
+        start = input("Enter first day (DD.MM.YYYY) or leave empty for all saved days: ") or None
+        end = input("Enter last day (DD.MM.YYYY) or leave empty for all saved days: ") or None
+        catalog = Catalog()
+        catalog.refresh()
+        try:
+            # answered from the catalog, no day file is opened
+            totals = catalog.basic_metrics(start, end)
+        except ValueError:
+            self.client.render_message("Dates should look like DD.MM.YYYY")
+            return
+        print(f"\n\nResults for {totals.pop('days')} saved days\n\n")
+        for key, value in totals.items():
+            plugin = next(plugin for plugin in plugins if plugin.name == key)
+            print(f"{plugin.desc}: {value:.1%}" if isinstance(value, float) else f"{plugin.desc}: {value}")
+        print("\n\n")
+
+    def display_sketch_range_info(self):
+        from app.catalog import Catalog
+        from app.plugins import plugins
+        from app.utils.parallel import sketch_days
+
+        start = input("Enter first day (DD.MM.YYYY) or leave empty for all saved days: ") or None
+        end = input("Enter last day (DD.MM.YYYY) or leave empty for all saved days: ") or None
+        catalog = Catalog()
+        catalog.refresh()
+        try:
+            days = catalog.days(start, end)
+        except ValueError:
+            self.client.render_message("Dates should look like DD.MM.YYYY")
+            return
+        # per-day sketches are merged, so months of days cost a few kilobytes each
+        sketches = sketch_days([day['file'] for day in days])
+        print(f"\n\nResults for {len(days)} saved days\n\n")
+        for plugin in plugins:
+            if plugin.mergeable:
+                self.client.render_result(plugin.from_sketches(sketches)[plugin.name])
+        print("\n\n")
+
+    def display_cohort_range_info(self):
+        from app.plugins import cross_day_plugins
+        from app.user_index import UserIndex
+
+        start = input("Enter first day (DD.MM.YYYY) or leave empty for all saved days: ") or None
+        end = input("Enter last day (DD.MM.YYYY) or leave empty for all saved days: ") or None
+        index = UserIndex()
+        # bitmaps are built once for days saved since the last time, the range itself reads no day file
+        index.update()
+        try:
+            days = index.days(start, end)
+        except ValueError:
+            self.client.render_message("Dates should look like DD.MM.YYYY")
+            return
+        print(f"\n\nResults for {len(days)} saved days\n\n")
+        for plugin in cross_day_plugins:
+            self.client.render_result(plugin.from_bitmaps(days)[plugin.name])
         print("\n\n")
 
     def build_graph(self):
+        # matplotlib is only imported with the first graph
+        from app.plugins.plugins import DialogsCreated, SuccessRechargePlugin, RechargedAmountPlugin, ChannelEffectiveness
+        from app.utils.plot_builder import build_plot
 
         available_plugins = {
             "Total dialogs created": DialogsCreated,
@@ -115,18 +279,33 @@ class AnalyzerApp:
         }
 
         chosen_plugin = self.client.display_graph_menu(available_plugins)
+        start = input("Enter first day (DD.MM.YYYY) or leave empty for all saved days: ")
+        end = input("Enter last day (DD.MM.YYYY) or leave empty for all saved days: ")
+        try:
+            start = datetime.strptime(start, '%d.%m.%Y').date() if start else None
+            end = datetime.strptime(end, '%d.%m.%Y').date() if end else None
+        except ValueError:
+            self.client.render_message("Dates should look like DD.MM.YYYY")
+            return
         if isinstance(chosen_plugin, list):
-            build_plot(available_plugins[chosen_plugin])
+            build_plot(available_plugins[chosen_plugin], start=start, end=end)
             return
-        build_plot(available_plugins[chosen_plugin])
+        build_plot(available_plugins[chosen_plugin], start=start, end=end)
 
 
 if __name__ == '__main__':
-    data = open_file()
-    manager = PluginManager(plugins=plugins)
+    # `python main.py report ...` runs headless, see app/report.py
+    if len(sys.argv) > 1 and sys.argv[1] == 'report':
+        from app.report import main as run_report
+
+        sys.exit(run_report(sys.argv[2:]))
+    # `python main.py serve ...` answers queries over HTTP, see app/server.py
+    if len(sys.argv) > 1 and sys.argv[1] == 'serve':
+        from app.server import main as run_server
 
-    result = manager.analyse_data(data['data'])
+        sys.exit(run_server(sys.argv[2:]))
 
-    app = AnalyzerApp(prepared_data=result, client=CLI())
+    # the example day is read once the first menu entry needs results
+    app = AnalyzerApp(prepared_data=None, client=CLI())
     app.run_main_menu()
 
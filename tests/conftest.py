@@ -0,0 +1,70 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from tests.days import make_day
+
+
+@pytest.fixture(params=[0, 1, 2])
+def day(request) -> dict[str, list]:
+    return make_day(seed=request.param)
+
+
+# Local stand-in for the events API. Tests set `body` (or a function of the request path returning it),
+# `etag` and `failures` (number of 503s to send before answering) and read back `requests`,
+# the path and headers of every request received
+class StubApi:
+    def __init__(self):
+        self.body = {'data': {'started': [], 'succeed': [], 'interrupted': []}}
+        self.etag = '"1"'
+        self.failures = 0
+        self.requests = []
+        self.lock = threading.Lock()
+
+    def handler(self):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with api.lock:
+                    api.requests.append({'path': self.path, **{key.lower(): value for key, value in self.headers.items()}})
+                    failing = api.failures > 0
+                    api.failures -= failing
+                    body = api.body(self.path) if callable(api.body) else api.body
+                    etag = api.etag
+                if failing:
+                    self.send_response(503)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                if self.headers.get('If-None-Match') == etag:
+                    self.send_response(304)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                content = json.dumps(body).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(content)))
+                self.send_header('ETag', etag)
+                self.end_headers()
+                self.wfile.write(content)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+@pytest.fixture
+def stub_api():
+    api = StubApi()
+    server = ThreadingHTTPServer(('127.0.0.1', 0), api.handler())
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    api.endpoint = f"http://127.0.0.1:{server.server_address[1]}/"
+    yield api
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,16 @@
+import random
+from datetime import datetime
+
+from benchmarks.generate import generate_data
+
+
+def make_day(seed: int = 0, events: int = 2000, users: int = 600, agents: int = 12) -> dict[str, list]:
+    # A generated day where some users are logged as strings in some events, so joins have to treat
+    # 42 and '42' as one user the way the original plugins compared them
+    data = generate_data(datetime(2023, 5, 10), events, users, agents, seed)
+    rng = random.Random(seed)
+    for entries in data.values():
+        for entry in entries:
+            if rng.random() < 0.1:
+                entry['user'] = str(entry['user'])
+    return data
@@ -0,0 +1,65 @@
+from collections import defaultdict
+from datetime import datetime
+from typing import Any
+
+# What the original per-event plugins computed, kept as the oracle for the vectorised ones.
+# Recharge times are seconds, like the plugins return them now
+
+
+def recharge_seconds(started: dict[str, Any], succeed: dict[str, Any]) -> float:
+    started_time = datetime.strptime(started['time'], "%Y-%m-%dT%H:%M:%S%z").replace(tzinfo=None)
+    succeed_time = datetime.strptime(succeed['time'], "%Y-%m-%d %H:%M:%S")
+    return (succeed_time - started_time).total_seconds()
+
+
+def starts_by_user(data: dict[str, list]) -> dict[str, list]:
+    starts = defaultdict(list)
+    for entry in data['started']:
+        starts[str(entry['user'])].append(entry)
+    return starts
+
+
+def recharge_time_by_user(data: dict[str, list]) -> dict[str, float]:
+    # users with exactly one start, timed by their first success
+    starts = starts_by_user(data)
+    user_times = {}
+    for entry in data['succeed']:
+        user = str(entry['user'])
+        if user not in user_times and len(starts[user]) == 1:
+            user_times[user] = recharge_seconds(starts[user][0], entry)
+    return user_times
+
+
+def recharge_time_by_agent(data: dict[str, list]) -> dict[Any, dict[str, Any]]:
+    # keyed by the raw user id, so the last success of each raw id wins
+    starts = starts_by_user(data)
+    agent_times = {}
+    for entry in data['succeed']:
+        matching = starts[str(entry['user'])]
+        if len(matching) == 1:
+            agent_times[entry['user']] = {'id:': entry['agent'], 'user': entry['user'],
+                                          'time_difference': recharge_seconds(matching[0], entry)}
+    return agent_times
+
+
+def results(data: dict[str, list]) -> dict[str, Any]:
+    count_by_hour = defaultdict(int)
+    for entry in data['started']:
+        count_by_hour[datetime.fromisoformat(entry['time']).strftime('%H')] += 1
+    agents = list(set(int(entry['agent']) for entry in data['succeed']))
+    started, succeed = len(data['started']), len(data['succeed'])
+    return {
+        'dialogs created': started,
+        'Successful recharges': succeed,
+        'failed_recharges': len(data['interrupted']),
+        'total recharged amount': sum(int(entry['coin']) for entry in data['succeed']),
+        'recharged users': [{'user': entry['user'], 'recharge_amount': entry['coin']} for entry in data['succeed']],
+        'agent recharges': [{'agent': agent,
+                             'coins': sum(entry['coin'] for entry in data['succeed'] if int(entry['agent']) == agent)}
+                            for agent in agents],
+        'dialogs created by time': sorted(({hour: count} for hour, count in count_by_hour.items()),
+                                          key=lambda line: next(iter(line))),
+        'recharge time by user': recharge_time_by_user(data),
+        'recharge time by agent': recharge_time_by_agent(data),
+        'channel effectiveness': succeed / started if started > 0 else 0,
+    }
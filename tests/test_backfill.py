@@ -0,0 +1,63 @@
+import asyncio
+import datetime
+import json
+import time
+
+import config
+from app.catalog import Catalog
+from app.loaders.backfill import backfill_async
+from app.loaders.http import HttpClient
+from app.loaders.loaders import APILoader, Loader
+from tests.days import make_day
+
+
+class GeneratedLoader(Loader):
+    # the API stand-in, every day gets its own generated events
+    def load_data(self, day: str = None):
+        time.sleep(0.01)
+        return {'data': make_day(seed=int(day[:2]), events=200)}
+
+
+def test_parallel_backfill_records_every_day(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    failures = asyncio.run(backfill_async('01.01.2024', '31.03.2024', concurrency=8, rate=0,
+                                          loader=GeneratedLoader()))
+    assert failures == {}
+    logs = tmp_path / 'app' / 'logs'
+    assert len(list(logs.glob('*.day'))) == 91
+    with open(logs / 'catalog.manifest', encoding='utf-8') as file:
+        assert len(json.load(file)['days']) == 91
+    assert len(Catalog(str(logs)).days('01.02.2024', '29.02.2024')) == 29
+
+
+def test_backfill_skips_saved_days(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    asyncio.run(backfill_async('01.01.2024', '03.01.2024', rate=0, loader=GeneratedLoader()))
+    failures = asyncio.run(backfill_async('01.01.2024', '05.01.2024', rate=0, loader=GeneratedLoader()))
+    assert failures == {}
+    assert len(Catalog(str(tmp_path / 'app' / 'logs')).entries) == 5
+
+
+def test_backfill_asks_the_api_by_weekday(stub_api, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    stub_api.body = {'data': make_day(events=20)}
+    client = HttpClient(endpoint=stub_api.endpoint, backoff=0, cache_dir=None)
+    today = datetime.date.today()
+    days = [(today + datetime.timedelta(days=offset)).strftime('%d.%m.%Y') for offset in (-1, 0, 1)]
+
+    failures = asyncio.run(backfill_async(days[0], days[-1], rate=0, loader=APILoader(client)))
+
+    # a weekday name stands for the coming week, yesterday can not be asked for
+    assert list(failures) == [days[0]]
+    assert sorted(request['path'] for request in stub_api.requests) == \
+        sorted(f"/?day={(today + datetime.timedelta(days=offset)).strftime('%A')}" for offset in (0, 1))
+
+
+def test_backfill_sends_dates_to_an_api_that_takes_them(stub_api, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(config, 'API_DAY_FORMAT', '%d.%m.%Y')
+    stub_api.body = {'data': make_day(events=20)}
+    client = HttpClient(endpoint=stub_api.endpoint, backoff=0, cache_dir=None)
+
+    assert asyncio.run(backfill_async('01.01.2024', '02.01.2024', rate=0, loader=APILoader(client))) == {}
+    assert sorted(request['path'] for request in stub_api.requests) == ['/?day=01.01.2024', '/?day=02.01.2024']
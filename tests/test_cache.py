@@ -0,0 +1,38 @@
+import os
+
+from app.plugins import DialogsCreated, SuccessRechargePlugin
+from app.utils.cache import ResultCache
+
+
+def write_day(name: str, content: str = '{}') -> None:
+    with open(f"app/logs/{name}", 'w', encoding='utf-8') as file:
+        file.write(content)
+
+
+def test_invalidate_only_touches_entries_of_that_file(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs('app/logs')
+    write_day('01.01.2024.json')
+    write_day('02.01.2024.json')
+    cache = ResultCache(cache_dir='cache')
+    for name in ('01.01.2024.json', '02.01.2024.json'):
+        for plugin in (DialogsCreated, SuccessRechargePlugin):
+            assert cache.put(name, plugin, {'args': name})
+
+    assert cache.invalidate('01.01.2024.json') == 2
+    assert cache.get('01.01.2024.json', DialogsCreated) is None
+    assert cache.get('02.01.2024.json', SuccessRechargePlugin) == {'args': '02.01.2024.json'}
+    assert cache.invalidate() == 2
+    assert cache.get('02.01.2024.json', DialogsCreated) is None
+
+
+def test_changed_file_stops_matching_and_evict_keeps_the_size_bound(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs('app/logs')
+    write_day('01.01.2024.json')
+    cache = ResultCache(cache_dir='cache', max_bytes=0)
+    cache.put('01.01.2024.json', DialogsCreated, 1)
+    write_day('01.01.2024.json', '{"data": {}}')
+    assert cache.get('01.01.2024.json', DialogsCreated) is None
+    assert cache.evict() == 1
+    assert list((tmp_path / 'cache').iterdir()) == []
@@ -0,0 +1,49 @@
+import json
+import os
+from datetime import datetime
+
+from app import browser, catalog
+from app.browser import DirectoryBrowser
+from app.catalog import Catalog
+from benchmarks.generate import write_days
+
+
+def test_listing_does_not_open_day_files(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    write_days('app/logs', datetime(2024, 1, 1), 2, 50, 40, 3, file_format='day')
+    logs = tmp_path / 'app' / 'logs'
+    (logs / '01.01.2024.json').write_text('{"data": {}}')
+    (logs / 'notes.json').write_text('{}')
+
+    def fail(path: str):
+        raise AssertionError(f"{path} was opened")
+
+    monkeypatch.setattr(catalog, 'read_day', fail)
+    monkeypatch.setattr(browser, 'Catalog', None)
+    listed = DirectoryBrowser().get_saved_files_list()
+    assert [name[:10] for name in listed] == ['02.01.2024', '01.01.2024']
+    # a day kept in several formats is listed through its preferred file
+    assert '01.01.2024.json' not in listed
+
+
+def test_files_that_can_not_be_read_are_tried_once_per_change(tmp_path, capsys):
+    (tmp_path / 'notes.json').write_text('{"todo": []}')
+    (tmp_path / '03.01.2024.json').write_text('not json')
+    assert Catalog(str(tmp_path)).refresh()
+    assert capsys.readouterr().out.count('Skipping') == 2
+
+    # a new catalog reads the rejected files from the manifest and leaves them alone
+    assert not Catalog(str(tmp_path)).refresh()
+    assert capsys.readouterr().out == ''
+
+    day = tmp_path / '03.01.2024.json'
+    day.write_text(json.dumps({'data': {'started': [], 'succeed': [], 'interrupted': []}}))
+    os.utime(day, ns=(1, 1))
+    fixed = Catalog(str(tmp_path))
+    assert fixed.refresh()
+    assert list(fixed.entries) == ['03.01.2024.json']
+    assert list(fixed.rejected) == ['notes.json']
+
+    (tmp_path / 'notes.json').unlink()
+    assert Catalog(str(tmp_path)).refresh()
+    assert Catalog(str(tmp_path)).rejected == {}
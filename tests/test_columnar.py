@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+from app.frame import DayFrame, EVENT_KINDS
+from app.loaders.columnar import ColumnarFormatError, open_columnar_day, write_columnar_day
+from app.plugins import PluginManager
+from tests import reference
+from tests.test_frame import ORIGINAL_PLUGINS, args
+
+
+def test_round_trip_keeps_every_column(day, tmp_path):
+    frame = DayFrame.from_data(day)
+    path = str(tmp_path / 'day.day')
+    write_columnar_day(path, frame)
+    loaded = open_columnar_day(path)
+    assert loaded.users == frame.users and loaded.agents == frame.agents
+    for kind in EVENT_KINDS:
+        for written, read in zip(frame[kind].columns(), loaded[kind].columns()):
+            assert np.array_equal(written, read)
+
+
+def test_results_from_a_saved_day_match_original_plugins(day, tmp_path):
+    path = str(tmp_path / 'day.day')
+    write_columnar_day(path, DayFrame.from_data(day))
+    analysis = PluginManager(ORIGINAL_PLUGINS).analyse_data(open_columnar_day(path), shards=1)
+    assert args(analysis) == reference.results(day)
+
+
+def test_empty_day_round_trip(tmp_path):
+    path = str(tmp_path / 'empty.day')
+    write_columnar_day(path, DayFrame.from_data({kind: [] for kind in EVENT_KINDS}))
+    assert all(len(open_columnar_day(path)[kind]) == 0 for kind in EVENT_KINDS)
+
+
+def test_other_files_are_refused(tmp_path):
+    path = tmp_path / 'notes.day'
+    path.write_bytes(b'{"data": {}}')
+    with pytest.raises(ColumnarFormatError):
+        open_columnar_day(str(path))
@@ -0,0 +1,68 @@
+import asyncio
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import pytest
+
+from app.catalog import Catalog
+from app.frame import as_frame
+from app.loaders.stream import read_day
+from app.plugins import plugins, cross_day_plugins
+from app.plugins.plugins import CAPABILITY_HOOKS, PluginInterface, RangePlugin
+from app.report import select_plugins
+from app.server import QueryServer
+from benchmarks.generate import write_days
+
+
+def recharging_users(entry: dict) -> set[str]:
+    frame = as_frame(read_day(f"app/logs/{entry['file']}")['data'])
+    return {str(frame.users[user]) for user in frame.succeed.user.tolist()}
+
+
+def test_cross_day_plugins_are_not_run_per_day():
+    assert not any(plugin.cross_day for plugin in plugins)
+    assert all(plugin.cross_day for plugin in cross_day_plugins)
+    assert select_plugins(None) == plugins
+    with pytest.raises(ValueError, match="range of days"):
+        select_plugins('dialogs created,cohort retention')
+
+
+def test_plugins_define_the_hooks_their_flags_promise():
+    for plugin in plugins + cross_day_plugins:
+        for flag, hook in CAPABILITY_HOOKS.items():
+            assert getattr(plugin, flag) == hasattr(plugin, hook), (plugin.__name__, flag)
+    assert all(issubclass(plugin, PluginInterface) for plugin in plugins)
+    assert not any(hasattr(plugin, 'collect') for plugin in cross_day_plugins)
+    assert all(issubclass(plugin, RangePlugin) for plugin in cross_day_plugins)
+
+    with pytest.raises(TypeError, match="from_rollup"):
+        class Unsummable(PluginInterface):
+            rollup = True
+
+
+def test_query_answers_cross_day_plugins_over_the_range(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    write_days('app/logs', datetime(2024, 1, 1), 5, 300, 200, 5)
+
+    async def query() -> dict:
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            status, body = await QueryServer(pool).query({'plugin': ['dialogs created,RepeatRecharges,cohort retention'],
+                                                          'from': ['02.01.2024'], 'to': ['04.01.2024']})
+        assert status == 200
+        return body
+
+    body = asyncio.run(query())
+    assert [row['date'] for row in body['days']] == ['02.01.2024', '03.01.2024', '04.01.2024']
+    assert all(set(row) == {'date', 'dialogs created'} for row in body['days'])
+
+    days = Catalog().days('02.01.2024', '04.01.2024')
+    recharged = [recharging_users(entry) for entry in days]
+    by_user = Counter(user for users in recharged for user in users)
+    repeat = body['range']['repeat recharges']
+    assert repeat['recharged users'] == len(by_user)
+    assert repeat['repeat users'] == sum(1 for count in by_user.values() if count > 1)
+    cohorts = body['range']['cohort retention']
+    assert [cohort['date'] for cohort in cohorts] == [entry['date'] for entry in days]
+    assert [cohort['cohort'] for cohort in cohorts] == [len(users) for users in recharged]
+    assert cohorts[0]['recharged again'] == len(recharged[0] & (recharged[1] | recharged[2]))
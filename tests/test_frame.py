@@ -0,0 +1,75 @@
+import json
+
+from app.frame import DayFrame, compact_event
+from app.loaders.stream import data_to_events, read_day, write_events
+from app.plugins import PluginManager
+from app.plugins.plugins import (DialogsCreated, SuccessRechargePlugin, FailedRechargePlugin, RechargedAmountPlugin,
+                                 RechargedUsers, AgentRecharges, DialogsByTime, RechargeTime,
+                                 AgentAverageRechargeTime, ChannelEffectiveness)
+from app.utils.timestamps import parse_timestamp, parse_timestamps
+from tests import reference
+from tests.days import make_day
+
+ORIGINAL_PLUGINS = [DialogsCreated, SuccessRechargePlugin, FailedRechargePlugin, RechargedAmountPlugin, RechargedUsers,
+                    AgentRecharges, DialogsByTime, RechargeTime, AgentAverageRechargeTime, ChannelEffectiveness]
+
+
+def args(analysis: dict) -> dict:
+    return {key: value.args for key, value in analysis.items()}
+
+
+def test_shared_pass_matches_original_plugins(day):
+    expected = reference.results(day)
+    assert args(PluginManager(ORIGINAL_PLUGINS).analyse_data(day, shards=1)) == expected
+
+
+def test_frame_input_matches_dict_input(day):
+    from_dict = args(PluginManager(ORIGINAL_PLUGINS).analyse_data(day, shards=1))
+    from_frame = args(PluginManager(ORIGINAL_PLUGINS).analyse_data(DayFrame.from_data(day), shards=1))
+    assert from_frame == from_dict
+
+
+def test_each_plugin_alone_matches_original(day):
+    expected = reference.results(day)
+    for plugin in ORIGINAL_PLUGINS:
+        assert plugin.analyze(day)[plugin.name].args == expected[plugin.name], plugin.name
+
+
+def test_empty_day():
+    day = {'started': [], 'succeed': [], 'interrupted': []}
+    assert args(PluginManager(ORIGINAL_PLUGINS).analyse_data(day, shards=1)) == reference.results(day)
+
+
+def test_recharged_users_keep_amounts_as_written(tmp_path):
+    day = make_day(seed=3, events=300)
+    for position, entry in enumerate(day['succeed']):
+        if position % 3 == 0:
+            entry['coin'] = str(entry['coin'])
+    expected = [{'user': entry['user'], 'recharge_amount': entry['coin']} for entry in day['succeed']]
+    jsonl = str(tmp_path / 'day.jsonl')
+    write_events(jsonl, data_to_events(day))
+    hooked = json.loads(json.dumps({'data': day}), object_hook=compact_event)['data']
+    for data in (day, DayFrame.from_data(day), hooked, read_day(jsonl)['data']):
+        assert RechargedUsers.analyze(data)[RechargedUsers.name].args == expected
+
+
+def test_compact_event_only_compacts_day_events():
+    day = make_day(seed=4, events=200)
+    day['succeed'][0]['channel'] = 'web'
+    document = {'data': {'started': day['started'], 'succeed': day['succeed']},
+                'requested by': {'user': 'ops', 'agent': 7},
+                'history': [{'user': 1, 'time': '2023-05-10 10:00:00'}]}
+    parsed = json.loads(json.dumps(document), object_hook=compact_event)
+    assert parsed['requested by'] == {'user': 'ops', 'agent': 7}
+    assert parsed['history'] == [{'user': 1, 'time': '2023-05-10 10:00:00'}]
+    frame = parsed['data']
+    assert isinstance(frame, DayFrame) and len(frame.interrupted) == 0
+    expected = dict(day, interrupted=[])
+    assert args(PluginManager(ORIGINAL_PLUGINS).analyse_data(frame, shards=1)) == reference.results(expected)
+
+
+def test_parse_timestamps_matches_parse_timestamp():
+    values = ['2023-05-10T10:00:05+03:00', '2023-05-10 10:00:05', None, '2023-05-10T10:00:05+03:00']
+    assert parse_timestamps(values).tolist() == [list(parse_timestamp(values[0])), list(parse_timestamp(values[1])),
+                                                 [0, 0], list(parse_timestamp(values[0]))]
+    assert parse_timestamps([]).shape == (0, 2)
@@ -0,0 +1,35 @@
+from datetime import date, datetime
+
+from app.graphs import graph_factory
+from app.graphs.graph_factory import PlotDataNormalizer
+from app.loaders.stream import read_day
+from app.plugins import DialogsByTime
+from app.utils.cache import ResultCache
+from benchmarks.generate import write_days
+
+
+def test_days_that_can_not_be_read_are_skipped(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    write_days('app/logs', datetime(2024, 1, 1), 3, 100, 80, 5)
+    analyze_days = graph_factory.analyze_days
+
+    def second_day_vanished(files: list, plugins: list, workers: int = None) -> list:
+        return [None if file.startswith('02.01') else result
+                for file, result in zip(files, analyze_days(files, plugins, workers=1))]
+
+    monkeypatch.setattr(graph_factory, 'analyze_days', second_day_vanished)
+    data = PlotDataNormalizer.prepare_data(plugin=DialogsByTime, cache=ResultCache(cache_dir='cache'))
+    assert data['x'] == ['01.01.2024', '03.01.2024']
+    assert len(data['y']) == 2
+
+
+def test_graph_covers_only_the_asked_range(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    # the range crosses a year, so labels need the full date
+    write_days('app/logs', datetime(2023, 12, 30), 5, 100, 80, 5)
+    expected = {day: DialogsByTime.analyze(read_day(f"app/logs/{day}.json")['data'])[DialogsByTime.name].args
+                for day in ('31.12.2023', '01.01.2024', '02.01.2024')}
+    data = PlotDataNormalizer.prepare_data(plugin=DialogsByTime, cache=ResultCache(cache_dir='cache'), workers=1,
+                                           start=date(2023, 12, 31), end=date(2024, 1, 2))
+    assert data['x'] == list(expected)
+    assert data['y'] == list(expected.values())
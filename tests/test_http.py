@@ -0,0 +1,114 @@
+import threading
+import time
+
+import pytest
+import requests
+
+from app.loaders import http
+from app.loaders.get_loader import load_data
+from app.loaders.http import HttpClient
+from tests.days import make_day
+
+
+def make_client(stub_api, tmp_path, **kwargs) -> HttpClient:
+    kwargs.setdefault('cache_ttl', 60)
+    kwargs.setdefault('backoff', 0)
+    return HttpClient(endpoint=stub_api.endpoint, cache_dir=str(tmp_path / 'http'), **kwargs)
+
+
+def test_fresh_response_is_served_from_cache(stub_api, tmp_path):
+    client = make_client(stub_api, tmp_path)
+    assert client.get_json({'day': 'Monday'}) == stub_api.body
+    assert client.get_json({'day': 'Monday'}) == stub_api.body
+    assert len(stub_api.requests) == 1
+    assert client.last_bytes == 0
+
+
+def test_other_params_are_cached_separately(stub_api, tmp_path):
+    client = make_client(stub_api, tmp_path)
+    client.get_json({'day': 'Monday'})
+    client.get_json({'day': 'Tuesday'})
+    assert [request['path'] for request in stub_api.requests] == ['/?day=Monday', '/?day=Tuesday']
+
+
+def test_expired_response_is_revalidated_with_etag(stub_api, tmp_path):
+    client = make_client(stub_api, tmp_path, cache_ttl=0)
+    first = client.get_json()
+    assert client.last_bytes > 0
+    assert client.get_json() == first
+    assert stub_api.requests[1]['if-none-match'] == stub_api.etag
+    # the 304 carries no body, nothing was downloaded
+    assert client.last_bytes == 0
+
+
+def test_changed_response_replaces_cached_body(stub_api, tmp_path):
+    client = make_client(stub_api, tmp_path, cache_ttl=0)
+    client.get_json()
+    stub_api.body = {'data': make_day(events=10)}
+    stub_api.etag = '"2"'
+    assert client.get_json() == stub_api.body
+
+
+def test_server_errors_are_retried(stub_api, tmp_path):
+    stub_api.failures = 2
+    client = make_client(stub_api, tmp_path, retries=3, backoff=0.1)
+    started = time.perf_counter()
+    assert client.get_json() == stub_api.body
+    assert len(stub_api.requests) == 3
+    # the second retry waits backoff * 2
+    assert time.perf_counter() - started >= 0.2
+
+
+def test_retries_are_bounded(stub_api, tmp_path):
+    stub_api.failures = 10
+    client = make_client(stub_api, tmp_path, retries=2)
+    with pytest.raises(requests.RequestException):
+        client.get_json()
+    assert len(stub_api.requests) == 3
+
+
+def test_load_with_save_fetches_once(stub_api, tmp_path, monkeypatch):
+    stub_api.body = {'data': make_day(events=50)}
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'app' / 'logs').mkdir(parents=True)
+    monkeypatch.setattr(http, '_client', make_client(stub_api, tmp_path))
+
+    data = load_data('Monday', with_save=True)
+
+    assert len(stub_api.requests) == 1
+    assert len(data['started']) == 50
+    assert len(list((tmp_path / 'app' / 'logs').glob('*.day'))) == 1
+
+
+def test_cache_drops_least_recently_used_responses(stub_api, tmp_path):
+    stub_api.body = lambda path: {'data': make_day(events=20), 'path': path}
+    client = make_client(stub_api, tmp_path)
+    client.get_json({'day': '01.05.2023'})
+    size = next((tmp_path / 'http').glob('*.json')).stat().st_size
+    client.max_cache_bytes = size * 2 + size // 2
+    client.get_json({'day': '02.05.2023'})
+    time.sleep(0.01)
+    # the first day is asked again, so the second one is now the least recently used
+    client.get_json({'day': '01.05.2023'})
+    time.sleep(0.01)
+    client.get_json({'day': '03.05.2023'})
+
+    assert len(list((tmp_path / 'http').glob('*.json'))) == 2
+    client.get_json({'day': '01.05.2023'})
+    client.get_json({'day': '02.05.2023'})
+    assert [request['path'] for request in stub_api.requests] == \
+        ['/?day=01.05.2023', '/?day=02.05.2023', '/?day=03.05.2023', '/?day=02.05.2023']
+
+
+def test_every_thread_has_its_own_session(stub_api, tmp_path):
+    client = make_client(stub_api, tmp_path)
+    sessions = []
+    threads = [threading.Thread(target=lambda: sessions.append(client.session)) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len({id(session) for session in sessions}) == 3
+    assert client.session is client.session
+    client.close()
+    assert client._sessions == []
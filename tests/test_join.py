@@ -0,0 +1,25 @@
+from app.plugins.plugins import RechargeTime, AgentAverageRechargeTime
+from tests import reference
+
+
+def test_recharge_time_by_user_matches_per_event_join(day):
+    assert RechargeTime.analyze(day)[RechargeTime.name].args == reference.recharge_time_by_user(day)
+
+
+def test_recharge_time_by_agent_matches_per_event_join(day):
+    result = AgentAverageRechargeTime.analyze(day)[AgentAverageRechargeTime.name].args
+    expected = reference.recharge_time_by_agent(day)
+    assert result == expected
+    assert list(result) == list(expected)
+
+
+def test_users_with_several_starts_are_not_timed():
+    day = {
+        'started': [{'user': 1, 'agent': 1, 'time': '2023-05-10T10:00:00+03:00'},
+                    {'user': '1', 'agent': 1, 'time': '2023-05-10T10:05:00+03:00'},
+                    {'user': 2, 'agent': 2, 'time': '2023-05-10T10:00:00+03:00'}],
+        'succeed': [{'user': '1', 'agent': 1, 'coin': 5, 'time': '2023-05-10 10:10:00'},
+                    {'user': '2', 'agent': 2, 'coin': 5, 'time': '2023-05-10 10:01:30'}],
+        'interrupted': [],
+    }
+    assert RechargeTime.analyze(day)[RechargeTime.name].args == {'2': 90.0}
@@ -0,0 +1,45 @@
+from app.plugins import PluginManager
+from app.plugins.engine import DayStats, JOINS, RECHARGES
+from app.plugins.lazy import LazyResults
+from tests import reference
+from tests.test_frame import ORIGINAL_PLUGINS, args
+
+
+def lazy(day) -> LazyResults:
+    # a single shard, the day is read through a plain DayStats
+    return PluginManager(ORIGINAL_PLUGINS).analyse_lazily(day, shards=1)
+
+
+def test_unsharded_day_reads_through_day_stats(day):
+    results = lazy(day)
+    assert type(results.stats) is DayStats
+
+
+def test_nothing_is_computed_before_an_entry_is_read(day):
+    results = lazy(day)
+    described = results.describe()
+    assert list(described) == [plugin.name for plugin in ORIGINAL_PLUGINS]
+    assert described['recharge time by user'] == {'desc': "Recharge time by user", 'type': 'detailed'}
+    assert results.stats.requires == set()
+    assert results.metrics.plugins == {}
+
+
+def test_lazy_entries_match_original_plugins(day):
+    assert args(lazy(day)) == reference.results(day)
+
+
+def test_basic_entries_do_not_build_detailed_accumulators(day):
+    results = lazy(day)
+    basic = [key for key, entry in results.describe().items() if entry['type'] == 'basic']
+    for key in basic:
+        results[key]
+    assert not results.stats.requires & {RECHARGES, JOINS}
+    assert set(results.metrics.plugins) == set(basic)
+
+
+def test_entries_are_computed_once(day):
+    results = lazy(day)
+    first = results['recharge time by agent']
+    assert results['recharge time by agent'] is first
+    assert list(results.metrics.plugins) == ['recharge time by agent']
+    assert first.args == reference.results(day)['recharge time by agent']
@@ -0,0 +1,110 @@
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+import config
+from app.loaders.http import HttpClient
+from app.plugins import PluginManager, plugins
+from app.plugins.live import ApiTail, LiveStats
+from app.utils.timestamps import to_seconds
+from tests import reference
+
+
+def args(analysis: dict) -> dict:
+    return {key: value.args for key, value in analysis.items()}
+
+
+def test_live_stats_match_batch(day):
+    stats = LiveStats()
+    stats.feed((kind, entry) for kind in day for entry in day[kind])
+    assert args(PluginManager(plugins).collect(stats)) == args(PluginManager(plugins).analyse_data(day, shards=1))
+
+
+def test_live_stats_fed_in_time_order_match_batch(day):
+    # events arrive interleaved and in small batches, as a growing day file is read
+    arrivals = sorted(((kind, entry) for kind in day for entry in day[kind]), key=lambda event: to_seconds(event[1]['time']))
+    stats = LiveStats()
+    for start in range(0, len(arrivals), 250):
+        stats.feed(arrivals[start:start + 250])
+    got = args(PluginManager(plugins).collect(stats))
+    expected = args(PluginManager(plugins).analyse_data(day, shards=1))
+    # recharged users are listed in the order they arrived
+    recharged = lambda users: sorted((str(user['user']), user['recharge_amount']) for user in users)
+    assert recharged(got.pop('recharged users')) == recharged(expected.pop('recharged users'))
+    assert got == expected
+
+
+def test_live_agent_means_follow_the_batch_join(day):
+    arrivals = sorted(((kind, entry) for kind in day for entry in day[kind]), key=lambda event: to_seconds(event[1]['time']))
+    stats = LiveStats()
+    for start in range(0, len(arrivals), 250):
+        stats.feed(arrivals[start:start + 250])
+        seen = {kind: [entry for got, entry in arrivals[:start + 250] if got == kind] for kind in day}
+        by_agent = {}
+        for pair in reference.recharge_time_by_agent(seen).values():
+            by_agent.setdefault(pair['id:'], []).append(pair['time_difference'])
+        assert stats.agent_means() == pytest.approx({agent: sum(times) / len(times) for agent, times in by_agent.items()})
+
+
+def test_live_stats_keep_no_events(day):
+    stats = LiveStats(recent_recharges=10)
+    stats.feed((kind, entry) for kind in day for entry in day[kind])
+    assert stats.recharges == [{'user': entry['user'], 'recharge_amount': entry['coin']} for entry in day['succeed'][-10:]]
+    # recharge times are only kept for users that can still be paired
+    assert all(stats.start_counts.get(user, 0) <= 1 for user in stats.user_recharges)
+
+
+def events(count: int) -> list[dict]:
+    return [{'id': index, 'user': index, 'agent': 1, 'time': '10.05.2023 10:00:00'} for index in range(count)]
+
+
+def api_client(stub_api) -> HttpClient:
+    return HttpClient(endpoint=stub_api.endpoint, backoff=0, cache_ttl=0, cache_dir=None)
+
+
+def test_api_tail_asks_for_events_after_cursor(stub_api, monkeypatch):
+    monkeypatch.setattr(config, 'LIVE_API_CURSOR', 'since')
+    day = events(5)
+
+    def respond(path: str) -> dict:
+        since = int(parse_qs(urlsplit(path).query).get('since', ['0'])[0])
+        return {'data': {'started': day[since:]}, 'cursor': len(day)}
+
+    stub_api.body = respond
+    tail = ApiTail(client=api_client(stub_api))
+    assert [entry['id'] for _, entry in tail.read_new()] == [0, 1, 2, 3, 4]
+    day.extend(events(7)[5:])
+    stub_api.etag = '"2"'
+    assert [entry['id'] for _, entry in tail.read_new()] == [5, 6]
+    assert list(tail.read_new()) == []
+    assert 'since=7' in stub_api.requests[-1]['path']
+
+
+def test_api_tail_sends_no_cursor_unless_configured(stub_api):
+    stub_api.body = {'data': {'started': events(3)}, 'cursor': 3}
+    tail = ApiTail(client=api_client(stub_api))
+    assert len(list(tail.read_new())) == 3
+    assert list(tail.read_new()) == []
+    assert [request['path'] for request in stub_api.requests] == ['/', '/']
+
+
+def test_api_tail_without_cursor_feeds_each_event_once(stub_api):
+    stub_api.body = {'data': {'started': events(3), 'succeed': events(1)}}
+    tail = ApiTail(client=api_client(stub_api))
+    assert len(list(tail.read_new())) == 4
+    assert list(tail.read_new()) == []
+
+    stub_api.body = {'data': {'started': events(5), 'succeed': events(1)}}
+    stub_api.etag = '"2"'
+    assert [(kind, entry['id']) for kind, entry in tail.read_new()] == [('started', 3), ('started', 4)]
+
+
+def test_api_tail_is_not_served_from_cache(stub_api, monkeypatch):
+    monkeypatch.setattr('config.ENDPOINT', stub_api.endpoint)
+    tail = ApiTail()
+    assert tail.client.cache_dir is None
+    stub_api.body = {'data': {'started': events(2)}}
+    assert len(list(tail.read_new())) == 2
+    stub_api.body = {'data': {'started': events(4)}}
+    stub_api.etag = '"2"'
+    assert len(list(tail.read_new())) == 2
@@ -0,0 +1,34 @@
+from app.plugins import PluginManager
+from app.plugins.metrics import RunMetrics
+from tests.test_frame import ORIGINAL_PLUGINS
+
+
+def test_plugins_record_the_events_they_consume(day):
+    metrics = RunMetrics()
+    PluginManager(ORIGINAL_PLUGINS).analyse_data(day, metrics=metrics, shards=1)
+    started, succeed = len(day['started']), len(day['succeed'])
+    consumed = {name: values['events'] for name, values in metrics.plugins.items()}
+    assert consumed['dialogs created'] == 0
+    assert consumed['total recharged amount'] == succeed
+    assert consumed['dialogs created by time'] == started
+    assert consumed['recharge time by user'] == started + succeed
+    # the shared pass reads every kind its accumulators need once
+    assert consumed['shared accumulators'] == started + succeed
+
+
+def test_lazy_entries_record_the_events_they_consume(day):
+    results = PluginManager(ORIGINAL_PLUGINS).analyse_lazily(day, shards=1)
+    results['agent recharges']
+    assert results.metrics.plugins['agent recharges']['events'] == len(day['succeed'])
+
+
+def test_prometheus_label_values_are_escaped():
+    metrics = RunMetrics(source='C:\\logs\\"10.05.2023"\nday')
+    with metrics.measure('a "quoted" plugin', 3):
+        pass
+    text = metrics.to_prometheus()
+    assert 'source="C:\\\\logs\\\\\\"10.05.2023\\"\\nday"' in text
+    assert 'plugin="a \\"quoted\\" plugin"' in text
+    assert 'fast_top_plugin_events{' in text
+    # one sample or comment per line, nothing was split by the newline in the source
+    assert all(line.startswith(('#', 'fast_top_')) for line in text.splitlines())
@@ -0,0 +1,38 @@
+import json
+
+from app.clients.renderers import RENDERERS, render, render_plain
+from app.plugins import PluginManager, plugins, cross_day_plugins
+from app.plugins.results import AnalysisResult
+from tests import reference
+
+
+def test_every_plugin_has_a_renderer():
+    assert {plugin.name for plugin in plugins + cross_day_plugins} <= set(RENDERERS)
+
+
+def test_results_render_through_their_plugin_renderer(day, capsys):
+    analysis = PluginManager(plugins).analyse_data(day, shards=1)
+    expected = reference.results(day)
+    render(analysis['dialogs created'])
+    render(analysis['channel effectiveness'])
+    render(analysis['agent recharges'])
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0] == f"Number of dialogs created: {expected['dialogs created']}"
+    assert lines[1] == f"Channel effectiveness: {expected['channel effectiveness']:.1%}"
+    assert lines[2:] == [f"Agent {agent['agent']} recharged {agent['coins']} coins"
+                         for agent in expected['agent recharges']]
+
+
+def test_results_render_the_same_after_a_json_round_trip(day, capsys):
+    # results from the cache or the query server are plain data that came through JSON
+    for result in PluginManager(plugins).analyse_data(day, shards=1).values():
+        render(result)
+        rendered = capsys.readouterr().out
+        render(AnalysisResult.from_dict(json.loads(json.dumps(result.to_dict()))))
+        assert capsys.readouterr().out == rendered, result.plugin
+
+
+def test_unknown_plugins_are_printed_plain(capsys):
+    render(AnalysisResult('not registered', {'a': [1, 2]}, "Somebody else's plugin", 'detailed'))
+    render_plain(3.5)
+    assert capsys.readouterr().out == "{'a': [1, 2]}\n3.5\n"
@@ -0,0 +1,28 @@
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from app import report
+from app.plugins import DialogsCreated
+from app.utils.parallel import analyze_day
+from benchmarks.generate import write_days
+
+
+def test_rows_are_written_in_date_order(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    write_days('app/logs', datetime(2024, 1, 1), 6, 100, 80, 5)
+
+    def slow_early_days(file: str, plugins: list, shards: int):
+        # the first days finish last
+        time.sleep((7 - int(file[:2])) * 0.05)
+        return analyze_day(file, plugins, shards)
+
+    monkeypatch.setattr(report, 'ProcessPoolExecutor', ThreadPoolExecutor)
+    monkeypatch.setattr(report, 'analyze_day', slow_early_days)
+    output = tmp_path / 'report.json'
+    assert report.run_report(None, None, [DialogsCreated], 'json', str(output), workers=6) == report.EXIT_OK
+    with open(output, encoding='utf-8') as file:
+        rows = json.load(file)
+    assert [row['date'] for row in rows] == [f"{day:02d}.01.2024" for day in range(1, 7)]
+    assert all(row[DialogsCreated.name] == 100 for row in rows)
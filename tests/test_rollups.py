@@ -0,0 +1,105 @@
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from app.graphs.rollups import RollupStore, month_key, week_key
+from app.plugins.plugins import (DialogsCreated, SuccessRechargePlugin, FailedRechargePlugin, RechargedAmountPlugin,
+                                 ChannelEffectiveness)
+from benchmarks.generate import generate_data, write_day
+from tests import reference
+
+FIRST_DAY = datetime(2024, 1, 27)
+DAYS = 10
+FORMATS = ('json', 'jsonl', 'jsonl.gz', 'day')
+ROLLUP_PLUGINS = [DialogsCreated, SuccessRechargePlugin, FailedRechargePlugin, RechargedAmountPlugin,
+                  ChannelEffectiveness]
+
+
+def raw_day(offset: int, seed: int = None) -> dict[str, list]:
+    return generate_data(FIRST_DAY + timedelta(days=offset), 120, 90, 6, offset if seed is None else seed)
+
+
+def write(logs, offset: int, seed: int = None) -> None:
+    write_day(str(logs), FIRST_DAY + timedelta(days=offset), 120, 90, 6, FORMATS[offset % len(FORMATS)],
+              offset if seed is None else seed)
+
+
+def expected_daily(data: dict[str, list]) -> dict[str, int]:
+    results = reference.results(data)
+    return {'started': results['dialogs created'], 'succeed': results['Successful recharges'],
+            'interrupted': results['failed_recharges'], 'coins': results['total recharged amount']}
+
+
+def expected_hourly(data: dict[str, list]) -> dict[str, list[int]]:
+    hourly = {metric: [0] * 24 for metric in ('started', 'succeed', 'interrupted', 'coins')}
+    for kind in ('started', 'succeed', 'interrupted'):
+        for entry in data[kind]:
+            hour = datetime.fromisoformat(entry['time']).hour
+            hourly[kind][hour] += 1
+            if kind == 'succeed':
+                hourly['coins'][hour] += int(entry['coin'])
+    return hourly
+
+
+def expected_periods(days: dict[int, dict[str, list]]) -> dict[str, dict[str, dict[str, int]]]:
+    periods = {'weekly': defaultdict(lambda: defaultdict(int)), 'monthly': defaultdict(lambda: defaultdict(int))}
+    for offset, data in days.items():
+        day = (FIRST_DAY + timedelta(days=offset)).date()
+        for level, key in (('weekly', week_key(day)), ('monthly', month_key(day))):
+            for metric, value in expected_daily(data).items():
+                periods[level][key][metric] += value
+            periods[level][key]['days'] += 1
+    return {level: {key: dict(bucket) for key, bucket in buckets.items()} for level, buckets in periods.items()}
+
+
+def check_store(store: RollupStore, days: dict[int, dict[str, list]]) -> None:
+    keys = {offset: (FIRST_DAY + timedelta(days=offset)).date().isoformat() for offset in days}
+    assert store.levels['daily'] == {keys[offset]: expected_daily(data) for offset, data in days.items()}
+    assert store.levels['hourly'] == {keys[offset]: expected_hourly(data) for offset, data in days.items()}
+    assert store.levels['weekly'] == expected_periods(days)['weekly']
+    assert store.levels['monthly'] == expected_periods(days)['monthly']
+
+
+@pytest.fixture
+def logs(tmp_path):
+    for offset in range(DAYS):
+        write(tmp_path, offset)
+    return tmp_path
+
+
+def test_levels_match_raw_days(logs):
+    store = RollupStore(str(logs))
+    assert store.update() == DAYS
+    check_store(store, {offset: raw_day(offset) for offset in range(DAYS)})
+
+
+def test_daily_series_match_per_day_plugins(logs):
+    store = RollupStore(str(logs))
+    store.update()
+    for plugin in ROLLUP_PLUGINS:
+        series = store.series(plugin, level='daily')
+        assert series['y'] == [plugin.analyze(raw_day(offset))[plugin.name].args for offset in range(DAYS)]
+
+
+def test_series_range_is_inclusive(logs):
+    store = RollupStore(str(logs))
+    store.update()
+    start, end = date(2024, 1, 30), date(2024, 2, 2)
+    series = store.series(DialogsCreated, start=start, end=end, level='daily')
+    assert series['y'] == [len(raw_day(offset)['started']) for offset in range(3, 7)]
+
+
+def test_replaced_and_removed_days_keep_levels_in_step(logs):
+    store = RollupStore(str(logs))
+    store.update()
+    # a day rewritten with other events, and the only February day of its week removed
+    write(logs, 2, seed=100)
+    (logs / f"{(FIRST_DAY + timedelta(days=9)).strftime('%d.%m.%Y')}.jsonl").unlink()
+
+    reopened = RollupStore(str(logs))
+    assert reopened.update() == 2
+    days = {offset: raw_day(offset) for offset in range(DAYS - 1)}
+    days[2] = raw_day(2, seed=100)
+    check_store(reopened, days)
+    assert RollupStore(str(logs)).update() == 0
@@ -0,0 +1,77 @@
+import asyncio
+import json
+from datetime import datetime
+
+from app.catalog import Catalog
+from app.server import QueryServer
+from benchmarks.generate import write_days
+
+
+async def exchange(port: int, *requests: bytes) -> list[tuple[int, dict]]:
+    # sends the requests over one connection and reads an answer for each
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    answers = []
+    try:
+        for request in requests:
+            writer.write(request)
+            await writer.drain()
+            status = int((await reader.readline()).split()[1])
+            headers = {}
+            while (line := await reader.readline()) != b'\r\n':
+                name, _, value = line.decode('latin-1').partition(':')
+                headers[name.strip().lower()] = value.strip()
+            answers.append((status, json.loads(await reader.readexactly(int(headers['content-length'])))))
+    finally:
+        writer.close()
+    return answers
+
+
+def run(query_server: QueryServer, *requests: bytes) -> list[tuple[int, dict]]:
+    async def main():
+        server = await asyncio.start_server(query_server.handle, '127.0.0.1', 0)
+        async with server:
+            return await exchange(server.sockets[0].getsockname()[1], *requests)
+
+    return asyncio.run(main())
+
+
+def test_failing_route_answers_500_and_counts(tmp_path):
+    query_server = QueryServer(None, catalog=Catalog(str(tmp_path)))
+
+    async def broken(params):
+        raise RuntimeError("broken")
+
+    query_server.routes['/plugins'] = broken
+    answers = run(query_server, b"GET /plugins HTTP/1.1\r\n\r\n", b"GET /stats HTTP/1.1\r\n\r\n")
+    assert answers[0] == (500, {'error': "Internal server error"})
+    # the connection stays usable after the failure
+    assert answers[1][0] == 200
+    assert answers[1][1]['failed'] == 1
+
+
+def test_request_body_is_skipped_on_a_kept_connection(tmp_path):
+    query_server = QueryServer(None, catalog=Catalog(str(tmp_path)))
+    body = b'GET /stats HTTP/1.1\r\n\r\n'
+    answers = run(query_server,
+                  b"POST /plugins HTTP/1.1\r\nContent-Length: %d\r\n\r\n%s" % (len(body), body),
+                  b"GET /plugins HTTP/1.1\r\n\r\n")
+    assert [status for status, _ in answers] == [405, 200]
+    assert isinstance(answers[1][1], list)
+
+
+def test_range_index_is_built_outside_the_catalog_lock(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    write_days('app/logs', datetime(2024, 1, 1), 2, 100, 80, 5)
+    query_server = QueryServer(None, catalog=Catalog('app/logs'))
+    answer_range = QueryServer.answer_range
+    held = []
+
+    def watched(entries, start, end, plugins):
+        held.append(query_server.catalog_lock.locked())
+        return answer_range(entries, start, end, plugins)
+
+    monkeypatch.setattr(query_server, 'answer_range', watched)
+    status, body = run(query_server, b"GET /query?plugin=repeat%20recharges HTTP/1.1\r\n\r\n")[0]
+    assert held == [False]
+    assert status == 200
+    assert list(body['range']) == ['repeat recharges']
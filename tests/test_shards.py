@@ -0,0 +1,45 @@
+import pytest
+
+import config
+from app.frame import DayFrame
+from app.plugins import PluginManager, plugins
+from app.plugins.shards import ShardedStats
+
+# quantile sketches merged from shards only agree with a single pass within their rank error
+APPROXIMATE = 'recharge time percentiles'
+
+
+@pytest.fixture(autouse=True)
+def shard_every_day(monkeypatch):
+    monkeypatch.setattr(config, 'SHARD_MIN_EVENTS', 0)
+
+
+def args(analysis) -> dict:
+    return {key: analysis[key].args for key in analysis}
+
+
+def assert_same(sharded: dict, single: dict) -> None:
+    assert list(sharded) == list(single)
+    sharded, single = dict(sharded), dict(single)
+    assert sharded.pop(APPROXIMATE).keys() == single.pop(APPROXIMATE).keys()
+    assert sharded == single
+    for key, value in single.items():
+        # results are written out in key order, which follows the single pass
+        if isinstance(value, dict):
+            assert list(sharded[key]) == list(value), key
+
+
+@pytest.mark.parametrize('shards', [2, 3, 7])
+def test_sharded_pass_matches_single_pass(day, shards):
+    single = args(PluginManager(plugins).analyse_data(day, shards=1))
+    assert_same(args(PluginManager(plugins).analyse_data(day, shards=shards)), single)
+    assert_same(args(PluginManager(plugins).analyse_data(DayFrame.from_data(day), shards=shards)), single)
+
+
+def test_lazy_results_of_big_day_are_sharded(day):
+    lazy = PluginManager(plugins).analyse_lazily(day, shards=3)
+    assert isinstance(lazy.stats, ShardedStats)
+    single = args(PluginManager(plugins).analyse_data(day, shards=1))
+    # entries opened one by one, detailed ones first, each adds its accumulators to the shared stats
+    opened = {key: lazy[key].args for key in reversed(list(lazy))}
+    assert_same({key: opened[key] for key in lazy}, single)
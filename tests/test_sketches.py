@@ -0,0 +1,112 @@
+import random
+
+import numpy as np
+import pytest
+
+from app.plugins.engine import DayStats, SKETCHES
+from app.plugins.sketches import DaySketches, HyperLogLog, KLL
+from tests import reference
+from tests.days import make_day
+
+# three standard errors of the defaults, precision 12 and k 200
+HLL_ERROR = 3 * 1.04 / 64
+KLL_RANK_ERROR = 3 * 1.7 / 200
+
+
+def relative_error(estimate: float, exact: int) -> float:
+    return abs(estimate - exact) / exact
+
+
+def rank_error(sorted_values: np.ndarray, value: float, fraction: float) -> float:
+    # distance between the fraction asked for and the ranks the returned value covers
+    low = np.searchsorted(sorted_values, value, side='left') / len(sorted_values)
+    high = np.searchsorted(sorted_values, value, side='right') / len(sorted_values)
+    return 0.0 if low <= fraction <= high else min(abs(low - fraction), abs(high - fraction))
+
+
+def paired_seconds(data: dict[str, list]) -> list[float]:
+    # every succeed event of a user who started exactly once, the values the recharge time sketches take
+    starts = reference.starts_by_user(data)
+    return [reference.recharge_seconds(starts[str(entry['user'])][0], entry)
+            for entry in data['succeed'] if len(starts[str(entry['user'])]) == 1]
+
+
+@pytest.mark.parametrize('count', [50, 3000, 200_000])
+def test_hll_estimate_is_within_error(count):
+    sketch = HyperLogLog()
+    sketch.add_many(range(count))
+    # values seen again do not count twice
+    sketch.add_many(range(count // 2))
+    assert relative_error(sketch.estimate(), count) < HLL_ERROR
+
+
+def test_hll_merge_is_the_sketch_of_the_union():
+    first, second, union = HyperLogLog(), HyperLogLog(), HyperLogLog()
+    first.add_many(range(0, 60_000))
+    second.add_many(range(40_000, 100_000))
+    union.add_many(range(0, 100_000))
+    merged = HyperLogLog.from_dict(first.to_dict()).merge(second)
+    assert np.array_equal(merged.registers, union.registers)
+    assert relative_error(merged.estimate(), 100_000) < HLL_ERROR
+
+
+def test_hll_counts_an_id_and_its_string_once():
+    sketch = HyperLogLog()
+    sketch.add_many([42, '42', 7, '7'])
+    assert round(sketch.estimate()) == 2
+
+
+def test_hll_of_other_precision_does_not_merge():
+    with pytest.raises(ValueError):
+        HyperLogLog(12).merge(HyperLogLog(10))
+
+
+@pytest.mark.parametrize('count', [1000, 100_000])
+def test_kll_quantiles_are_within_rank_error(count):
+    rng = random.Random(count)
+    values = [rng.expovariate(1 / 300) for _ in range(count)]
+    sketch = KLL()
+    sketch.update_many(values)
+    fractions = (0.01, 0.25, 0.5, 0.75, 0.95, 0.99)
+    exact = np.sort(values)
+    for fraction, value in zip(fractions, sketch.quantiles(fractions)):
+        assert rank_error(exact, value, fraction) < KLL_RANK_ERROR, fraction
+    assert sketch.count == count
+    # memory stays bounded however many values were added
+    assert sum(map(len, sketch.levels)) <= 3 * sketch.k
+
+
+def test_kll_merge_keeps_rank_error():
+    rng = random.Random(1)
+    parts = [[rng.gauss(600, 200) for _ in range(20_000)] for _ in range(5)]
+    merged = KLL()
+    for part in parts:
+        sketch = KLL()
+        sketch.update_many(part)
+        merged.merge(KLL.from_dict(sketch.to_dict()))
+    exact = np.sort(np.concatenate(parts))
+    for fraction, value in zip((0.05, 0.5, 0.95), merged.quantiles((0.05, 0.5, 0.95))):
+        assert rank_error(exact, value, fraction) < KLL_RANK_ERROR
+    assert merged.count == len(exact)
+
+
+def test_empty_kll_has_no_quantiles():
+    assert KLL().quantiles((0.5, 0.99)) == [None, None]
+
+
+def test_merged_day_sketches_match_the_days():
+    days = [make_day(seed=seed) for seed in range(3)]
+    merged = DaySketches()
+    for data in days:
+        day_sketches = DayStats(data, (SKETCHES,)).sketches
+        merged.merge(DaySketches.from_dict(day_sketches.to_dict()))
+
+    users = {str(entry['user']) for data in days for kind in data for entry in data[kind]}
+    recharged = {str(entry['user']) for data in days for entry in data['succeed']}
+    assert relative_error(merged.users.estimate(), len(users)) < HLL_ERROR
+    assert relative_error(merged.recharged_users.estimate(), len(recharged)) < HLL_ERROR
+
+    seconds = np.sort([value for data in days for value in paired_seconds(data)])
+    assert merged.recharge_seconds.count == len(seconds)
+    for fraction, value in zip((0.5, 0.95), merged.recharge_seconds.quantiles((0.5, 0.95))):
+        assert rank_error(seconds, value, fraction) < KLL_RANK_ERROR